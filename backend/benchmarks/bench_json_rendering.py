@@ -0,0 +1,86 @@
+"""Serialization time of message list responses, through ninja's default path and the fast one.
+
+Run from the backend directory with ``python -m benchmarks.bench_json_rendering``.
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.settings")
+django.setup()
+
+from ninja.responses import NinjaJSONEncoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from benchmarks.harness import save_results  # noqa: E402
+from bourracho.models import Message, React  # noqa: E402
+from conversations_api.renderers import ORJSONRenderer  # noqa: E402
+
+
+def make_messages(count: int) -> list[Message]:
+    start = datetime(2025, 1, 1)
+    return [
+        Message(
+            id=str(uuid.uuid4()),
+            content=f"Message number {i}, with a few words to look like a chat line.",
+            conversation_id="bench",
+            issuer_id=f"user{i % 10}",
+            timestamp=start + timedelta(seconds=i),
+            reacts=[React(emoji="👍", issuer_id=f"user{(i + 1) % 10}")] if i % 3 == 0 else [],
+        )
+        for i in range(count)
+    ]
+
+
+def measure(render: Callable[[], bytes | str], repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render()
+        timings.append(time.perf_counter() - start)
+    return {
+        "best_ms": round(min(timings) * 1000, 2),
+        "mean_ms": round(sum(timings) / repeat * 1000, 2),
+        "bytes": len(body),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    adapter = TypeAdapter(list[Message])
+    renderer = ORJSONRenderer()
+
+    def ninja_default():
+        # What ninja does for a list[Message] response: validate, dump to python, then encode with json.
+        return json.dumps(adapter.dump_python(adapter.validate_python(messages)), cls=NinjaJSONEncoder)
+
+    def orjson_renderer():
+        return renderer.render(None, adapter.dump_python(adapter.validate_python(messages)), response_status=200)
+
+    def type_adapter_dump_json():
+        return adapter.dump_json(messages)
+
+    results = {
+        "messages": args.messages,
+        "ninja_default": measure(ninja_default, args.repeat),
+        "orjson_renderer": measure(orjson_renderer, args.repeat),
+        "type_adapter_dump_json": measure(type_adapter_dump_json, args.repeat),
+    }
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Logging cost of a ``post_message`` request, with eager f-strings on a blocking sink and with the sampled pipeline.
+
+Run from the backend directory with ``python -m benchmarks.bench_logging``. Records are written to ``os.devnull``.
+"""
+
+import argparse
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from functools import partial
+from unittest.mock import patch
+
+from loguru import logger
+
+from benchmarks.harness import save_results
+from bourracho import config
+from bourracho.log import SampledLogger, configure_logging
+from bourracho.models import Message
+
+
+def eager_logs(message: Message):
+    # What post_message and StoresRegistry.add_message logged before structured logging.
+    logger.info(f"Received request to post message {message} to conversation {message.conversation_id}.")
+    logger.info(f"Message {message} successfully added.")
+    logger.info(f"Message posted to conversation {message.conversation_id}.")
+
+
+def sampled_logs(hot_logger: SampledLogger, message: Message):
+    hot_logger.info("Received request to post message {} to conversation {}.", message.id, message.conversation_id)
+    hot_logger.info("Message {} successfully added.", message.id)
+    hot_logger.info("Message posted to conversation {}.", message.conversation_id)
+
+
+def measure(log, requests: int) -> dict:
+    """Time spent logging in the request thread, records being written by the sink in the background or not."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        log()
+    return {"us_per_request": round((time.perf_counter() - start) / requests * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--content-sizes", type=int, nargs="+", default=[100, 10_000])
+    parser.add_argument("--sample-rate", type=float, default=config.LOG_HOT_SAMPLE_RATE)
+    parser.add_argument("--request-ms", type=float, default=5, help="Request latency to express costs as a share of.")
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    devnull = open(os.devnull, "w")
+    results = {"requests": args.requests, "sample_rate": args.sample_rate, "request_ms": args.request_ms}
+    for size in args.content_sizes:
+        message = Message(
+            id=str(uuid.uuid4()),
+            content="x" * size,
+            conversation_id="bench",
+            issuer_id="user",
+            timestamp=datetime.now(),
+        )
+        logger.remove()
+        logger.add(devnull, level="INFO")
+        eager = measure(partial(eager_logs, message), args.requests)
+        with patch.object(sys, "stderr", devnull):
+            configure_logging()
+        sampled = measure(partial(sampled_logs, SampledLogger(args.sample_rate), message), args.requests)
+        for costs in (eager, sampled):
+            costs["share_of_request"] = f"{costs['us_per_request'] / (args.request_ms * 10):.2f}%"
+        results[f"content_{size}_bytes"] = {"eager": eager, "sampled": sampled}
+    logger.remove()
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
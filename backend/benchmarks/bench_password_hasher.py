@@ -0,0 +1,47 @@
+"""Login throughput of the password hasher against its pool size.
+
+Run from the backend directory with ``python -m benchmarks.bench_password_hasher``.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.harness import save_results
+from bourracho.password_hasher import PasswordHasher
+
+
+async def measure(hasher: PasswordHasher, password_hash: str, logins: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            assert await hasher.check_async("password", password_hash)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return logins / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=64, help="Number of logins in flight at once.")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8, os.cpu_count() or 1])
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    results = {"rounds": args.rounds, "logins": args.logins, "concurrency": args.concurrency, "pool_sizes": []}
+    for pool_size in sorted(set(args.pool_sizes)):
+        hasher = PasswordHasher(rounds=args.rounds, max_workers=pool_size)
+        password_hash = hasher.hash("password")
+        throughput = asyncio.run(measure(hasher, password_hash, args.logins, args.concurrency))
+        hasher.shutdown()
+        results["pool_sizes"].append({"pool_size": pool_size, "logins_per_second": round(throughput, 2)})
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
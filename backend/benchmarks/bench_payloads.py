@@ -0,0 +1,73 @@
+"""Size and rendering time of message list responses, in the full and compact shapes, raw and compressed.
+
+Run from the backend directory with ``python -m benchmarks.bench_payloads``. Brotli is only measured when the
+``compression`` extra is installed.
+"""
+
+import argparse
+import gzip
+import os
+import time
+from typing import Callable
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.settings")
+django.setup()
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from benchmarks.bench_json_rendering import make_messages  # noqa: E402
+from benchmarks.harness import save_results  # noqa: E402
+from bourracho.messages_store import to_message  # noqa: E402
+from bourracho.models import Message  # noqa: E402
+from conversations_api import config  # noqa: E402
+from conversations_api.middleware import brotli  # noqa: E402
+from conversations_api.renderers import compact_messages_response, json_response  # noqa: E402
+
+
+def measure(render: Callable[[], bytes], repeat: int) -> tuple[dict, bytes]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = render()
+        timings.append(time.perf_counter() - start)
+    return {"best_ms": round(min(timings) * 1000, 2), "bytes": len(body)}, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--fields", default="id,content,issuer_id,timestamp", help="Fields of the projected shape.")
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    adapter = TypeAdapter(list[Message])
+    fields = args.fields.split(",")
+    # Documents as Mongo returns them, projected or not; copied since rendering converts them in place.
+    documents = [message.model_dump() for message in messages]
+    projected = [{key: d[key] for key in d.keys() & {*fields, "id", "timestamp"}} for d in documents]
+
+    shapes = {
+        "full": lambda: json_response([to_message(dict(d)) for d in documents], adapter).content,
+        "compact": lambda: compact_messages_response("bench", [dict(d) for d in documents], None).content,
+        "compact_fields": lambda: (
+            compact_messages_response("bench", [dict(d) for d in projected], None, fields).content
+        ),
+    }
+    results = {"messages": args.messages, "fields": fields}
+    for name, render in shapes.items():
+        rendered, body = measure(render, args.repeat)
+        rendered["gzip"] = measure(lambda body=body: gzip.compress(body, compresslevel=6, mtime=0), args.repeat)[0]
+        if brotli is not None:
+            rendered["br"] = measure(
+                lambda body=body: brotli.compress(body, quality=config.BROTLI_QUALITY), args.repeat
+            )[0]
+        results[name] = rendered
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Requests per second of the API across uvicorn worker counts, with the sync and the async hot endpoints.
+
+Run from the backend directory against a local mongod with ``python -m benchmarks.bench_scaling --workers 1 2 4``.
+Members poll their room without pausing, so throughput is bounded by the server. The load generator runs on the same
+machine: keep the largest worker count below the number of cores, so that it is left some.
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import save_results
+from benchmarks.load_http import run, wait_until_up
+
+
+def measure(args, workers: int, async_endpoints: bool) -> dict:
+    command = [sys.executable, "-m", "benchmarks.serve", "--port", str(args.port), "--workers", str(workers)]
+    command += ["--async-endpoints"] if async_endpoints else []
+    command += ["--mongomock"] if args.mongomock else []
+    server = subprocess.Popen(command)
+    load = argparse.Namespace(
+        url=f"http://127.0.0.1:{args.port}/api",
+        rooms=args.rooms,
+        users=args.users,
+        duration=args.duration,
+        poll_interval=0,
+        post_ratio=args.post_ratio,
+    )
+    try:
+        wait_until_up(load.url, timeout=60, server=server)
+        # Let every worker finish booting before the clock starts.
+        time.sleep(args.warmup)
+        return run(load)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure.")
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--mongomock", action="store_true", help="Single sync worker on an in-memory Mongo stand-in.")
+    parser.add_argument("--rooms", type=int, default=8)
+    parser.add_argument("--users", type=int, default=4, help="Members of each room.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per configuration.")
+    parser.add_argument("--post-ratio", type=float, default=0.1, help="Probability to post a message after a poll.")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds to wait after the API is up.")
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+    if args.mongomock and (args.workers != [1] or args.modes != ["sync"]):
+        parser.error("--mongomock only supports --workers 1 --modes sync.")
+
+    results = {"parameters": {key: value for key, value in vars(args).items() if key != "output"}}
+    for mode in args.modes:
+        baseline = None
+        for workers in args.workers:
+            total = measure(args, workers, async_endpoints=mode == "async")["total"]
+            throughput = total.get("throughput_per_second", 0)
+            baseline = baseline or throughput
+            results[f"{mode}_{workers}_workers"] = {
+                "requests_per_second": throughput,
+                "speedup": round(throughput / baseline, 2) if baseline else None,
+                "p50_ms": total.get("p50_ms"),
+                "p99_ms": total.get("p99_ms"),
+                "errors": total["errors"],
+            }
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Latency of the main store operations against a local mongod, or an in-memory stand-in with ``--mongomock``.
+
+Run from the backend directory with ``python -m benchmarks.bench_stores --output results.json``. The database named
+``--db-name`` is dropped before and after the run.
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from benchmarks.harness import latency_stats, save_results, use_mongomock
+
+
+def timed(operation: Callable[[int], object], count: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        operation_start = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - operation_start)
+    return latency_stats(latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongomock", action="store_true", help="Use an in-memory Mongo stand-in.")
+    parser.add_argument("--db-name", default="bourracho_bench")
+    parser.add_argument("--messages", type=int, default=2000, help="Messages inserted, then reacted to.")
+    parser.add_argument("--reads", type=int, default=200, help="Number of each read operation.")
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the benchmark user.")
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        use_mongomock()
+    from bourracho.messages_store import MessagesStore
+    from bourracho.models import Message, React
+    from bourracho.password_hasher import PasswordHasher
+    from bourracho.users_store import UsersStore
+
+    messages_store = MessagesStore(args.db_name)
+    messages_store.client.drop_database(args.db_name)
+    users_store = UsersStore(args.db_name, password_hasher=PasswordHasher(rounds=args.rounds, max_workers=1))
+    conversation_id = str(uuid.uuid4())
+    start = datetime.now()
+    messages_ids = [str(uuid.uuid4()) for _ in range(args.messages)]
+
+    def add_message(i: int):
+        messages_store.add_message(
+            Message(
+                id=messages_ids[i],
+                content=f"Message number {i}, with a few words to look like a chat line.",
+                conversation_id=conversation_id,
+                issuer_id=f"user{i % 10}",
+                timestamp=start + timedelta(milliseconds=i),
+            )
+        )
+
+    def add_react(i: int):
+        react = React(emoji=random.choice(["👍", "🤩", "😂"]), issuer_id=f"user{i % 10}")
+        messages_store.add_react(react, random.choice(messages_ids))
+
+    user = users_store.get_new_user("bench", "password")
+    users_store.add_user(user)
+
+    results = {
+        "parameters": vars(args),
+        "add_message": timed(add_message, args.messages),
+        "get_messages": timed(lambda _: messages_store.get_messages(conversation_id), max(1, args.reads // 10)),
+        "get_messages_page": timed(lambda _: messages_store.get_messages_page(conversation_id), args.reads),
+        "add_react": timed(add_react, args.messages),
+        "check_credentials": timed(lambda _: users_store.check_credentials("bench", "password"), args.logins),
+    }
+    messages_store.client.drop_database(args.db_name)
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
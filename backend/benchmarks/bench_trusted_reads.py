@@ -0,0 +1,80 @@
+"""Per-document cost of building models from our own collections, with and without validation.
+
+Run from the backend directory with ``python -m benchmarks.bench_trusted_reads``.
+"""
+
+import argparse
+import copy
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+from unittest.mock import patch
+
+from benchmarks.harness import save_results
+from bourracho import config
+from bourracho.conversations_store import to_summary
+from bourracho.messages_store import to_message
+from bourracho.models import Message, React
+
+
+def make_documents(count: int) -> list[dict]:
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "_id": i,
+            **Message(
+                id=f"message{i}",
+                content=f"Message number {i}, with a few words to look like a chat line.",
+                conversation_id="bench",
+                issuer_id=f"user{i % 10}",
+                timestamp=start + timedelta(seconds=i),
+                reacts=[React(emoji="👍", issuer_id=f"user{(i + 1) % 10}")] if i % 3 == 0 else [],
+            ).model_dump(),
+        }
+        for i in range(count)
+    ]
+
+
+def measure(build: Callable[[dict], object], documents: list[dict], repeat: int, trusted: bool) -> dict:
+    timings = []
+    with patch.object(config, "TRUSTED_READS", trusted):
+        for _ in range(repeat):
+            # Building models takes ownership of the documents, as it does for those fetched from Mongo.
+            batch = copy.deepcopy(documents)
+            start = time.perf_counter()
+            for document in batch:
+                build(document)
+            timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {"best_ms": round(best * 1000, 2), "per_document_us": round(best / len(documents) * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    messages = make_documents(args.documents)
+    conversations = [
+        {"id": f"conversation{i}", "users_ids": ["user0", "user1"], "last_message": m, "last_activity": m["timestamp"]}
+        for i, m in enumerate(messages)
+    ]
+    results = {"documents": args.documents}
+    for name, build, documents in [
+        ("message", to_message, messages),
+        ("conversation_summary", lambda c: to_summary(c, "user0"), conversations),
+    ]:
+        validated = measure(build, documents, args.repeat, trusted=False)
+        trusted = measure(build, documents, args.repeat, trusted=True)
+        results[name] = {
+            "validated": validated,
+            "trusted": trusted,
+            "speedup": round(validated["best_ms"] / trusted["best_ms"], 2),
+        }
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
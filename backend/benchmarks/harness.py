@@ -0,0 +1,62 @@
+"""Helpers shared by the benchmarks: Mongo stand-in, latency statistics and JSON reports."""
+
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+
+def use_mongomock() -> None:
+    """Route ``pymongo.MongoClient`` to an in-memory ``mongomock`` stand-in.
+
+    Must be called before ``bourracho`` is imported, since its modules import the client class.
+    """
+    import mongomock
+    import pymongo
+
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def latency_stats(latencies: list[float], duration: float) -> dict:
+    """Throughput and latency percentiles of operations timed in seconds, over ``duration`` seconds."""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "throughput_per_second": round(len(ordered) / duration, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        **{f"p{p}_ms": round(percentile(ordered, p) * 1000, 3) for p in (50, 90, 99)},
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def environment() -> dict:
+    """Describe where results come from, to compare runs between commits."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_results(results: dict, output: str | None) -> None:
+    """Print results as JSON, and write them to ``output`` when given."""
+    report = json.dumps({"environment": environment(), **results}, indent=2)
+    print(report)
+    if output:
+        with open(output, "w") as f:
+            f.write(report + "\n")
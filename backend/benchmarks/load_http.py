@@ -0,0 +1,160 @@
+"""HTTP load of rooms where every member polls for new messages and sometimes posts one.
+
+Run from the backend directory with ``python -m benchmarks.load_http --mongomock --output results.json``. Without
+``--url``, the API is started with ``benchmarks.serve`` for the duration of the run.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import quote, urlsplit
+
+from benchmarks.harness import latency_stats, save_results
+
+
+class ApiClient:
+    """Keep-alive connection to the API, recording the latency of each request under an operation name."""
+
+    def __init__(self, url: str, timeout: float = 30):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+        self.prefix = parts.path.rstrip("/")
+        self.token: str | None = None
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def request(self, operation: str, method: str, path: str, body: dict | None = None):
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, self.prefix + path, json.dumps(body) if body else None, headers)
+            response = self.connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.errors[operation] += 1
+            return None
+        self.latencies[operation].append(time.perf_counter() - start)
+        if response.status != 200:
+            self.errors[operation] += 1
+            return None
+        return json.loads(content)
+
+
+def join_room(url: str, room_id: str | None, run_id: str, index: int) -> tuple[ApiClient, str]:
+    """Register a member, creating the room for the first one and joining it for the others."""
+    client = ApiClient(url)
+    session = client.request("register", "POST", "/register/", {"username": f"{run_id}-{index}", "password": "pwd"})
+    if session is None:
+        raise RuntimeError("Could not register a benchmark user, is the API up?")
+    client.token = session["token"]
+    if room_id is None:
+        room_id = client.request("create_conversation", "POST", "/chat/", {"name": f"room {run_id}-{index}"})["id"]
+    else:
+        client.request("join_conversation", "POST", f"/chat/{room_id}/join")
+    return client, room_id
+
+
+def simulate_member(client: ApiClient, room_id: str, deadline: float, poll_interval: float, post_ratio: float):
+    cursor = None
+    while time.monotonic() < deadline:
+        query = f"?limit=100&since={quote(cursor)}" if cursor else "?limit=100"
+        page = client.request("poll_messages", "GET", f"/chat/{room_id}/messages/{query}")
+        if page:
+            cursor = page["cursor"] or cursor
+        if random.random() < post_ratio:
+            message = {"content": "Hello from the load test", "conversation_id": room_id, "issuer_id": ""}
+            client.request("post_message", "POST", f"/chat/{room_id}/messages/", message)
+        time.sleep(poll_interval * random.uniform(0.5, 1.5))
+
+
+def wait_until_up(url: str, timeout: float, server: subprocess.Popen | None) -> None:
+    parts = urlsplit(url)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server and server.poll() is not None:
+            raise RuntimeError(f"API server exited with code {server.returncode}")
+        try:
+            socket.create_connection((parts.hostname, parts.port or 80), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"API at {url} did not come up within {timeout} seconds")
+
+
+def run(args) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    members = []
+    for room in range(args.rooms):
+        room_id = None
+        for user in range(args.users):
+            client, room_id = join_room(args.url, room_id, run_id, room * args.users + user)
+            members.append((client, room_id))
+
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(
+            target=simulate_member, args=(client, room_id, deadline, args.poll_interval, args.post_ratio), daemon=True
+        )
+        for client, room_id in members
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    for client, _ in members:
+        for operation in ("poll_messages", "post_message"):
+            latencies[operation].extend(client.latencies[operation])
+            errors[operation] += client.errors[operation]
+    all_latencies = [latency for operation_latencies in latencies.values() for latency in operation_latencies]
+    return {
+        "parameters": {key: value for key, value in vars(args).items() if key != "output"},
+        "total": {**latency_stats(all_latencies, duration), "errors": sum(errors.values())},
+        **{op: {**latency_stats(latencies[op], duration), "errors": errors[op]} for op in latencies},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running API, e.g. http://127.0.0.1:8000/api.")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the API started without --url.")
+    parser.add_argument("--mongomock", action="store_true", help="Start the API on an in-memory Mongo stand-in.")
+    parser.add_argument("--rooms", type=int, default=4)
+    parser.add_argument("--users", type=int, default=5, help="Members of each room.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load.")
+    parser.add_argument("--poll-interval", type=float, default=1, help="Mean seconds between two polls of a member.")
+    parser.add_argument("--post-ratio", type=float, default=0.2, help="Probability to post a message after a poll.")
+    parser.add_argument("--output", help="File to write the JSON results to.")
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        command = [sys.executable, "-m", "benchmarks.serve", "--port", str(args.port)]
+        server = subprocess.Popen(command + (["--mongomock"] if args.mongomock else []))
+        args.url = f"http://127.0.0.1:{args.port}/api"
+    try:
+        wait_until_up(args.url, timeout=60, server=server)
+        results = run(args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    save_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Serve the API with uvicorn for load tests, optionally on an in-memory Mongo stand-in.
+
+Run from the backend directory with ``python -m benchmarks.serve --mongomock``. The in-memory stand-in only lives in
+the serving process, so it cannot be combined with several workers or with the async endpoints.
+"""
+
+import argparse
+import os
+import secrets
+
+import uvicorn
+
+from benchmarks.harness import use_mongomock
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--mongomock", action="store_true", help="Use an in-memory Mongo stand-in.")
+    parser.add_argument("--log-level", default="WARNING", help="Level of the application logs.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of uvicorn worker processes.")
+    parser.add_argument("--async-endpoints", action="store_true", help="Serve the hot endpoints with async views.")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        if args.workers > 1 or args.async_endpoints:
+            parser.error("--mongomock only supports a single worker and the sync endpoints.")
+        use_mongomock()
+    os.environ["LOG_LEVEL"] = args.log_level.upper()
+    os.environ["ASYNC_ENDPOINTS"] = str(args.async_endpoints).lower()
+    if args.workers > 1:
+        # Events must reach subscribers connected to the other workers.
+        os.environ.setdefault("EVENTS_BACKEND", "mongo")
+    # Shared by the workers, which must accept the session tokens issued by each other.
+    os.environ.setdefault("BOURRACHO_SECRET_KEY", secrets.token_urlsafe(32))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "src.settings")
+    uvicorn.run(
+        "src.asgi:application",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level=args.log_level.lower(),
+    )
+
+
+if __name__ == "__main__":
+    main()
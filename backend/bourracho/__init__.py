@@ -1,10 +1,25 @@
 __all__ = [
+    "async_conversations_store",
+    "async_messages_store",
     "config",
     "conversations_store",
     "messages_store",
     "users_store",
     "models",
+    "password_hasher",
+    "read_markers_store",
     "stores_registry",
 ]
 
-from bourracho import config, conversations_store, messages_store, models, stores_registry, users_store
+from bourracho import (
+    async_conversations_store,
+    async_messages_store,
+    config,
+    conversations_store,
+    messages_store,
+    models,
+    password_hasher,
+    read_markers_store,
+    stores_registry,
+    users_store,
+)
@@ -0,0 +1,110 @@
+from typing import List
+
+from loguru import logger
+from pymongo import AsyncMongoClient
+
+from bourracho import config
+from bourracho.cache import TTLCache
+from bourracho.conversations_store import (
+    CONVERSATIONS_ACTIVITY_ORDER,
+    activity_query,
+    activity_updates,
+    summary_projection,
+    to_conversation,
+    to_page,
+    to_summary,
+)
+from bourracho.indexes import get_async_collection
+from bourracho.models import Conversation, ConversationsPage, Message
+
+
+class AsyncConversationsStore:
+    def __init__(self, db_name: str, client: AsyncMongoClient):
+        self.db_name = db_name
+        self.client = client
+        self.db = self.client[self.db_name]
+        self.conversations_collection = get_async_collection(self.db, config.CONVERSATIONS_COLLECTION)
+        self.users_ids_cache: TTLCache[str, frozenset[str]] = TTLCache(
+            maxsize=config.MEMBERSHIP_CACHE_SIZE, ttl=config.MEMBERSHIP_CACHE_TTL_SECONDS, name="conversation_members"
+        )
+        """Members of recently checked conversations, keyed by conversation id"""
+        logger.debug("Initialized AsyncConversationsStore")
+
+    async def add_conversation(self, conversation: Conversation) -> None:
+        await self.conversations_collection.insert_one(conversation.model_dump())
+
+    async def get_conversation(self, conversation_id: str) -> Conversation:
+        conversation = await self.conversations_collection.find_one({"id": conversation_id})
+        if not conversation:
+            raise ValueError(f"Conversation {conversation_id} does not exist")
+        return to_conversation(conversation)
+
+    async def get_conversations(self, user_id: str) -> List[Conversation]:
+        return [to_conversation(c) async for c in self.conversations_collection.find({"users_ids": {"$in": [user_id]}})]
+
+    async def get_conversations_page(
+        self, user_id: str, before: str | None = None, limit: int | None = config.CONVERSATIONS_PAGE_SIZE
+    ) -> ConversationsPage:
+        conversations = self.conversations_collection.find(
+            activity_query(user_id, before), summary_projection(user_id)
+        ).sort(CONVERSATIONS_ACTIVITY_ORDER)
+        if limit is not None:
+            limit = min(limit, config.CONVERSATIONS_MAX_PAGE_SIZE)
+            conversations = conversations.limit(limit)
+        return to_page([to_summary(c, user_id) async for c in conversations], limit)
+
+    async def record_messages(self, conversation_id: str, messages: list[Message]) -> None:
+        if not messages:
+            return
+        members = await self.get_members(conversation_id)
+        latest_update, counters_update, timestamp = activity_updates(messages, members)
+        result = await self.conversations_collection.update_one(
+            {"id": conversation_id, "last_activity": {"$not": {"$gt": timestamp}}}, latest_update
+        )
+        if result.matched_count == 0:
+            await self.conversations_collection.update_one({"id": conversation_id}, counters_update)
+
+    async def update_last_message(self, message: Message) -> None:
+        result = await self.conversations_collection.update_one(
+            {"id": message.conversation_id, "last_message.id": message.id},
+            {"$set": {"last_message": message.model_dump()}, "$inc": {"revision": 1}},
+        )
+        if result.matched_count == 0:
+            await self.conversations_collection.update_one({"id": message.conversation_id}, {"$inc": {"revision": 1}})
+
+    async def get_revision(self, conversation_id: str) -> int | None:
+        conversation = await self.conversations_collection.find_one({"id": conversation_id}, {"_id": 0, "revision": 1})
+        return None if conversation is None else conversation.get("revision", 0)
+
+    async def get_user_ids(self, conversation_id: str) -> list[str]:
+        conversation = await self.conversations_collection.find_one({"id": conversation_id}, {"users_ids": 1})
+        return conversation["users_ids"]
+
+    async def get_members(self, conversation_id: str) -> frozenset[str]:
+        users_ids = self.users_ids_cache.get(conversation_id)
+        if users_ids is None:
+            users_ids = frozenset(await self.get_user_ids(conversation_id))
+            self.users_ids_cache.set(conversation_id, users_ids)
+        return users_ids
+
+    async def is_member(self, user_id: str, conversation_id: str) -> bool:
+        users_ids = self.users_ids_cache.get(conversation_id)
+        if users_ids is None or user_id not in users_ids:
+            # Members are only ever added, so a cached negative answer may be stale and is re-checked.
+            users_ids = frozenset(await self.get_user_ids(conversation_id))
+            self.users_ids_cache.set(conversation_id, users_ids)
+        return user_id in users_ids
+
+    async def add_user_id_to_conversation(self, user_id: str, conversation_id: str) -> None:
+        await self.conversations_collection.update_one(
+            {"id": conversation_id}, {"$addToSet": {"users_ids": user_id}, "$inc": {"revision": 1}}
+        )
+        self.users_ids_cache.invalidate(conversation_id)
+        logger.info(f"Succesfully added user {user_id} to conversation {conversation_id}")
+
+    async def update_conversation(self, conversation: Conversation) -> None:
+        await self.conversations_collection.update_one(
+            {"id": conversation.id}, {"$set": conversation.model_dump(exclude_unset=True), "$inc": {"revision": 1}}
+        )
+        self.users_ids_cache.invalidate(conversation.id)
+        logger.info(f"Succesfully updated conversation {conversation.id}")
@@ -0,0 +1,96 @@
+from typing import Collection, List
+
+from loguru import logger
+from pymongo import AsyncMongoClient
+
+from bourracho import config
+from bourracho.indexes import get_async_collection
+from bourracho.log import hot_logger
+from bourracho.messages_store import (
+    MESSAGES_ORDER,
+    MESSAGES_REVERSE_ORDER,
+    documents_cursor,
+    keyset_query,
+    message_projection,
+    react_update_pipeline,
+    to_message,
+)
+from bourracho.models import Message, MessagesPage, React
+from bourracho.utils import encode_cursor, trusted_model
+
+
+class AsyncMessagesStore:
+    def __init__(self, db_name: str, client: AsyncMongoClient):
+        self.db_name = db_name
+        self.client = client
+        self.db = self.client[self.db_name]
+        self.messages_collection = get_async_collection(self.db, config.MESSAGES_COLLECTION)
+        logger.debug("Initialized AsyncMessagesStore")
+
+    async def add_message(self, message: Message) -> None:
+        await self.messages_collection.insert_one(message.model_dump())
+
+    async def update_message(self, message: Message) -> None:
+        await self.messages_collection.update_one({"id": message.id}, {"$set": message.model_dump(exclude_unset=True)})
+
+    async def get_messages(self, conversation_id: str) -> List[Message]:
+        return [to_message(m) async for m in self.messages_collection.find({"conversation_id": conversation_id})]
+
+    async def get_messages_since(
+        self,
+        conversation_id: str,
+        since: str | None = None,
+        after_id: str | None = None,
+        limit: int = config.MESSAGES_PAGE_SIZE,
+    ) -> MessagesPage:
+        if not since and after_id:
+            since = encode_cursor(await self.get_message(after_id))
+        query = keyset_query(conversation_id, since, "$gt")
+        limit = min(limit, config.MESSAGES_MAX_PAGE_SIZE)
+        messages = [to_message(m) async for m in self.messages_collection.find(query).sort(MESSAGES_ORDER).limit(limit)]
+        return MessagesPage(messages=messages, cursor=encode_cursor(messages[-1]) if messages else since)
+
+    async def get_message_documents(
+        self,
+        conversation_id: str,
+        since: str | None = None,
+        after_id: str | None = None,
+        limit: int | None = None,
+        fields: Collection[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        if not since and after_id:
+            since = encode_cursor(await self.get_message(after_id))
+        query = keyset_query(conversation_id, since, "$gt")
+        documents = self.messages_collection.find(query, message_projection(fields)).sort(MESSAGES_ORDER)
+        if limit:
+            documents = documents.limit(min(limit, config.MESSAGES_MAX_PAGE_SIZE))
+        documents = [d async for d in documents]
+        return documents, documents_cursor(documents, since)
+
+    async def get_messages_page(
+        self, conversation_id: str, before: str | None = None, limit: int = config.MESSAGES_PAGE_SIZE
+    ) -> MessagesPage:
+        query = keyset_query(conversation_id, before, "$lt")
+        limit = min(limit, config.MESSAGES_MAX_PAGE_SIZE)
+        messages = [
+            to_message(m) async for m in self.messages_collection.find(query).sort(MESSAGES_REVERSE_ORDER).limit(limit)
+        ]
+        return MessagesPage(messages=messages, cursor=encode_cursor(messages[-1]) if len(messages) == limit else None)
+
+    async def get_message(self, message_id: str) -> Message:
+        message = await self.messages_collection.find_one({"id": message_id})
+        if not message:
+            raise ValueError(f"Message {message_id} does not exist")
+        return to_message(message)
+
+    async def add_react(self, react: React, message_id: str) -> None:
+        result = await self.messages_collection.update_one({"id": message_id}, react_update_pipeline(react))
+        if result.matched_count == 0:
+            raise ValueError(f"Message {message_id} does not exist")
+        hot_logger.info("Added react {} to message {}.", react.emoji, message_id)
+
+    async def get_reacts(self, message_id: str) -> List[React]:
+        message = await self.messages_collection.find_one({"id": message_id})
+        if not message:
+            raise ValueError(f"Message {message_id} does not exist")
+        return [trusted_model(React, react) for react in message["reacts"]]
@@ -4,11 +4,64 @@ from pathlib import Path
 BOURRACHO_ROOT_DIR = Path(__file__).parent.parent
 
 PERSISTENCE_DIR = BOURRACHO_ROOT_DIR / "persistence"
+JSONL_COMPACTION_INTERVAL = int(os.environ.get("JSONL_COMPACTION_INTERVAL", 1000))
+JSONL_LOCK_TIMEOUT_SECONDS = float(os.environ.get("JSONL_LOCK_TIMEOUT_SECONDS", 60))
 MONGO_DB_URL = os.environ.get("MONGO_DB_URL", "mongodb://localhost:27017")
 MONGO_DB_USERNAME = os.environ.get("MONGO_DB_USERNAME", None)
 MONGO_DB_PASSWORD = os.environ.get("MONGO_DB_PASSWORD", None)
 MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "bourracho_db_dev")
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 60_000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5_000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", 5_000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", 30_000))
+MONGO_ENSURE_INDEXES = os.environ.get("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+MONGO_CHECK_QUERY_PLANS = os.environ.get("MONGO_CHECK_QUERY_PLANS", "false").lower() == "true"
+MONGO_COMMAND_METRICS = os.environ.get("MONGO_COMMAND_METRICS", "true").lower() == "true"
+# Build models read from our own collections without validating them again.
+TRUSTED_READS = os.environ.get("TRUSTED_READS", "true").lower() == "true"
 
 CONVERSATIONS_COLLECTION = "conversations"
 USERS_COLLECTION = "users"
 MESSAGES_COLLECTION = "messages"
+READ_MARKERS_COLLECTION = "read_markers"
+
+CONVERSATIONS_PAGE_SIZE = int(os.environ.get("CONVERSATIONS_PAGE_SIZE", 50))
+CONVERSATIONS_MAX_PAGE_SIZE = int(os.environ.get("CONVERSATIONS_MAX_PAGE_SIZE", 200))
+
+MESSAGES_PAGE_SIZE = int(os.environ.get("MESSAGES_PAGE_SIZE", 100))
+MESSAGES_MAX_PAGE_SIZE = int(os.environ.get("MESSAGES_MAX_PAGE_SIZE", 500))
+MESSAGES_BULK_CHUNK_SIZE = int(os.environ.get("MESSAGES_BULK_CHUNK_SIZE", 1000))
+
+EVENTS_BACKEND = os.environ.get("EVENTS_BACKEND", "memory")
+EVENTS_COLLECTION = "events"
+EVENTS_COLLECTION_SIZE = int(os.environ.get("EVENTS_COLLECTION_SIZE", 16 * 1024 * 1024))
+EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", 256))
+
+MEMBERSHIP_CACHE_SIZE = int(os.environ.get("MEMBERSHIP_CACHE_SIZE", 10_000))
+MEMBERSHIP_CACHE_TTL_SECONDS = float(os.environ.get("MEMBERSHIP_CACHE_TTL_SECONDS", 30))
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+# Threads running the blocking calls of async code paths, per process.
+BLOCKING_THREADS = int(os.environ.get("BLOCKING_THREADS", min(32, (os.cpu_count() or 1) + 4)))
+PASSWORD_HASHER_WORKERS = int(os.environ.get("PASSWORD_HASHER_WORKERS", min(4, os.cpu_count() or 1)))
+
+USERS_PAGE_SIZE = int(os.environ.get("USERS_PAGE_SIZE", 100))
+USERS_MAX_PAGE_SIZE = int(os.environ.get("USERS_MAX_PAGE_SIZE", 500))
+USERS_CACHE_SIZE = int(os.environ.get("USERS_CACHE_SIZE", 10_000))
+USERS_CACHE_TTL_SECONDS = float(os.environ.get("USERS_CACHE_TTL_SECONDS", 60))
+
+READ_MARKERS_FLUSH_INTERVAL_SECONDS = float(os.environ.get("READ_MARKERS_FLUSH_INTERVAL_SECONDS", 2))
+READ_MARKERS_FLUSH_SIZE = int(os.environ.get("READ_MARKERS_FLUSH_SIZE", 500))
+# Attempts at writing unread counters, counted again when their conversation receives messages during the count.
+UNREAD_COUNTS_ATTEMPTS = int(os.environ.get("UNREAD_COUNTS_ATTEMPTS", 3))
+
+EMOJI_CACHE_SIZE = int(os.environ.get("EMOJI_CACHE_SIZE", 4096))
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_JSON = os.environ.get("LOG_JSON", "false").lower() == "true"
+# Records waiting to be written by the background log writer, 0 writes them from the logging thread.
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10_000))
+# Share of hot path info logs (one or more per request) that are emitted.
+LOG_HOT_SAMPLE_RATE = float(os.environ.get("LOG_HOT_SAMPLE_RATE", 0.1))
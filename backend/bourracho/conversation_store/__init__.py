@@ -0,0 +1,17 @@
+from bourracho.conversation_store.abstract_conversation_store import AbstractConversationStore
+from bourracho.conversation_store.json_conversation_store import JsonConversationStore
+from bourracho.conversation_store.jsonl_conversation_store import JsonlConversationStore
+from bourracho.conversation_store.mongo_conversation_store import MongoConversationStore
+from bourracho.models import ConversationStoreModel
+
+CONVERSATION_STORES: dict[str, type[AbstractConversationStore]] = {
+    "json": JsonConversationStore,
+    "jsonl": JsonlConversationStore,
+    "mongo_db": MongoConversationStore,
+}
+"""Conversation store class of each store model type"""
+
+
+def get_conversation_store(model: ConversationStoreModel) -> AbstractConversationStore:
+    """Build the conversation store described by ``model``."""
+    return CONVERSATION_STORES[model.type].from_model(model)
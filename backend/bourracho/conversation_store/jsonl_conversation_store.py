@@ -0,0 +1,184 @@
+import json
+import mmap
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from os.path import join as pjoin
+from typing import Iterator
+
+from loguru import logger
+
+from bourracho import config
+from bourracho.conversation_store.json_conversation_store import JsonConversationStore
+from bourracho.conversation_store.jsonl_index import JsonlLogIndex
+from bourracho.models import JsonlConversationStoreModel, Message, React
+from bourracho.timestamps import utc_now
+
+
+def apply_record(messages: dict[str, dict], record: dict) -> None:
+    """Fold a log record into ``messages``, a dict of message id to message fields."""
+    if record["op"] == "add":
+        messages[record["message"]["id"]] = record["message"]
+    elif record["message_id"] in messages:
+        message = messages[record["message_id"]]
+        if record["op"] == "react":
+            message["reacts"] = [*message.get("reacts", []), record["react"]]
+        elif record["op"] == "update":
+            messages[record["message_id"]] = {**message, **record["fields"]}
+
+
+class JsonlConversationStore(JsonConversationStore):
+    """File-backed store keeping messages in an append-only JSON lines log.
+
+    Each line is a record: ``add`` (a new message), ``react`` or ``update`` (partial message fields). Writes append
+    one line, and records are folded into messages on read. Once ``compaction_interval`` react/update records have
+    been appended, the log is rewritten as one ``add`` record per message.
+
+    A companion ``JsonlLogIndex`` lets ``get_message``, ``get_last_messages`` and ``get_messages_between`` read only
+    the records they need through a memory map of the log. Its write lock serializes appends across processes.
+    """
+
+    def __init__(self, db_dir: str, conversation_id: str, compaction_interval: int = config.JSONL_COMPACTION_INTERVAL):
+        super().__init__(db_dir, conversation_id)
+        self.messages_filepath = pjoin(self.db_dir, "messages.jsonl")
+        self.index = JsonlLogIndex(self.messages_filepath, pjoin(self.db_dir, "messages.index.sqlite3"))
+        self.compaction_interval = compaction_interval
+        self.records_since_compaction = 0
+
+    @classmethod
+    def from_model(cls, model: JsonlConversationStoreModel):
+        return JsonlConversationStore(model.db_dir, model.conversation_id)
+
+    @contextmanager
+    def locked_log(self):
+        """Open the log for appending, holding the index write lock shared with other processes."""
+        with self.index.writing():
+            self.index.catch_up()
+            with open(self.messages_filepath, "a+b") as f:
+                yield f
+
+    def append_record(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=True).encode("ascii") + b"\n"
+        with self.locked_log() as f:
+            offset = f.seek(0, os.SEEK_END)
+            # Terminate a record truncated by a crash so it does not swallow this one.
+            prefix = b""
+            if offset:
+                f.seek(offset - 1)
+                prefix = b"" if f.read(1) == b"\n" else b"\n"
+            f.write(prefix + line)
+            f.flush()
+            os.fsync(f.fileno())
+            self.index.record_appended(record, offset + len(prefix), len(line))
+
+    def read_records(self) -> Iterator[dict]:
+        if not os.path.exists(self.messages_filepath):
+            return
+        with open(self.messages_filepath, "rb") as f:
+            for line_number, line in enumerate(f):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash in the middle of an append leaves a truncated line behind.
+                    logger.warning(f"Skipping corrupted record at line {line_number} of {self.messages_filepath}.")
+
+    @contextmanager
+    def mapped_log(self) -> Iterator[mmap.mmap | bytes]:
+        """Memory map the log, while reading the index of the mapped file."""
+        while True:
+            self.index.refresh()
+            with self.index.reading():
+                inode, size = self.index.state
+                if size == 0:
+                    yield b""
+                    return
+                with open(self.messages_filepath, "rb") as f:
+                    # Otherwise a compaction replaced the log and is about to commit its index.
+                    if os.fstat(f.fileno()).st_ino == inode:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                            yield mapped
+                        return
+
+    @staticmethod
+    def read_record(mapped: mmap.mmap, offset: int) -> dict:
+        return json.loads(mapped[offset : mapped.find(b"\n", offset)])
+
+    def fold_message(self, mapped: mmap.mmap, message_id: str) -> Message | None:
+        messages: dict[str, dict] = {}
+        for offset in self.index.message_offsets(message_id):
+            apply_record(messages, self.read_record(mapped, offset))
+        return Message.model_validate(messages[message_id]) if message_id in messages else None
+
+    def write_messages(self, messages: list[Message]) -> None:
+        tmp_filepath = f"{self.messages_filepath}.tmp"
+        with self.index.writing():
+            with open(tmp_filepath, "w") as f:
+                for message in messages:
+                    f.write(json.dumps({"op": "add", "message": message.model_dump(mode="json")}, ensure_ascii=True))
+                    f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_filepath, self.messages_filepath)
+            self.index.catch_up()
+        self.records_since_compaction = 0
+
+    def add_message(self, message: Message) -> None:
+        Message.model_validate(message)
+        # Messages are looked up by timestamp, see get_messages_between.
+        message.timestamp = message.timestamp or utc_now()
+        logger.info(f"Adding message {message.id}.")
+        self.append_record({"op": "add", "message": message.model_dump(mode="json")})
+
+    def get_messages(self) -> list[Message]:
+        messages: dict[str, dict] = {}
+        for record in self.read_records():
+            apply_record(messages, record)
+        return [Message.model_validate(message) for message in messages.values()]
+
+    def get_message(self, message_id: str) -> Message:
+        with self.mapped_log() as mapped:
+            message = self.fold_message(mapped, message_id)
+        if message is None:
+            raise ValueError(f"Message with id {message_id} is not among registered messages.")
+        return message
+
+    def get_last_messages(self, limit: int) -> list[Message]:
+        """Return the ``limit`` most recently added messages, oldest first."""
+        with self.mapped_log() as mapped:
+            messages_ids = self.index.last_messages_ids(limit) if limit > 0 else []
+            return [self.fold_message(mapped, message_id) for message_id in messages_ids]
+
+    def get_messages_between(self, start: datetime, end: datetime) -> list[Message]:
+        """Return messages with ``start <= timestamp <= end``, in timestamp order."""
+        with self.mapped_log() as mapped:
+            return [self.fold_message(mapped, message_id) for message_id in self.index.messages_ids_between(start, end)]
+
+    def has_message(self, message_id: str) -> bool:
+        self.index.refresh()
+        with self.index.reading():
+            return self.index.has_message(message_id)
+
+    def add_react(self, react: React, message_id: str) -> None:
+        if not self.has_message(message_id):
+            raise ValueError(f"Message with id {message_id} is not among registered messages.")
+        self.append_record({"op": "react", "message_id": message_id, "react": react.model_dump(mode="json")})
+        logger.info(f"Added react {react} to message {message_id}.")
+        self.record_garbage()
+
+    def update_message(self, message: Message) -> None:
+        if not self.has_message(message.id):
+            raise ValueError(f"Message with id {message.id} is not among registered messages.")
+        fields = message.model_dump(mode="json", exclude_unset=True, exclude={"id"})
+        self.append_record({"op": "update", "message_id": message.id, "fields": fields})
+        self.record_garbage()
+
+    def record_garbage(self) -> None:
+        self.records_since_compaction += 1
+        if self.records_since_compaction >= self.compaction_interval:
+            self.compact()
+
+    def compact(self) -> None:
+        with self.index.writing():
+            self.index.catch_up()
+            self.write_messages(self.get_messages())
+        logger.info(f"Compacted messages log of conversation {self.conversation_id}.")
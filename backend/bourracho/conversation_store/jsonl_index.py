@@ -0,0 +1,177 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from bourracho import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log (id INTEGER PRIMARY KEY CHECK (id = 0), inode INTEGER, size INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS records (
+    message_id TEXT NOT NULL, offset INTEGER NOT NULL, PRIMARY KEY (message_id, offset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS adds (offset INTEGER PRIMARY KEY, message_id TEXT NOT NULL, timestamp TEXT);
+CREATE INDEX IF NOT EXISTS adds_message_id ON adds (message_id);
+CREATE INDEX IF NOT EXISTS adds_timestamp ON adds (timestamp, offset);
+"""
+
+
+def timestamp_key(timestamp: datetime | str) -> str:
+    """Sortable form of a message timestamp: aware timestamps are converted to naive UTC ones."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.isoformat(timespec="microseconds")
+
+
+class JsonlLogIndex:
+    """Byte-offset index of a JSON lines messages log, kept on disk in a SQLite companion database.
+
+    The index holds the offsets of the records of each message id (``add`` first, then ``react``/``update``) and the
+    offset and timestamp of each ``add`` record, so that lookups neither load the whole index nor scan the log. It
+    also records the inode and the number of log bytes it covers, and catches up by scanning the log past them.
+
+    Writers append to the log inside ``writing``, whose database write lock also serializes writers across processes.
+    """
+
+    def __init__(self, log_filepath: str, index_filepath: str):
+        self.log_filepath = log_filepath
+        self.index_filepath = index_filepath
+        self.connection = sqlite3.connect(
+            index_filepath, timeout=config.JSONL_LOCK_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False
+        )
+        self.connection.executescript(SCHEMA)
+        self.connection.execute("INSERT OR IGNORE INTO log VALUES (0, NULL, 0)")
+        self.lock = threading.RLock()
+        self.depth = 0
+        """Number of nested ``writing`` blocks of the thread holding the lock"""
+
+    @contextmanager
+    def writing(self):
+        """Hold the write lock of the index, shared with other processes, committing the entries added on exit."""
+        with self.lock:
+            if self.depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.connection.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if self.depth == 0:
+                self.connection.execute("COMMIT")
+
+    @contextmanager
+    def reading(self):
+        """Read the index in a transaction, so that writers cannot commit a compaction in between."""
+        with self.lock:
+            if self.depth:
+                yield
+                return
+            self.connection.execute("BEGIN")
+            try:
+                yield
+            finally:
+                self.connection.execute("ROLLBACK")
+
+    @property
+    def state(self) -> tuple[int | None, int]:
+        """Inode of the indexed log and number of bytes indexed."""
+        return self.connection.execute("SELECT inode, size FROM log").fetchone()
+
+    @property
+    def size(self) -> int:
+        return self.state[1]
+
+    def refresh(self) -> None:
+        """Catch up with records appended to the log without being indexed, rebuilding the index for a new log."""
+        if self.is_behind():
+            with self.writing():
+                self.catch_up()
+
+    def is_behind(self) -> bool:
+        stat = os.stat(self.log_filepath) if os.path.exists(self.log_filepath) else None
+        inode, size = self.state
+        if stat is None:
+            return inode is not None
+        return stat.st_ino != inode or stat.st_size != size
+
+    def catch_up(self) -> None:
+        """Index the log past the covered bytes, by a caller holding the write lock."""
+        if not os.path.exists(self.log_filepath):
+            self.reset(inode=None)
+            return
+        stat = os.stat(self.log_filepath)
+        inode, size = self.state
+        if stat.st_ino != inode or stat.st_size < size:
+            self.reset(inode=stat.st_ino)
+            size = 0
+        if stat.st_size > size:
+            self.scan_log(size)
+
+    def reset(self, inode: int | None) -> None:
+        self.connection.execute("DELETE FROM records")
+        self.connection.execute("DELETE FROM adds")
+        self.connection.execute("UPDATE log SET inode = ?, size = 0", (inode,))
+
+    def scan_log(self, offset: int) -> None:
+        with open(self.log_filepath, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self.add_entry(json.loads(line), offset)
+                except (KeyError, ValueError):
+                    logger.warning(f"Skipping corrupted record at offset {offset} of {self.log_filepath}.")
+                offset += len(line)
+        self.connection.execute("UPDATE log SET size = ?", (offset,))
+
+    def add_entry(self, record: dict, offset: int) -> None:
+        if record["op"] != "add":
+            self.connection.execute("INSERT INTO records VALUES (?, ?)", (record["message_id"], offset))
+            return
+        message = record["message"]
+        timestamp = timestamp_key(message["timestamp"]) if message["timestamp"] else None
+        # A message added again replaces the previous one.
+        self.connection.execute("DELETE FROM records WHERE message_id = ?", (message["id"],))
+        self.connection.execute("DELETE FROM adds WHERE message_id = ?", (message["id"],))
+        self.connection.execute("INSERT INTO records VALUES (?, ?)", (message["id"], offset))
+        self.connection.execute("INSERT INTO adds VALUES (?, ?, ?)", (offset, message["id"], timestamp))
+
+    def record_appended(self, record: dict, offset: int, length: int) -> None:
+        """Index a record just appended to the log, by a writer still holding the write lock."""
+        self.add_entry(record, offset)
+        self.connection.execute("UPDATE log SET size = ?", (offset + length,))
+
+    def has_message(self, message_id: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM adds WHERE message_id = ?", (message_id,)).fetchone() is not None
+
+    def message_offsets(self, message_id: str) -> list[int]:
+        """Offsets of the records of a message, its ``add`` record first."""
+        rows = self.connection.execute("SELECT offset FROM records WHERE message_id = ? ORDER BY offset", (message_id,))
+        return [offset for (offset,) in rows]
+
+    def last_messages_ids(self, limit: int) -> list[str]:
+        """Ids of the ``limit`` most recently added messages, oldest first."""
+        rows = self.connection.execute("SELECT message_id FROM adds ORDER BY offset DESC LIMIT ?", (limit,))
+        return [message_id for (message_id,) in rows][::-1]
+
+    def messages_ids_between(self, start: datetime, end: datetime) -> list[str]:
+        """Ids of the messages with ``start <= timestamp <= end``, in timestamp order."""
+        rows = self.connection.execute(
+            "SELECT message_id FROM adds WHERE timestamp BETWEEN ? AND ? ORDER BY timestamp, offset",
+            (timestamp_key(start), timestamp_key(end)),
+        )
+        return [message_id for (message_id,) in rows]
+
+    def close(self) -> None:
+        self.connection.close()
@@ -1,20 +1,16 @@
 from typing import List
 
 from loguru import logger
-from pymongo import MongoClient
 
-from bourracho import config
 from bourracho.conversation_store.abstract_conversation_store import AbstractConversationStore
 from bourracho.models import ConversationMetadata, Message, MongoConversationStoreModel, React
+from bourracho.utils import get_mongo_client
 
 
 class MongoConversationStore(AbstractConversationStore):
     def __init__(self, db_uri: str, conversation_id: str):
         self.conversation_id = conversation_id
-        auth_kgws = {}
-        if config.MONGO_DB_PASSWORD and config.MONGO_DB_USERNAME:
-            auth_kgws = {"username": config.MONGO_DB_USERNAME, "password": config.MONGO_DB_PASSWORD}
-        self.client = MongoClient(config.MONGO_DB_URL, **auth_kgws)
+        self.client = get_mongo_client()
         self.db = self.client[self.conversation_id]
         self.messages_col = self.db[f"messages_{conversation_id}"]
         self.users_col = self.db[f"users_{conversation_id}"]
@@ -1,42 +1,209 @@
-from typing import List
+from collections import Counter
+from datetime import datetime
+from typing import Collection, List
 
 from loguru import logger
-from pymongo import MongoClient
+from pymongo import DESCENDING, UpdateOne
 
 from bourracho import config
-from bourracho.models import Conversation
+from bourracho.cache import TTLCache
+from bourracho.indexes import get_collection
+from bourracho.messages_store import to_message
+from bourracho.models import Conversation, ConversationsPage, ConversationSummary, Message
+from bourracho.utils import decode_cursor, encode_keyset, get_mongo_client, trusted_model
+
+CONVERSATIONS_ACTIVITY_ORDER = [("last_activity", DESCENDING), ("id", DESCENDING)]
+
+
+def activity_query(user_id: str, before: str | None) -> dict:
+    """Build the query matching the user's conversations listed after the ``before`` cursor, by descending activity.
+
+    Conversations without any message have no ``last_activity`` and are listed last.
+    """
+    query = {"users_ids": user_id}
+    if before:
+        last_activity, conversation_id = decode_cursor(before)
+        if last_activity == datetime.min:
+            query.update({"last_activity": None, "id": {"$lt": conversation_id}})
+        else:
+            query["$or"] = [
+                {"last_activity": {"$lt": last_activity}},
+                {"last_activity": last_activity, "id": {"$lt": conversation_id}},
+                {"last_activity": None},
+            ]
+    return query
+
+
+def summary_projection(user_id: str) -> dict:
+    """Projection of conversation documents keeping only the unread counter of ``user_id``."""
+    fields = ["id", "users_ids", "name", "is_locked", "last_message", "last_activity", f"unread_counts.{user_id}"]
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def to_conversation(document: dict) -> Conversation:
+    """Build a conversation from one of our documents, see ``trusted_model``."""
+    return trusted_model(Conversation, document)
+
+
+def to_summary(conversation: dict, user_id: str) -> ConversationSummary:
+    conversation["unread_count"] = conversation.pop("unread_counts", {}).get(user_id, 0)
+    last_message = conversation.get("last_message")
+    conversation["last_message"] = to_message(last_message) if last_message else None
+    conversation.setdefault("last_activity", None)
+    return trusted_model(ConversationSummary, conversation)
+
+
+def to_page(summaries: list[ConversationSummary], limit: int | None) -> ConversationsPage:
+    cursor = None
+    if summaries and limit is not None and len(summaries) == limit:
+        cursor = encode_keyset(summaries[-1].last_activity or datetime.min, summaries[-1].id)
+    return ConversationsPage(conversations=summaries, cursor=cursor)
+
+
+def activity_updates(messages: list[Message], users_ids: frozenset[str]) -> tuple[dict, dict, datetime]:
+    """Build the updates recording new messages of a conversation.
+
+    Returns the update to apply when the newest message is the conversation's latest activity, the update only
+    bumping the revision and members unread counters otherwise, and the newest message timestamp.
+    """
+    latest = max(messages, key=lambda m: (m.timestamp, m.id))
+    issued = Counter(m.issuer_id for m in messages)
+    unread = {f"unread_counts.{uid}": len(messages) - issued[uid] for uid in users_ids if len(messages) > issued[uid]}
+    counters_update = {"$inc": {"revision": 1, **unread}}
+    latest_update = {
+        "$set": {"last_message": latest.model_dump(), "last_activity": latest.timestamp},
+        **counters_update,
+    }
+    return latest_update, counters_update, latest.timestamp
 
 
 class ConversationsStore:
     def __init__(self, db_name: str):
         self.db_name = db_name
-        self.client = MongoClient(config.MONGO_DB_URL)
+        self.client = get_mongo_client()
         self.db = self.client[self.db_name]
-        self.conversations_collection = self.db[config.CONVERSATIONS_COLLECTION]
+        self.conversations_collection = get_collection(self.db, config.CONVERSATIONS_COLLECTION)
+        self.users_ids_cache: TTLCache[str, frozenset[str]] = TTLCache(
+            maxsize=config.MEMBERSHIP_CACHE_SIZE, ttl=config.MEMBERSHIP_CACHE_TTL_SECONDS, name="conversation_members"
+        )
+        """Members of recently checked conversations, keyed by conversation id"""
         logger.info("Successfully initialized Conversations Store")
 
     def add_conversation(self, conversation: Conversation) -> None:
-        Conversation.model_validate(conversation)
         self.conversations_collection.insert_one(conversation.model_dump())
 
     def get_conversation(self, conversation_id: str) -> Conversation:
-        return Conversation.model_validate(self.conversations_collection.find_one({"id": conversation_id}))
+        conversation = self.conversations_collection.find_one({"id": conversation_id})
+        if not conversation:
+            raise ValueError(f"Conversation {conversation_id} does not exist")
+        return to_conversation(conversation)
 
     def get_conversations(self, user_id: str) -> List[Conversation]:
-        return [
-            Conversation.model_validate(c)
-            for c in self.conversations_collection.find({"users_ids": {"$in": [user_id]}})
-        ]
+        return [to_conversation(c) for c in self.conversations_collection.find({"users_ids": {"$in": [user_id]}})]
+
+    def get_conversations_page(
+        self, user_id: str, before: str | None = None, limit: int | None = config.CONVERSATIONS_PAGE_SIZE
+    ) -> ConversationsPage:
+        """Return the user's conversations with their latest message and unread count, most recently active first.
+
+        Without ``limit``, every conversation after ``before`` is returned, in a page without cursor.
+        """
+        conversations = self.conversations_collection.find(
+            activity_query(user_id, before), summary_projection(user_id)
+        ).sort(CONVERSATIONS_ACTIVITY_ORDER)
+        if limit is not None:
+            limit = min(limit, config.CONVERSATIONS_MAX_PAGE_SIZE)
+            conversations = conversations.limit(limit)
+        return to_page([to_summary(c, user_id) for c in conversations], limit)
+
+    def record_messages(self, conversation_id: str, messages: list[Message]) -> None:
+        """Update the conversation latest message, activity and members unread counters after messages were added."""
+        if not messages:
+            return
+        latest_update, counters_update, timestamp = activity_updates(messages, self.get_members(conversation_id))
+        result = self.conversations_collection.update_one(
+            {"id": conversation_id, "last_activity": {"$not": {"$gt": timestamp}}}, latest_update
+        )
+        if result.matched_count == 0:
+            # Messages older than the latest activity only count as unread.
+            self.conversations_collection.update_one({"id": conversation_id}, counters_update)
+
+    def set_unread_counts(
+        self, unread_counts: dict[tuple[str, str], int], revisions: dict[str, int]
+    ) -> list[tuple[str, str]]:
+        """Overwrite unread counters, keyed by (user id, conversation id), in one bulk write.
+
+        A counter is only written while its conversation is still at the revision of ``revisions``, read before
+        counting: a message recorded in between bumped the revision, and its increment must not be overwritten.
+        Returns the keys of the counters left to count again.
+        """
+        unread_counts = {key: count for key, count in unread_counts.items() if key[1] in revisions}
+        if not unread_counts:
+            return []
+        result = self.conversations_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"id": conversation_id, "revision": revisions[conversation_id] or {"$in": [0, None]}},
+                    {"$set": {f"unread_counts.{user_id}": count}},
+                )
+                for (user_id, conversation_id), count in unread_counts.items()
+            ],
+            ordered=False,
+        )
+        if result.matched_count == len(unread_counts):
+            return []
+        current = self.get_revisions({conversation_id for _, conversation_id in unread_counts})
+        return [key for key in unread_counts if key[1] in current and current[key[1]] != revisions[key[1]]]
+
+    def update_last_message(self, message: Message) -> None:
+        """Bump the conversation revision, and refresh its latest message preview when ``message`` is that message."""
+        result = self.conversations_collection.update_one(
+            {"id": message.conversation_id, "last_message.id": message.id},
+            {"$set": {"last_message": message.model_dump()}, "$inc": {"revision": 1}},
+        )
+        if result.matched_count == 0:
+            self.conversations_collection.update_one({"id": message.conversation_id}, {"$inc": {"revision": 1}})
+
+    def get_revision(self, conversation_id: str) -> int | None:
+        """Counter bumped by every change to the conversation or its messages, None when it does not exist."""
+        conversation = self.conversations_collection.find_one({"id": conversation_id}, {"_id": 0, "revision": 1})
+        return None if conversation is None else conversation.get("revision", 0)
+
+    def get_revisions(self, conversation_ids: Collection[str]) -> dict[str, int]:
+        """Revisions of the conversations that exist among ``conversation_ids``."""
+        conversations = self.conversations_collection.find(
+            {"id": {"$in": list(conversation_ids)}}, {"_id": 0, "id": 1, "revision": 1}
+        )
+        return {c["id"]: c.get("revision", 0) for c in conversations}
 
     def get_user_ids(self, conversation_id: str) -> list[str]:
         return self.conversations_collection.find_one({"id": conversation_id}, {"users_ids": 1})["users_ids"]
 
+    def get_members(self, conversation_id: str) -> frozenset[str]:
+        users_ids = self.users_ids_cache.get(conversation_id)
+        if users_ids is None:
+            users_ids = frozenset(self.get_user_ids(conversation_id))
+            self.users_ids_cache.set(conversation_id, users_ids)
+        return users_ids
+
+    def is_member(self, user_id: str, conversation_id: str) -> bool:
+        users_ids = self.users_ids_cache.get(conversation_id)
+        if users_ids is None or user_id not in users_ids:
+            # Members are only ever added, so a cached negative answer may be stale and is re-checked.
+            users_ids = frozenset(self.get_user_ids(conversation_id))
+            self.users_ids_cache.set(conversation_id, users_ids)
+        return user_id in users_ids
+
     def add_user_id_to_conversation(self, user_id: str, conversation_id: str) -> None:
-        self.conversations_collection.update_one({"id": conversation_id}, {"$addToSet": {"users_ids": user_id}})
+        self.conversations_collection.update_one(
+            {"id": conversation_id}, {"$addToSet": {"users_ids": user_id}, "$inc": {"revision": 1}}
+        )
+        self.users_ids_cache.invalidate(conversation_id)
         logger.info(f"Succesfully added user {user_id} to conversation {conversation_id}")
 
     def update_conversation(self, conversation: Conversation) -> None:
         self.conversations_collection.update_one(
-            {"id": conversation.id}, {"$set": conversation.model_dump(exclude_unset=True)}
+            {"id": conversation.id}, {"$set": conversation.model_dump(exclude_unset=True), "$inc": {"revision": 1}}
         )
+        self.users_ids_cache.invalidate(conversation.id)
         logger.info(f"Succesfully updated conversation {conversation.id}")
@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from bourracho import config
+
+
+@lru_cache(maxsize=config.EMOJI_CACHE_SIZE)
+def normalize_emoji(value: str) -> str:
+    """Return the glyph of a single emoji given as a glyph or an ``:alias:``, raising ``ValueError`` otherwise.
+
+    Reacts are stored in this canonical form: the fully qualified glyph, so that variants with or without the U+FE0F
+    variation selector, such as "❤" and "❤️", are stored alike. The lookup is memoized, so only the first occurrence of
+    each value goes through the ``emoji`` library, which is imported on first use.
+    """
+    import emoji
+
+    alias = emoji.demojize(emoji.emojize(value, language="alias"), language="alias")
+    glyph = emoji.emojize(alias, language="alias")
+    if not emoji.is_emoji(glyph):
+        raise ValueError(f"{value!r} is not a single emoji")
+    return glyph
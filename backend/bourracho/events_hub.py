@@ -0,0 +1,204 @@
+import asyncio
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Callable
+
+from loguru import logger
+from pymongo import CursorType
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from bourracho import config
+from bourracho.models import ConversationEvent
+from bourracho.utils import get_blocking_executor
+
+
+class EventsBackend(ABC):
+    @abstractmethod
+    def publish(self, event: ConversationEvent) -> None:
+        """Send an event to every hub sharing this backend."""
+        pass
+
+    @abstractmethod
+    def start(self, dispatch: Callable[[ConversationEvent], None]) -> None:
+        """Start delivering published events to ``dispatch``."""
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stop delivering events."""
+        pass
+
+
+class InMemoryEventsBackend(EventsBackend):
+    """Delivers events to subscribers of the current process only."""
+
+    def __init__(self):
+        self.dispatch: Callable[[ConversationEvent], None] | None = None
+
+    def publish(self, event: ConversationEvent) -> None:
+        if self.dispatch:
+            self.dispatch(event)
+
+    def start(self, dispatch: Callable[[ConversationEvent], None]) -> None:
+        self.dispatch = dispatch
+
+    def close(self) -> None:
+        self.dispatch = None
+
+
+class MongoEventsBackend(EventsBackend):
+    """Shares events between workers through a capped collection tailed by a background thread."""
+
+    def __init__(self, db: Database, collection_name: str = config.EVENTS_COLLECTION):
+        try:
+            db.create_collection(collection_name, capped=True, size=config.EVENTS_COLLECTION_SIZE)
+        except CollectionInvalid:
+            logger.debug(f"Events collection {collection_name} already exists.")
+        self.events_collection = db[collection_name]
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def publish(self, event: ConversationEvent) -> None:
+        self.events_collection.insert_one(event.model_dump())
+
+    def start(self, dispatch: Callable[[ConversationEvent], None]) -> None:
+        self.thread = threading.Thread(target=self._tail, args=(dispatch,), name="bourracho-events", daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        self.stopped.set()
+
+    def _tail(self, dispatch: Callable[[ConversationEvent], None]) -> None:
+        """Dispatch events in the collection's insertion order, resuming after the last one dispatched.
+
+        Event ids come from several workers and are not ordered like insertions, so a new cursor is not filtered on
+        ids: it reads the capped collection from the start and skips the events up to the last one dispatched.
+        """
+        last_event = self.events_collection.find_one(sort=[("$natural", -1)], projection={"_id": 1})
+        last_id = last_event["_id"] if last_event else None
+        while not self.stopped.is_set():
+            try:
+                if last_id is not None and not self.events_collection.count_documents({"_id": last_id}, limit=1):
+                    logger.warning("Events were overwritten in the capped collection before they were dispatched.")
+                    last_id = None
+                skipping = last_id is not None
+                cursor = self.events_collection.find(cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive and not self.stopped.is_set():
+                    for event in cursor:
+                        if skipping:
+                            skipping = event["_id"] != last_id
+                            continue
+                        last_id = event["_id"]
+                        dispatch(ConversationEvent.model_validate(event))
+            except PyMongoError as e:
+                logger.warning(f"Events tailing interrupted: {e}")
+            except Exception as e:
+                # The event is already counted as dispatched, tailing resumes after it.
+                logger.exception(f"Unexpected error while tailing events: {e}")
+            # A tailable cursor dies right away on an empty capped collection.
+            time.sleep(0.1)
+
+
+class Subscription:
+    """Queue of events for one conversation, consumed from the event loop it was created on."""
+
+    def __init__(self, conversation_id: str, maxsize: int = config.EVENTS_QUEUE_SIZE):
+        self.conversation_id = conversation_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[ConversationEvent] = asyncio.Queue(maxsize=maxsize)
+
+    def put(self, event: ConversationEvent) -> None:
+        self.loop.call_soon_threadsafe(self._put_nowait, event)
+
+    def _put_nowait(self, event: ConversationEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning(f"Dropping {event.type} event for slow subscriber of {self.conversation_id}.")
+
+    async def get(self) -> ConversationEvent:
+        return await self.queue.get()
+
+
+class BlockingSubscription:
+    """Queue of events for one conversation, consumed by a thread blocking on it, such as a WSGI worker."""
+
+    def __init__(self, conversation_id: str, maxsize: int = config.EVENTS_QUEUE_SIZE):
+        self.conversation_id = conversation_id
+        self.queue: queue.Queue[ConversationEvent] = queue.Queue(maxsize=maxsize)
+
+    def put(self, event: ConversationEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            logger.warning(f"Dropping {event.type} event for slow subscriber of {self.conversation_id}.")
+
+    def get(self, timeout: float) -> ConversationEvent | None:
+        """Wait for the next event, returning None when none came within ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventsHub:
+    """Fans out conversation events published by the stores registry to in-process subscribers."""
+
+    def __init__(self, backend: EventsBackend):
+        self.backend = backend
+        self.subscriptions: dict[str, set[Subscription | BlockingSubscription]] = defaultdict(set)
+        self.lock = threading.Lock()
+        self.backend.start(self.dispatch)
+
+    def publish(self, event: ConversationEvent) -> None:
+        try:
+            self.backend.publish(event)
+        except Exception as e:
+            logger.error(f"Failed to publish {event.type} event for conversation {event.conversation_id}: {e}")
+
+    async def publish_async(self, event: ConversationEvent) -> None:
+        """``publish`` from an event loop, moving it to a thread when the backend does I/O."""
+        if isinstance(self.backend, InMemoryEventsBackend):
+            self.publish(event)
+        else:
+            await asyncio.get_running_loop().run_in_executor(get_blocking_executor(), self.publish, event)
+
+    def subscribe(self, conversation_id: str, blocking: bool = False) -> Subscription | BlockingSubscription:
+        """Subscribe to a conversation from the running event loop, or from a thread when ``blocking``."""
+        subscription = BlockingSubscription(conversation_id) if blocking else Subscription(conversation_id)
+        with self.lock:
+            self.subscriptions[conversation_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription | BlockingSubscription) -> None:
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.conversation_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscriptions.pop(subscription.conversation_id, None)
+
+    def dispatch(self, event: ConversationEvent) -> None:
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(event.conversation_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put(event)
+            except Exception as e:
+                # Typically the event loop of a subscription left open by a stream that did not clean up.
+                logger.error(f"Dropping subscription to {event.conversation_id} that failed to take an event: {e}")
+                self.unsubscribe(subscription)
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def get_events_backend(db: Database) -> EventsBackend:
+    if config.EVENTS_BACKEND == "memory":
+        return InMemoryEventsBackend()
+    if config.EVENTS_BACKEND == "mongo":
+        return MongoEventsBackend(db)
+    raise ValueError(f"Unknown events backend {config.EVENTS_BACKEND}")
@@ -0,0 +1,254 @@
+from typing import Iterable, Iterator
+
+from loguru import logger
+from pymongo import ASCENDING, DESCENDING, DeleteMany, DeleteOne, IndexModel, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.cursor import AsyncCursor
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.collection import Collection
+from pymongo.cursor import Cursor
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+from bourracho import config
+
+INDEXES: dict[str, list[IndexModel]] = {
+    config.CONVERSATIONS_COLLECTION: [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("users_ids", ASCENDING)]),
+        IndexModel([("users_ids", ASCENDING), ("last_activity", DESCENDING), ("id", DESCENDING)]),
+    ],
+    config.MESSAGES_COLLECTION: [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("conversation_id", ASCENDING), ("timestamp", ASCENDING), ("id", ASCENDING)]),
+    ],
+    config.READ_MARKERS_COLLECTION: [
+        IndexModel([("user_id", ASCENDING), ("conversation_id", ASCENDING)], unique=True),
+    ],
+    config.USERS_COLLECTION: [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+}
+"""Indexes needed by the stores queries, per collection"""
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class MissingIndexError(Exception):
+    pass
+
+
+class CollectionScanError(Exception):
+    pass
+
+
+def ensure_indexes(db: Database) -> None:
+    """Create every declared index. Existing identical indexes are left untouched.
+
+    Failing to build a unique index is fatal, the stores relying on it to reject duplicates. Other indexes only speed
+    queries up, so a failed build is logged.
+    """
+    for collection_name, indexes in INDEXES.items():
+        names = []
+        for index in indexes:
+            try:
+                names.append(create_index(db[collection_name], index))
+            except OperationFailure as e:
+                if index.document.get("unique"):
+                    raise
+                logger.error(f"Failed to create index {index.document['name']} on collection {collection_name}: {e}")
+        logger.info(f"Ensured indexes {names} on collection {collection_name}.")
+
+
+def create_index(collection: Collection, index: IndexModel) -> str:
+    """Create the index, renaming the duplicate usernames left by older versions if they prevent building it."""
+    try:
+        return collection.create_indexes([index])[0]
+    except OperationFailure as e:
+        is_username_index = collection.name == config.USERS_COLLECTION and list(index.document["key"]) == ["username"]
+        if e.code != DUPLICATE_KEY_ERROR or not is_username_index:
+            raise
+    rename_duplicate_usernames(collection)
+    return collection.create_indexes([index])[0]
+
+
+def rename_duplicate_usernames(collection: Collection) -> None:
+    """Keep the username of the oldest user of each duplicated username, suffixing the others with their id."""
+    duplicates = collection.aggregate(
+        [
+            {"$sort": {"_id": ASCENDING}},
+            {"$group": {"_id": "$username", "ids": {"$push": "$id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ]
+    )
+    for duplicate in duplicates:
+        for user_id in duplicate["ids"][1:]:
+            username = f"{duplicate['_id']}~{user_id}"
+            collection.update_one({"id": user_id}, {"$set": {"username": username}})
+            logger.warning(f"Renamed duplicate user {user_id} from {duplicate['_id']} to {username}.")
+
+
+def check_unique_indexes(db: Database) -> None:
+    """Raise ``MissingIndexError`` if a declared unique index is missing, when indexes are not ensured on startup."""
+    for collection_name, indexes in INDEXES.items():
+        existing = [
+            list(info["key"]) for info in db[collection_name].index_information().values() if info.get("unique")
+        ]
+        for index in indexes:
+            if index.document.get("unique") and list(index.document["key"].items()) not in existing:
+                raise MissingIndexError(f"Unique index {index.document['name']} is missing on {collection_name}")
+
+
+def plan_stages(plan: dict) -> Iterator[str]:
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("queryPlan", "inputStage"):
+        if key in plan:
+            yield from plan_stages(plan[key])
+    for input_stage in plan.get("inputStages", []):
+        yield from plan_stages(input_stage)
+
+
+def check_plan(explanation: dict, collection_name: str, operation: str) -> None:
+    if "COLLSCAN" in plan_stages(explanation["queryPlanner"]["winningPlan"]):
+        raise CollectionScanError(f"{operation} on collection {collection_name} is a collection scan")
+
+
+def update_command(collection_name: str, filter: dict, update, multi: bool = False) -> dict:
+    return {"update": collection_name, "updates": [{"q": filter, "u": update, "multi": multi}]}
+
+
+def bulk_write_commands(collection_name: str, requests: Iterable) -> Iterator[tuple[dict, str]]:
+    """Commands to explain for the requests of a bulk write, inserts reading nothing."""
+    for request in requests:
+        # Write requests do not expose their filter publicly
+        if isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+            yield (
+                update_command(collection_name, request._filter, request._doc, isinstance(request, UpdateMany)),
+                "bulk_write",
+            )
+        elif isinstance(request, (DeleteOne, DeleteMany)):
+            limit = 0 if isinstance(request, DeleteMany) else 1
+            yield {"delete": collection_name, "deletes": [{"q": request._filter, "limit": limit}]}, "bulk_write"
+
+
+class PlanCheckingCursor:
+    """Cursor proxy explaining the query right before it is first iterated."""
+
+    def __init__(self, cursor: Cursor | AsyncCursor):
+        self.cursor = cursor
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        def chained(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            return self if result is self.cursor else result
+
+        return chained
+
+    def __iter__(self):
+        check_plan(self.cursor.clone().explain(), self.cursor.collection.name, "find")
+        return iter(self.cursor)
+
+    def __aiter__(self):
+        return self._checked_documents()
+
+    async def _checked_documents(self):
+        check_plan(await self.cursor.clone().explain(), self.cursor.collection.name, "find")
+        async for document in self.cursor:
+            yield document
+
+
+class PlanCheckingCollection:
+    """Collection proxy raising ``CollectionScanError`` whenever a read or update would scan the collection.
+
+    Inserts read nothing and are passed through.
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def __getattr__(self, name: str):
+        return getattr(self.collection, name)
+
+    def find(self, *args, **kwargs) -> PlanCheckingCursor:
+        return PlanCheckingCursor(self.collection.find(*args, **kwargs))
+
+    def find_one(self, filter=None, *args, **kwargs) -> dict | None:
+        return next(iter(self.find(filter, *args, **kwargs).limit(-1)), None)
+
+    def count_documents(self, filter: dict, **kwargs) -> int:
+        self._explain_command({"count": self.collection.name, "query": filter}, "count_documents")
+        return self.collection.count_documents(filter, **kwargs)
+
+    def update_one(self, filter: dict, update, *args, **kwargs):
+        self._explain_command(update_command(self.collection.name, filter, update), "update_one")
+        return self.collection.update_one(filter, update, *args, **kwargs)
+
+    def update_many(self, filter: dict, update, *args, **kwargs):
+        self._explain_command(update_command(self.collection.name, filter, update, multi=True), "update_many")
+        return self.collection.update_many(filter, update, *args, **kwargs)
+
+    def bulk_write(self, requests: list, *args, **kwargs):
+        for command, operation in bulk_write_commands(self.collection.name, requests):
+            self._explain_command(command, operation)
+        return self.collection.bulk_write(requests, *args, **kwargs)
+
+    def _explain_command(self, command: dict, operation: str) -> None:
+        check_plan(self.collection.database.command("explain", command), self.collection.name, operation)
+
+
+class AsyncPlanCheckingCollection:
+    """``PlanCheckingCollection`` of the async stores."""
+
+    def __init__(self, collection: AsyncCollection):
+        self.collection = collection
+
+    def __getattr__(self, name: str):
+        return getattr(self.collection, name)
+
+    def find(self, *args, **kwargs) -> PlanCheckingCursor:
+        return PlanCheckingCursor(self.collection.find(*args, **kwargs))
+
+    async def find_one(self, filter=None, *args, **kwargs) -> dict | None:
+        async for document in self.find(filter, *args, **kwargs).limit(-1):
+            return document
+        return None
+
+    async def count_documents(self, filter: dict, **kwargs) -> int:
+        await self._explain_command({"count": self.collection.name, "query": filter}, "count_documents")
+        return await self.collection.count_documents(filter, **kwargs)
+
+    async def update_one(self, filter: dict, update, *args, **kwargs):
+        await self._explain_command(update_command(self.collection.name, filter, update), "update_one")
+        return await self.collection.update_one(filter, update, *args, **kwargs)
+
+    async def update_many(self, filter: dict, update, *args, **kwargs):
+        await self._explain_command(update_command(self.collection.name, filter, update, multi=True), "update_many")
+        return await self.collection.update_many(filter, update, *args, **kwargs)
+
+    async def bulk_write(self, requests: list, *args, **kwargs):
+        for command, operation in bulk_write_commands(self.collection.name, requests):
+            await self._explain_command(command, operation)
+        return await self.collection.bulk_write(requests, *args, **kwargs)
+
+    async def _explain_command(self, command: dict, operation: str) -> None:
+        check_plan(await self.collection.database.command("explain", command), self.collection.name, operation)
+
+
+def get_collection(db: Database, collection_name: str) -> Collection:
+    """Return the collection, wrapped to verify query plans when ``MONGO_CHECK_QUERY_PLANS`` is on."""
+    if config.MONGO_CHECK_QUERY_PLANS:
+        return PlanCheckingCollection(db[collection_name])
+    return db[collection_name]
+
+
+def get_async_collection(db: AsyncDatabase, collection_name: str) -> AsyncCollection:
+    """Async counterpart of ``get_collection``."""
+    if config.MONGO_CHECK_QUERY_PLANS:
+        return AsyncPlanCheckingCollection(db[collection_name])
+    return db[collection_name]
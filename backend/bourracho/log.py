@@ -0,0 +1,87 @@
+import atexit
+import queue
+import random
+import sys
+import threading
+from typing import Callable, TextIO
+
+from loguru import logger
+
+from bourracho import config
+
+
+class SampledLogger:
+    """Forward a ``rate`` share of records to loguru, for logs written by every request.
+
+    Messages take ``{}`` placeholders rather than f-strings: loguru formats the arguments only for records that are
+    kept and above the configured level.
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+
+    def sampled(self) -> bool:
+        return self.rate >= 1 or random.random() < self.rate
+
+    def debug(self, message: str, *args, **kwargs) -> None:
+        if self.sampled():
+            logger.opt(depth=1).debug(message, *args, **kwargs)
+
+    def info(self, message: str, *args, **kwargs) -> None:
+        if self.sampled():
+            logger.opt(depth=1).info(message, *args, **kwargs)
+
+
+hot_logger = SampledLogger(config.LOG_HOT_SAMPLE_RATE)
+
+
+def text_format(record: dict) -> str:
+    context = " | {extra}" if record["extra"] else ""
+    return (
+        "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+        "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+        f"{context}\n{{exception}}"
+    )
+
+
+class QueueSink:
+    """Loguru sink handing formatted records to a background thread, so logging never waits on the stream.
+
+    Records are dropped, and counted in ``dropped``, while ``maxsize`` records are already waiting.
+    """
+
+    def __init__(self, stream: TextIO, maxsize: int):
+        self.stream = stream
+        self.queue: queue.Queue[str] = queue.Queue(maxsize)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name="bourracho-log-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.queue.join)
+
+    def write(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            message = self.queue.get()
+            try:
+                self.stream.write(message)
+                if self.queue.empty():
+                    self.stream.flush()
+            finally:
+                self.queue.task_done()
+
+
+def configure_logging(patcher: Callable[[dict], None] | None = None) -> None:
+    """Replace loguru's default sink.
+
+    Records are written to stderr by a ``QueueSink`` unless ``LOG_QUEUE_SIZE`` is 0. ``LOG_JSON`` writes one JSON
+    object per record, with the bound context in ``extra``. ``patcher`` can add context to every record.
+    """
+    logger.remove()
+    logger.configure(patcher=patcher)
+    sink = QueueSink(sys.stderr, config.LOG_QUEUE_SIZE).write if config.LOG_QUEUE_SIZE else sys.stderr
+    logger.add(sink, level=config.LOG_LEVEL, format=text_format, serialize=config.LOG_JSON)
@@ -1,47 +1,197 @@
-from typing import List
+from datetime import datetime
+from typing import Collection, List, Literal
 
 from loguru import logger
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 
 from bourracho import config
-from bourracho.models import Message, React
+from bourracho.indexes import get_collection
+from bourracho.log import hot_logger
+from bourracho.models import Message, MessagesPage, React
+from bourracho.utils import (
+    decode_cursor,
+    encode_cursor,
+    encode_keyset,
+    get_mongo_client,
+    model_field_names,
+    trusted_model,
+)
+
+MESSAGES_ORDER = [("timestamp", ASCENDING), ("id", ASCENDING)]
+MESSAGES_REVERSE_ORDER = [("timestamp", DESCENDING), ("id", DESCENDING)]
+
+
+def keyset_query(conversation_id: str, cursor: str | None, operator: Literal["$gt", "$lt"]) -> dict:
+    """Build the query matching messages strictly after (``$gt``) or before (``$lt``) the cursor."""
+    return position_query(conversation_id, decode_cursor(cursor) if cursor else None, operator)
+
+
+def position_query(
+    conversation_id: str, position: tuple[datetime, str] | None, operator: Literal["$gt", "$lt"]
+) -> dict:
+    query = {"conversation_id": conversation_id}
+    if position:
+        timestamp, message_id = position
+        query["$or"] = [{"timestamp": {operator: timestamp}}, {"timestamp": timestamp, "id": {operator: message_id}}]
+    return query
+
+
+def message_projection(fields: Collection[str] | None) -> dict:
+    """Projection of message documents on ``fields``, all of them by default.
+
+    The ``id`` and ``timestamp`` fields are always kept, cursors are built from them.
+    """
+    if fields is None:
+        fields = model_field_names(Message)
+    unknown = set(fields) - model_field_names(Message)
+    if unknown:
+        raise ValueError(f"Unknown message fields: {', '.join(sorted(unknown))}")
+    return {"_id": 0, **dict.fromkeys([*fields, "id", "timestamp"], 1)}
+
+
+def documents_cursor(documents: list[dict], since: str | None) -> str | None:
+    return encode_keyset(documents[-1]["timestamp"], documents[-1]["id"]) if documents else since
+
+
+def to_message(document: dict) -> Message:
+    """Build a message from one of our documents, see ``trusted_model``."""
+    document["reacts"] = [trusted_model(React, react) for react in document.get("reacts", [])]
+    return trusted_model(Message, document)
+
+
+def react_update_pipeline(react: React) -> list[dict]:
+    """Update pipeline replacing the issuer's previous react and recomputing per-emoji counts in one atomic write."""
+    other_reacts = {
+        "$filter": {"input": {"$ifNull": ["$reacts", []]}, "cond": {"$ne": ["$$this.issuer_id", react.issuer_id]}}
+    }
+    emoji_count = {"$size": {"$filter": {"input": "$reacts", "cond": {"$eq": ["$$this.emoji", "$$emoji"]}}}}
+    return [
+        {"$set": {"reacts": {"$concatArrays": [other_reacts, {"$literal": [react.model_dump()]}]}}},
+        {
+            "$set": {
+                "react_counts": {
+                    "$arrayToObject": {
+                        "$map": {
+                            "input": {"$setUnion": ["$reacts.emoji"]},
+                            "as": "emoji",
+                            "in": {"k": "$$emoji", "v": emoji_count},
+                        }
+                    }
+                }
+            }
+        },
+    ]
 
 
 class MessagesStore:
     def __init__(self, db_name: str):
         self.db_name = db_name
-        self.client = MongoClient(config.MONGO_DB_URL)
+        self.client = get_mongo_client()
         self.db = self.client[self.db_name]
-        self.messages_collection = self.db[config.MESSAGES_COLLECTION]
+        self.messages_collection = get_collection(self.db, config.MESSAGES_COLLECTION)
         logger.debug("Initialized MessagesStore")
 
     def add_message(self, message: Message) -> None:
-        Message.model_validate(message)
+        """Insert a message, validated by the caller."""
         self.messages_collection.insert_one(message.model_dump())
 
+    def add_messages(
+        self, messages: list[Message], chunk_size: int = config.MESSAGES_BULK_CHUNK_SIZE
+    ) -> dict[int, str]:
+        """Insert already validated messages with unordered ``insert_many`` batches.
+
+        Returns the errors of the messages that could not be inserted, keyed by their position in ``messages``.
+        """
+        errors = {}
+        for start in range(0, len(messages), chunk_size):
+            chunk = messages[start : start + chunk_size]
+            try:
+                self.messages_collection.insert_many([m.model_dump() for m in chunk], ordered=False)
+            except BulkWriteError as e:
+                errors.update({start + error["index"]: error["errmsg"] for error in e.details["writeErrors"]})
+        return errors
+
     def update_message(self, message: Message) -> None:
         self.messages_collection.update_one({"id": message.id}, {"$set": message.model_dump(exclude_unset=True)})
 
     def get_messages(self, conversation_id: str) -> List[Message]:
-        return [Message.model_validate(m) for m in self.messages_collection.find({"conversation_id": conversation_id})]
+        return [to_message(m) for m in self.messages_collection.find({"conversation_id": conversation_id})]
+
+    def get_messages_since(
+        self,
+        conversation_id: str,
+        since: str | None = None,
+        after_id: str | None = None,
+        limit: int = config.MESSAGES_PAGE_SIZE,
+    ) -> MessagesPage:
+        """Return messages posted after ``since`` cursor (or after message ``after_id``), oldest first."""
+        if not since and after_id:
+            since = encode_cursor(self.get_message(after_id))
+        query = keyset_query(conversation_id, since, "$gt")
+        limit = min(limit, config.MESSAGES_MAX_PAGE_SIZE)
+        messages = [to_message(m) for m in self.messages_collection.find(query).sort(MESSAGES_ORDER).limit(limit)]
+        return MessagesPage(messages=messages, cursor=encode_cursor(messages[-1]) if messages else since)
+
+    def get_message_documents(
+        self,
+        conversation_id: str,
+        since: str | None = None,
+        after_id: str | None = None,
+        limit: int | None = None,
+        fields: Collection[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Return the raw documents of messages posted after ``since`` (or after ``after_id``), oldest first.
+
+        Documents are projected on ``fields`` by Mongo and are not turned into models. All messages are returned when
+        ``limit`` is None. The cursor points to the last document, as with ``get_messages_since``.
+        """
+        if not since and after_id:
+            since = encode_cursor(self.get_message(after_id))
+        query = keyset_query(conversation_id, since, "$gt")
+        documents = self.messages_collection.find(query, message_projection(fields)).sort(MESSAGES_ORDER)
+        if limit:
+            documents = documents.limit(min(limit, config.MESSAGES_MAX_PAGE_SIZE))
+        documents = list(documents)
+        return documents, documents_cursor(documents, since)
+
+    def get_messages_page(
+        self, conversation_id: str, before: str | None = None, limit: int = config.MESSAGES_PAGE_SIZE
+    ) -> MessagesPage:
+        """Return messages posted before ``before`` cursor, newest first.
+
+        The returned cursor points to the oldest message of the page and is ``None`` once history is exhausted.
+        """
+        query = keyset_query(conversation_id, before, "$lt")
+        limit = min(limit, config.MESSAGES_MAX_PAGE_SIZE)
+        messages = [
+            to_message(m) for m in self.messages_collection.find(query).sort(MESSAGES_REVERSE_ORDER).limit(limit)
+        ]
+        return MessagesPage(messages=messages, cursor=encode_cursor(messages[-1]) if len(messages) == limit else None)
+
+    def count_messages_after(
+        self, conversation_id: str, position: tuple[datetime, str] | None, excluded_issuer_id: str | None = None
+    ) -> int:
+        """Count messages after the (timestamp, id) ``position``, with a range scan of the conversation index."""
+        query = position_query(conversation_id, position, "$gt")
+        if excluded_issuer_id:
+            query["issuer_id"] = {"$ne": excluded_issuer_id}
+        return self.messages_collection.count_documents(query)
 
     def get_message(self, message_id: str) -> Message:
-        return Message.model_validate(self.messages_collection.find_one({"id": message_id}))
+        message = self.messages_collection.find_one({"id": message_id})
+        if not message:
+            raise ValueError(f"Message {message_id} does not exist")
+        return to_message(message)
 
     def add_react(self, react: React, message_id: str) -> None:
-        message_reacts = self.get_reacts(message_id=message_id)
-        if any(r.issuer_id == react.issuer_id for r in message_reacts):
-            logger.debug("Removing previous reaction for user %s", react.issuer_id)
-            message_reacts.pop(message_reacts.index(next(r for r in message_reacts if r.issuer_id == react.issuer_id)))
-        message_reacts.append(react)
-        self.messages_collection.update_one(
-            {"id": message_id},
-            {"$set": {"reacts": [mr.model_dump() for mr in message_reacts]}},
-        )
-        logger.info(f"Added react {react} to message {message_id}.")
+        result = self.messages_collection.update_one({"id": message_id}, react_update_pipeline(react))
+        if result.matched_count == 0:
+            raise ValueError(f"Message {message_id} does not exist")
+        hot_logger.info("Added react {} to message {}.", react.emoji, message_id)
 
     def get_reacts(self, message_id: str) -> List[React]:
         message = self.messages_collection.find_one({"id": message_id})
         if not message:
             raise ValueError(f"Message {message_id} does not exist")
-        return [React.model_validate(r) for r in message["reacts"]]
+        return [trusted_model(React, react) for react in message["reacts"]]
@@ -0,0 +1,150 @@
+import bisect
+import threading
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Protocol
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Thread-safe histogram of durations in seconds, per label values, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+        """Per label values, the count of each bucket (last one is +Inf) and the sum of observations"""
+        self.lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        with self.lock:
+            counts, total = self.series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def count(self, labels: tuple[str, ...]) -> int:
+        with self.lock:
+            return sum(self.series[labels][0]) if labels in self.series else 0
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {labels: (list(counts), total[0]) for labels, (counts, total) in self.series.items()}
+        for labels, (counts, total) in sorted(series.items()):
+            label_text = ",".join(f'{name}="{escape(value)}"' for name, value in zip(self.labels, labels, strict=True))
+            bucket_prefix = f"{label_text}," if label_text else ""
+            cumulative = 0
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], counts, strict=True):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{bucket_prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Cache(Protocol):
+    stats: dict[str, int]
+
+
+class CacheStats:
+    """Hits, misses and sizes of the live caches, summed per cache name, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.caches: weakref.WeakKeyDictionary[Cache, str] = weakref.WeakKeyDictionary()
+        """Name of each registered cache, forgotten along with the cache"""
+        self.lock = threading.Lock()
+
+    def register(self, name: str, cache: Cache) -> None:
+        with self.lock:
+            self.caches[cache] = name
+
+    def totals(self) -> dict[str, dict[str, int]]:
+        with self.lock:
+            caches = list(self.caches.items())
+        totals: dict[str, dict[str, int]] = {}
+        for cache, name in caches:
+            total = totals.setdefault(name, {"hits": 0, "misses": 0, "size": 0})
+            for key, value in cache.stats.items():
+                total[key] += value
+        return totals
+
+    def render(self) -> str:
+        totals = sorted(self.totals().items())
+        lines = []
+        for stat, kind, documentation in (
+            ("hits", "counter", "Lookups answered by the cache."),
+            ("misses", "counter", "Lookups missing from the cache or expired."),
+            ("size", "gauge", "Entries held by the cache."),
+        ):
+            name = f"bourracho_cache_{stat}_total" if kind == "counter" else f"bourracho_cache_{stat}"
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [f'{name}{{cache="{escape(cache)}"}} {total[stat]}' for cache, total in totals]
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """Time spent by the current request in Mongo commands."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.mongo_seconds = 0.0
+        self.mongo_commands = 0
+
+
+current_timings: ContextVar[RequestTimings | None] = ContextVar("current_timings", default=None)
+
+http_requests = Histogram(
+    "bourracho_http_request_duration_seconds", "Duration of HTTP requests.", ("method", "endpoint", "status")
+)
+mongo_commands = Histogram(
+    "bourracho_mongo_command_duration_seconds", "Duration of Mongo commands.", ("collection", "command", "outcome")
+)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Record the duration of every Mongo command, per collection and command name.
+
+    pymongo calls listeners in the thread running the command, so the time is also added to the ``current_timings``
+    of the request issuing it.
+    """
+
+    def __init__(self):
+        self.collections: dict[tuple, str] = {}
+        """Collection of the commands in flight, keyed by connection and request id"""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        self.collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ""
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.record(event, "ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.record(event, "failed")
+
+    def record(self, event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent, outcome: str) -> None:
+        collection = self.collections.pop((event.connection_id, event.request_id), "")
+        seconds = event.duration_micros / 1e6
+        mongo_commands.observe((collection, event.command_name, outcome), seconds)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.mongo_seconds += seconds
+            timings.mongo_commands += 1
+
+
+command_listener = MongoCommandListener()
+cache_stats = CacheStats()
+
+
+def render_metrics() -> str:
+    return http_requests.render() + mongo_commands.render() + cache_stats.render()
@@ -1,8 +1,13 @@
 from datetime import datetime
 from typing import Annotated, Literal
 
-import emoji as emj
-from pydantic import AfterValidator, BaseModel, field_serializer
+from pydantic import AfterValidator, BaseModel, Field, PlainSerializer
+
+from bourracho.emojis import normalize_emoji
+from bourracho.timestamps import as_utc, to_naive_utc
+
+Timestamp = Annotated[datetime, AfterValidator(to_naive_utc), PlainSerializer(as_utc, when_used="json")]
+"""Datetime held as naive UTC, like the ones read from Mongo, and rendered to JSON with its UTC offset"""
 
 
 class UserPayload(BaseModel):
@@ -18,22 +23,63 @@ class User(BaseModel):
     location: str | None = None
 
 
+class UserProfile(BaseModel):
+    """Public part of a ``User``, without credentials."""
+
+    id: str
+    username: str
+    pseudo: str | None = None
+    location: str | None = None
+
+
 class React(BaseModel):
-    emoji: Annotated[str, AfterValidator(lambda s: emj.emojize(s))]
+    emoji: Annotated[str, AfterValidator(normalize_emoji)]
     issuer_id: str | None = None
 
-    @field_serializer("emoji")
-    def serialize_emoji(self, emoji: str):
-        return emj.emojize(emoji)
-
 
 class Message(BaseModel):
     id: str = None
     content: str
     conversation_id: str
     issuer_id: str
-    timestamp: datetime = None
+    timestamp: Timestamp = None
     reacts: list[React] = []
+    react_counts: dict[str, int] = {}
+
+
+class MessagesPage(BaseModel):
+    messages: list[Message] = []
+    cursor: str | None = None
+
+
+class BulkItemError(BaseModel):
+    index: int
+    error: str
+
+
+class BulkInsertReport(BaseModel):
+    inserted_ids: list[str] = []
+    errors: list[BulkItemError] = []
+
+
+class ReadMarkerPayload(BaseModel):
+    """Position of the last read message, as a messages cursor or a message id."""
+
+    cursor: str | None = None
+    message_id: str | None = None
+
+
+class ReadState(BaseModel):
+    conversation_id: str
+    cursor: str | None = None
+    unread_count: int = 0
+
+
+class ConversationEvent(BaseModel):
+    type: Literal["message_added", "message_updated", "messages_imported"]
+    conversation_id: str
+    message: Message | None = None
+    """Message added or updated, unset for ``messages_imported`` whose messages are fetched again by subscribers"""
 
 
 class Conversation(BaseModel):
@@ -43,7 +89,42 @@ class Conversation(BaseModel):
     is_locked: bool = True
 
 
+class ConversationSummary(Conversation):
+    """A conversation as listed to one of its members."""
+
+    last_message: Message | None = None
+    last_activity: Timestamp | None = None
+    unread_count: int = 0
+
+
+class ConversationsPage(BaseModel):
+    conversations: list[ConversationSummary]
+    cursor: str | None = None
+
+
+class ConversationMetadata(BaseModel):
+    name: str = "Name me 😘"
+    is_locked: bool = True
+
+
+class JsonConversationStoreModel(BaseModel):
+    type: Literal["json"] = "json"
+    db_dir: str
+    conversation_id: str | None = None
+
+
+class JsonlConversationStoreModel(BaseModel):
+    type: Literal["jsonl"] = "jsonl"
+    db_dir: str
+    conversation_id: str | None = None
+
+
 class MongoConversationStoreModel(BaseModel):
     type: Literal["mongo_db"] = "mongo_db"
     db_uri: str
     conversation_id: str | None = None
+
+
+ConversationStoreModel = Annotated[
+    JsonConversationStoreModel | JsonlConversationStoreModel | MongoConversationStoreModel, Field(discriminator="type")
+]
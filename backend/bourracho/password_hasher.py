@@ -0,0 +1,55 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+
+import bcrypt
+from loguru import logger
+
+from bourracho import config
+
+
+class PasswordHasher:
+    """Hashes and checks passwords with bcrypt on a bounded thread pool.
+
+    bcrypt releases the GIL, so the pool caps how many CPU cores login bursts can take without blocking the event loop
+    of async callers, which await the ``*_async`` methods.
+    """
+
+    def __init__(self, rounds: int = config.BCRYPT_ROUNDS, max_workers: int = config.PASSWORD_HASHER_WORKERS):
+        self.rounds = rounds
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bourracho-bcrypt")
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=self.rounds)).decode("utf-8")
+
+    @staticmethod
+    def _check(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+    def hash(self, password: str) -> str:
+        return self.executor.submit(self._hash, password).result()
+
+    def check(self, password: str, password_hash: str) -> bool:
+        return self.executor.submit(self._check, password, password_hash).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self.executor.submit(self._hash, password))
+
+    async def check_async(self, password: str, password_hash: str) -> bool:
+        return await asyncio.wrap_future(self.executor.submit(self._check, password, password_hash))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether the hash was made with a lower cost than the configured one."""
+        try:
+            return int(password_hash.split("$")[2]) < self.rounds
+        except (IndexError, ValueError):
+            logger.warning("Unrecognized password hash format.")
+            return False
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+@cache
+def get_password_hasher() -> PasswordHasher:
+    return PasswordHasher()
@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime
+from typing import Callable
+
+from loguru import logger
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from bourracho import config
+from bourracho.indexes import get_collection
+from bourracho.utils import get_mongo_client
+
+ReadPosition = tuple[datetime, str]
+"""(timestamp, id) of the last read message"""
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class ReadMarkersStore:
+    """Read markers of users, per conversation, pointing to the last message they have read.
+
+    Markers only move forward. Advances are coalesced in memory, keeping the furthest position per (user,
+    conversation), and written in one bulk write by a background thread every ``flush_interval`` seconds, or as soon as
+    ``flush_size`` markers are pending. ``on_flush`` is called with the markers written by each flush.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        on_flush: Callable[[dict[tuple[str, str], ReadPosition]], None] | None = None,
+        flush_interval: float = config.READ_MARKERS_FLUSH_INTERVAL_SECONDS,
+        flush_size: int = config.READ_MARKERS_FLUSH_SIZE,
+    ):
+        self.db_name = db_name
+        self.client = get_mongo_client()
+        self.db = self.client[self.db_name]
+        self.read_markers_collection = get_collection(self.db, config.READ_MARKERS_COLLECTION)
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.pending: dict[tuple[str, str], ReadPosition] = {}
+        """Markers not written yet, keyed by (user id, conversation id)"""
+        self.lock = threading.Lock()
+        self.flush_requested = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+        logger.info("Successfully initialized Read Markers Store")
+
+    def advance(self, user_id: str, conversation_id: str, position: ReadPosition) -> None:
+        with self.lock:
+            self._advance_pending((user_id, conversation_id), position)
+            pending_count = len(self.pending)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="bourracho-read-markers", daemon=True)
+                self.thread.start()
+        if pending_count >= self.flush_size:
+            self.flush_requested.set()
+
+    def _advance_pending(self, key: tuple[str, str], position: ReadPosition) -> None:
+        if key not in self.pending or self.pending[key] < position:
+            self.pending[key] = position
+
+    def get_position(self, user_id: str, conversation_id: str) -> ReadPosition | None:
+        with self.lock:
+            pending = self.pending.get((user_id, conversation_id))
+        marker = self.read_markers_collection.find_one(
+            {"user_id": user_id, "conversation_id": conversation_id}, {"_id": 0, "timestamp": 1, "message_id": 1}
+        )
+        stored = (marker["timestamp"], marker["message_id"]) if marker else None
+        return max((p for p in (pending, stored) if p), default=None)
+
+    def flush(self) -> int:
+        """Write pending markers, returning how many were written."""
+        with self.lock:
+            markers, self.pending = self.pending, {}
+        if not markers:
+            return 0
+        requests = [
+            UpdateOne(
+                {
+                    "user_id": user_id,
+                    "conversation_id": conversation_id,
+                    "$or": [
+                        {"timestamp": {"$lt": timestamp}},
+                        {"timestamp": timestamp, "message_id": {"$lt": message_id}},
+                    ],
+                },
+                {"$set": {"timestamp": timestamp, "message_id": message_id}},
+                upsert=True,
+            )
+            for (user_id, conversation_id), (timestamp, message_id) in markers.items()
+        ]
+        try:
+            self.read_markers_collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # A stored marker already further ahead does not match its filter, and the upsert hits the unique index.
+            errors = [error for error in e.details["writeErrors"] if error["code"] != DUPLICATE_KEY_ERROR]
+            if errors:
+                logger.error(f"Failed to write {len(errors)} read markers: {errors[0]['errmsg']}")
+        except PyMongoError:
+            with self.lock:
+                for key, position in markers.items():
+                    self._advance_pending(key, position)
+            raise
+        if self.on_flush:
+            self.on_flush(markers)
+        logger.debug(f"Flushed {len(markers)} read markers.")
+        return len(markers)
+
+    def _run(self) -> None:
+        while not self.stopped.is_set():
+            self.flush_requested.wait(self.flush_interval)
+            self.flush_requested.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush read markers: {e}")
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.flush_requested.set()
+        self.flush()
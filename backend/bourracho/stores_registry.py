@@ -1,21 +1,57 @@
+import asyncio
 import random
 import string
 import uuid
-from datetime import datetime
+from datetime import timedelta
+from typing import Collection
 
 from loguru import logger
+from pydantic import ValidationError
+from pymongo import AsyncMongoClient
 
+from bourracho import config
+from bourracho.async_conversations_store import AsyncConversationsStore
+from bourracho.async_messages_store import AsyncMessagesStore
 from bourracho.conversations_store import ConversationsStore
+from bourracho.events_hub import EventsHub, get_events_backend
+from bourracho.indexes import check_unique_indexes, ensure_indexes
+from bourracho.log import hot_logger
 from bourracho.messages_store import MessagesStore
-from bourracho.models import Conversation, Message, React, User
+from bourracho.models import (
+    BulkInsertReport,
+    BulkItemError,
+    Conversation,
+    ConversationEvent,
+    ConversationsPage,
+    Message,
+    MessagesPage,
+    React,
+    ReadState,
+    User,
+    UserProfile,
+)
+from bourracho.read_markers_store import ReadMarkersStore, ReadPosition
+from bourracho.timestamps import utc_now
 from bourracho.users_store import UsersStore
-from bourracho.utils import check_db_connection
+from bourracho.utils import decode_cursor, encode_keyset, get_blocking_executor, mongo_client_kwargs
 
-check_db_connection()
+AsyncStores = tuple[AsyncMessagesStore, AsyncConversationsStore]
+
+
+def release_async_client(loop: asyncio.AbstractEventLoop, client: AsyncMongoClient) -> None:
+    """Close an async client from outside of the event loop it is bound to.
+
+    The client is closed on its loop when the loop still runs. A closed loop already cancelled the client's monitoring
+    tasks, and the client can no longer be closed: dropping it closes its sockets when it is garbage collected.
+    """
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+    elif not loop.is_closed():
+        logger.warning("Dropping an async Mongo client bound to an event loop that is neither running nor closed.")
 
 
 class StoresRegistry:
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, events_hub: EventsHub | None = None):
         self.db_name: str = db_name
         """Name of the database"""
         self.conversations_store: ConversationsStore = ConversationsStore(self.db_name)
@@ -24,21 +60,72 @@ class StoresRegistry:
         """Dict containing for each conversation an entry conversation_id: ConversationStoresModel"""
         self.users_store: UsersStore = UsersStore(self.db_name)
         """Dict containing for each user an entry user_id: User"""
+        self.read_markers_store: ReadMarkersStore = ReadMarkersStore(self.db_name, on_flush=self._refresh_unread_counts)
+        """Last read message of each user, per conversation"""
+        self.events_hub: EventsHub = events_hub or EventsHub(get_events_backend(self.messages_store.db))
+        """Hub pushing message events to conversation subscribers"""
+        self.async_stores_by_loop: tuple[asyncio.AbstractEventLoop, AsyncMongoClient, AsyncStores] | None = None
+        """Stores of the async methods, with their client and the event loop it is bound to"""
+        if config.MONGO_ENSURE_INDEXES:
+            ensure_indexes(self.messages_store.db)
+        else:
+            check_unique_indexes(self.messages_store.db)
+
+    def async_stores(self) -> AsyncStores:
+        """Async stores bound to the running event loop, built again when called from another loop.
+
+        Async Mongo clients cannot be shared between loops: an uvicorn worker runs a single one, while tests and WSGI
+        servers start one per request. The members cache is shared with the sync conversations store.
+        """
+        loop = asyncio.get_running_loop()
+        stores_by_loop = self.async_stores_by_loop
+        if stores_by_loop is None or stores_by_loop[0] is not loop:
+            if stores_by_loop is not None:
+                release_async_client(*stores_by_loop[:2])
+            client = AsyncMongoClient(config.MONGO_DB_URL, **mongo_client_kwargs())
+            conversations_store = AsyncConversationsStore(self.db_name, client=client)
+            conversations_store.users_ids_cache = self.conversations_store.users_ids_cache
+            stores_by_loop = self.async_stores_by_loop = (
+                loop,
+                client,
+                (AsyncMessagesStore(self.db_name, client=client), conversations_store),
+            )
+        return stores_by_loop[2]
+
+    def close(self) -> None:
+        """Stop the background work of the stores, writing pending read markers, and release the async client."""
+        self.read_markers_store.close()
+        self.events_hub.close()
+        if self.async_stores_by_loop is not None:
+            release_async_client(*self.async_stores_by_loop[:2])
+            self.async_stores_by_loop = None
 
     def register_user(self, username: str, password: str) -> User:
         user = self.users_store.get_new_user(username, password)
         self.users_store.add_user(user=user)
         return user
 
+    async def register_user_async(self, username: str, password: str) -> User:
+        """``register_user`` from an event loop, awaiting the password hash instead of blocking a thread on it."""
+        user = await self.users_store.get_new_user_async(username, password)
+        await asyncio.get_running_loop().run_in_executor(get_blocking_executor(), self.users_store.add_user, user)
+        return user
+
     def check_credentials(self, username: str, password: str) -> str | None:
         return self.users_store.check_credentials(username=username, password=password)
 
+    async def check_credentials_async(self, username: str, password: str) -> str | None:
+        return await self.users_store.check_credentials_async(username=username, password=password)
+
     def get_user(self, user_id: str) -> User | None:
         return self.users_store.get_user(user_id=user_id)
 
-    def get_users(self, user_ids: list[str]) -> list[User]:
+    def get_users(self, user_ids: list[str]) -> list[UserProfile]:
         return self.users_store.get_users(user_ids=user_ids)
 
+    def list_users(self, after: str | None = None, limit: int | None = None) -> list[UserProfile]:
+        return self.users_store.list_users(after=after, limit=limit or config.USERS_PAGE_SIZE)
+
     def create_conversation(
         self,
         user_id: str,
@@ -58,37 +145,250 @@ class StoresRegistry:
             raise ValueError("Conversation ID is required to join conversation.")
         self.conversations_store.add_user_id_to_conversation(conversation_id=conversation_id, user_id=user_id)
 
+    def is_member(self, user_id: str, conversation_id: str) -> bool:
+        return self.conversations_store.is_member(user_id, conversation_id)
+
+    async def is_member_async(self, user_id: str, conversation_id: str) -> bool:
+        return await self.async_stores()[1].is_member(user_id, conversation_id)
+
     def list_conversations(self, user_id: str) -> list[Conversation]:
         if not user_id:
             raise ValueError("User ID is required to list conversations.")
         conversations = self.conversations_store.get_conversations(user_id=user_id)
         return conversations
 
+    def get_conversations_page(
+        self, user_id: str, before: str | None = None, limit: int | None = None, paginated: bool = True
+    ) -> ConversationsPage:
+        """Return a page of the user's conversations, or all of them in a single page when not ``paginated``."""
+        if not user_id:
+            raise ValueError("User ID is required to list conversations.")
+        return self.conversations_store.get_conversations_page(
+            user_id=user_id, before=before, limit=(limit or config.CONVERSATIONS_PAGE_SIZE) if paginated else None
+        )
+
+    async def get_conversations_page_async(
+        self, user_id: str, before: str | None = None, limit: int | None = None, paginated: bool = True
+    ) -> ConversationsPage:
+        if not user_id:
+            raise ValueError("User ID is required to list conversations.")
+        return await self.async_stores()[1].get_conversations_page(
+            user_id=user_id, before=before, limit=(limit or config.CONVERSATIONS_PAGE_SIZE) if paginated else None
+        )
+
     def update_conversation(self, conversation: Conversation) -> None:
         self.conversations_store.update_conversation(conversation)
 
     def add_message(self, message: Message):
-        if message.issuer_id not in self.conversations_store.get_user_ids(message.conversation_id):
+        if not self.conversations_store.is_member(message.issuer_id, message.conversation_id):
             raise ValueError(
                 f"User {message.issuer_id} is not among registered user of conversation {message.conversation_id}"
             )
         message.id = message.id or str(uuid.uuid4())
-        message.timestamp = message.timestamp or datetime.now()
+        message.timestamp = message.timestamp or utc_now()
         self.messages_store.add_message(message=message)
-        logger.info(f"Message {message} successfully added.")
+        self.conversations_store.record_messages(conversation_id=message.conversation_id, messages=[message])
+        hot_logger.info("Message {} successfully added.", message.id)
+        self.events_hub.publish(
+            ConversationEvent(type="message_added", conversation_id=message.conversation_id, message=message)
+        )
+
+    async def add_message_async(self, message: Message):
+        messages_store, conversations_store = self.async_stores()
+        if not await conversations_store.is_member(message.issuer_id, message.conversation_id):
+            raise ValueError(
+                f"User {message.issuer_id} is not among registered user of conversation {message.conversation_id}"
+            )
+        message.id = message.id or str(uuid.uuid4())
+        message.timestamp = message.timestamp or utc_now()
+        await messages_store.add_message(message=message)
+        await conversations_store.record_messages(conversation_id=message.conversation_id, messages=[message])
+        hot_logger.info("Message {} successfully added.", message.id)
+        await self.events_hub.publish_async(
+            ConversationEvent(type="message_added", conversation_id=message.conversation_id, message=message)
+        )
+
+    def add_messages(self, conversation_id: str, messages: list[Message | dict]) -> BulkInsertReport:
+        """Insert a batch of messages into a conversation, reporting failures per item instead of aborting."""
+        users_ids = set(self.conversations_store.get_user_ids(conversation_id))
+        # Messages without a timestamp get one millisecond apart, the precision Mongo stores, in the batch order.
+        start = utc_now() - timedelta(milliseconds=len(messages))
+        report = BulkInsertReport()
+        accepted: list[tuple[int, Message]] = []
+        for index, item in enumerate(messages):
+            try:
+                if isinstance(item, dict):
+                    item = {**item, "conversation_id": conversation_id}
+                message = Message.model_validate(item)
+            except ValidationError as e:
+                report.errors.append(BulkItemError(index=index, error=str(e)))
+                continue
+            if message.issuer_id not in users_ids:
+                error = f"User {message.issuer_id} is not among registered user of conversation {conversation_id}"
+                report.errors.append(BulkItemError(index=index, error=error))
+                continue
+            message.conversation_id = conversation_id
+            message.id = message.id or str(uuid.uuid4())
+            message.timestamp = message.timestamp or start + timedelta(milliseconds=index)
+            accepted.append((index, message))
+
+        insert_errors = self.messages_store.add_messages([message for _, message in accepted])
+        inserted: list[Message] = []
+        for position, (index, message) in enumerate(accepted):
+            if position in insert_errors:
+                report.errors.append(BulkItemError(index=index, error=insert_errors[position]))
+                continue
+            report.inserted_ids.append(message.id)
+            inserted.append(message)
+        self.conversations_store.record_messages(conversation_id=conversation_id, messages=inserted)
+        if inserted:
+            # A single event for the whole batch, rather than one write to the events collection per message
+            self.events_hub.publish(ConversationEvent(type="messages_imported", conversation_id=conversation_id))
+        report.errors.sort(key=lambda e: e.index)
+        logger.info(
+            "Added {} messages to conversation {}, {} failed.",
+            len(report.inserted_ids),
+            conversation_id,
+            len(report.errors),
+        )
+        return report
 
     def update_message(self, message: Message):
         self.messages_store.update_message(message=message)
-        logger.info(f"Message {message} successfully updated.")
+        hot_logger.info("Message {} successfully updated.", message.id)
+        self._publish_message_updated(message_id=message.id)
 
     def add_react(self, react: React, message_id: str):
         self.messages_store.add_react(react=react, message_id=message_id)
+        self._publish_message_updated(message_id=message_id)
+
+    def _publish_message_updated(self, message_id: str):
+        message = self.messages_store.get_message(message_id=message_id)
+        self.conversations_store.update_last_message(message=message)
+        self.events_hub.publish(
+            ConversationEvent(type="message_updated", conversation_id=message.conversation_id, message=message)
+        )
 
     def get_messages(self, conversation_id: str) -> list[Message]:
         return self.messages_store.get_messages(conversation_id=conversation_id)
 
+    def get_messages_since(
+        self, conversation_id: str, since: str | None = None, after_id: str | None = None, limit: int | None = None
+    ) -> MessagesPage:
+        return self.messages_store.get_messages_since(
+            conversation_id=conversation_id, since=since, after_id=after_id, limit=limit or config.MESSAGES_PAGE_SIZE
+        )
+
+    async def get_messages_async(self, conversation_id: str) -> list[Message]:
+        return await self.async_stores()[0].get_messages(conversation_id=conversation_id)
+
+    async def get_messages_since_async(
+        self, conversation_id: str, since: str | None = None, after_id: str | None = None, limit: int | None = None
+    ) -> MessagesPage:
+        return await self.async_stores()[0].get_messages_since(
+            conversation_id=conversation_id, since=since, after_id=after_id, limit=limit or config.MESSAGES_PAGE_SIZE
+        )
+
+    def get_message_documents(
+        self,
+        conversation_id: str,
+        since: str | None = None,
+        after_id: str | None = None,
+        limit: int | None = None,
+        fields: Collection[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        """Raw message documents projected on ``fields``, see ``MessagesStore.get_message_documents``.
+
+        Paged like ``get_messages_since`` when ``since``, ``after_id`` or ``limit`` is given, all messages otherwise.
+        """
+        if since or after_id:
+            limit = limit or config.MESSAGES_PAGE_SIZE
+        return self.messages_store.get_message_documents(
+            conversation_id=conversation_id, since=since, after_id=after_id, limit=limit, fields=fields
+        )
+
+    async def get_message_documents_async(
+        self,
+        conversation_id: str,
+        since: str | None = None,
+        after_id: str | None = None,
+        limit: int | None = None,
+        fields: Collection[str] | None = None,
+    ) -> tuple[list[dict], str | None]:
+        if since or after_id:
+            limit = limit or config.MESSAGES_PAGE_SIZE
+        return await self.async_stores()[0].get_message_documents(
+            conversation_id=conversation_id, since=since, after_id=after_id, limit=limit, fields=fields
+        )
+
+    def get_messages_page(
+        self, conversation_id: str, before: str | None = None, limit: int | None = None
+    ) -> MessagesPage:
+        return self.messages_store.get_messages_page(
+            conversation_id=conversation_id, before=before, limit=limit or config.MESSAGES_PAGE_SIZE
+        )
+
     def get_message(self, message_id: str) -> Message:
         return self.messages_store.get_message(message_id=message_id)
 
+    def mark_read(
+        self, user_id: str, conversation_id: str, cursor: str | None = None, message_id: str | None = None
+    ) -> ReadState:
+        """Move the user's read marker forward to the message pointed by ``cursor`` or ``message_id``.
+
+        The marker is written with the next batch of read markers, the returned state already accounts for it.
+        """
+        if not self.conversations_store.is_member(user_id, conversation_id):
+            raise ValueError(f"User {user_id} is not among registered user of conversation {conversation_id}")
+        if cursor:
+            position = decode_cursor(cursor)
+        elif message_id:
+            message = self.messages_store.get_message(message_id=message_id)
+            if message.conversation_id != conversation_id:
+                raise ValueError(f"Message {message_id} does not belong to conversation {conversation_id}")
+            position = (message.timestamp, message.id)
+        else:
+            raise ValueError("A cursor or a message id is required to mark messages as read.")
+        self.read_markers_store.advance(user_id, conversation_id, position)
+        return self.get_read_state(user_id, conversation_id)
+
+    def get_read_state(self, user_id: str, conversation_id: str) -> ReadState:
+        position = self.read_markers_store.get_position(user_id, conversation_id)
+        return ReadState(
+            conversation_id=conversation_id,
+            cursor=encode_keyset(*position) if position else None,
+            unread_count=self.messages_store.count_messages_after(
+                conversation_id, position, excluded_issuer_id=user_id
+            ),
+        )
+
+    def _refresh_unread_counts(self, markers: dict[tuple[str, str], ReadPosition]) -> None:
+        """Reset the unread counters listed with conversations to the messages left after the flushed markers.
+
+        Counters of conversations that received messages while they were counted are counted again.
+        """
+        for _ in range(config.UNREAD_COUNTS_ATTEMPTS):
+            revisions = self.conversations_store.get_revisions({conversation_id for _, conversation_id in markers})
+            unread_counts = {
+                (user_id, conversation_id): self.messages_store.count_messages_after(
+                    conversation_id, position, excluded_issuer_id=user_id
+                )
+                for (user_id, conversation_id), position in markers.items()
+            }
+            stale = self.conversations_store.set_unread_counts(unread_counts, revisions)
+            if not stale:
+                return
+            markers = {key: markers[key] for key in stale}
+        logger.warning(
+            f"Left {len(markers)} unread counters as they were: their conversations kept receiving messages."
+        )
+
     def get_conversation(self, conversation_id: str) -> Conversation:
         return self.conversations_store.get_conversation(conversation_id=conversation_id)
+
+    def get_conversation_revision(self, conversation_id: str) -> int | None:
+        """Version of the conversation and its messages, bumped by every write to either of them."""
+        return self.conversations_store.get_revision(conversation_id)
+
+    async def get_conversation_revision_async(self, conversation_id: str) -> int | None:
+        return await self.async_stores()[1].get_revision(conversation_id)
@@ -0,0 +1,22 @@
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    """Current time as a naive UTC datetime, the form Mongo returns stored datetimes in."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def to_naive_utc(timestamp: datetime | None) -> datetime | None:
+    """Convert an aware datetime to a naive UTC one, naive datetimes being already taken as UTC.
+
+    Timestamps are compared with each other and with the ones read from Mongo, which mixing aware and naive datetimes
+    would break.
+    """
+    if timestamp is None or timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def as_utc(timestamp: datetime | None) -> datetime | None:
+    """Mark a naive UTC datetime as UTC, so that it is rendered with its offset."""
+    return timestamp.replace(tzinfo=timezone.utc) if timestamp is not None else None
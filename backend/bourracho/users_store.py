@@ -1,47 +1,86 @@
+import asyncio
 import uuid
 
-import bcrypt
 from loguru import logger
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 
 from bourracho import config
-from bourracho.models import User
+from bourracho.cache import TTLCache
+from bourracho.indexes import get_collection
+from bourracho.log import hot_logger
+from bourracho.models import User, UserProfile
+from bourracho.password_hasher import PasswordHasher, get_password_hasher
+from bourracho.utils import get_blocking_executor, get_mongo_client
+
+PROFILE_PROJECTION = {"_id": 0, "password_hash": 0}
 
 
 class UsersStore:
-    def __init__(self, db_name: str):
+    def __init__(self, db_name: str, password_hasher: PasswordHasher | None = None):
         self.db_name = db_name
-        self.client = MongoClient(config.MONGO_DB_URL)
+        self.client = get_mongo_client()
         self.db = self.client[self.db_name]
-        self.users_collection = self.db[config.USERS_COLLECTION]
+        self.users_collection = get_collection(self.db, config.USERS_COLLECTION)
+        self.password_hasher = password_hasher or get_password_hasher()
+        self.profiles_cache: TTLCache[str, UserProfile] = TTLCache(
+            maxsize=config.USERS_CACHE_SIZE, ttl=config.USERS_CACHE_TTL_SECONDS, name="user_profiles"
+        )
+        """Profiles of recently fetched users, keyed by user id"""
         logger.info("Successfully initialized Users Store")
 
     @logger.catch
     def get_new_user(self, username: str, password: str) -> User:
-        password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+        password_hash = self.password_hasher.hash(password)
         user = User(id=str(uuid.uuid4()), username=username, password_hash=password_hash)
         return user
 
+    async def get_new_user_async(self, username: str, password: str) -> User:
+        password_hash = await self.password_hasher.hash_async(password)
+        return User(id=str(uuid.uuid4()), username=username, password_hash=password_hash)
+
     @logger.catch
     def check_credentials(self, username: str, password: str) -> str | None:
+        user = self._get_user_by_username(username)
+        if user is None:
+            return None
+        return self._accept_password(user, password, self.password_hasher.check(password, user.password_hash))
+
+    async def check_credentials_async(self, username: str, password: str) -> str | None:
+        """``check_credentials`` awaiting bcrypt on the hasher threads, with Mongo calls on the blocking executor."""
+        loop = asyncio.get_running_loop()
+        user = await loop.run_in_executor(get_blocking_executor(), self._get_user_by_username, username)
+        if user is None:
+            return None
+        valid = await self.password_hasher.check_async(password, user.password_hash)
+        return await loop.run_in_executor(get_blocking_executor(), self._accept_password, user, password, valid)
+
+    def _get_user_by_username(self, username: str) -> User | None:
         db_user = self.users_collection.find_one({"username": username})
         if not db_user:
             logger.info(f"No user found with username {username}")
             return None
-        user = User.model_validate(db_user)
-        logger.info("User found with username {}".format(username))
-        if not bcrypt.checkpw(password.encode("utf-8"), user.password_hash.encode("utf-8")):
-            logger.info(f"Password check failed for user {username}")
+        hot_logger.info("User found with username {}", username)
+        return User.model_validate(db_user)
+
+    def _accept_password(self, user: User, password: str, valid: bool) -> str | None:
+        """Return the id of ``user`` when its password was ``valid``, upgrading its hash if needed."""
+        if not valid:
+            logger.info(f"Password check failed for user {user.username}")
             return None
+        if self.password_hasher.needs_rehash(user.password_hash):
+            # The password is only known at login, upgrade hashes made with a lower cost while we have it.
+            password_hash = self.password_hasher.hash(password)
+            self.users_collection.update_one({"id": user.id}, {"$set": {"password_hash": password_hash}})
+            logger.info(f"Upgraded password hash of user {user.username}")
         return user.id
 
-    @logger.catch
     def add_user(self, user: User) -> None:
-        matching_usernames = self.users_collection.find_one({"username": user.username})
-        if matching_usernames and user.username in matching_usernames:
-            raise ValueError("User with username {} already exists".format(user.username))
+        """Insert ``user``, raising a ValueError when its username is taken, as the unique index enforces."""
         logger.info(f"Adding user with username {user.username} to collection.")
-        self.users_collection.insert_one(user.model_dump())
+        try:
+            self.users_collection.insert_one(user.model_dump())
+        except DuplicateKeyError as e:
+            raise ValueError("User with username {} already exists".format(user.username)) from e
         logger.info(f"User with username {user.username} added to collection.")
 
     @logger.catch
@@ -53,9 +92,26 @@ class UsersStore:
         return User.model_validate(user)
 
     @logger.catch
-    def get_users(self, user_ids: list[str]) -> list[User]:
-        if user_ids == "*":
-            users = self.users_collection.find()
-        else:
-            users = self.users_collection.find({"id": {"$in": user_ids}})
-        return [User.model_validate(user) for user in users]
+    def get_users(self, user_ids: list[str]) -> list[UserProfile]:
+        """Return profiles of known users among ``user_ids``, in order, fetching cache misses with a single query."""
+        profiles = {user_id: self.profiles_cache.get(user_id) for user_id in dict.fromkeys(user_ids)}
+        missing_ids = [user_id for user_id, profile in profiles.items() if profile is None]
+        if missing_ids:
+            for user in self.users_collection.find({"id": {"$in": missing_ids}}, PROFILE_PROJECTION):
+                profile = UserProfile.model_validate(user)
+                self.profiles_cache.set(profile.id, profile)
+                profiles[profile.id] = profile
+        return [profile for profile in profiles.values() if profile is not None]
+
+    @logger.catch
+    def list_users(self, after: str | None = None, limit: int = config.USERS_PAGE_SIZE) -> list[UserProfile]:
+        """Return a page of profiles ordered by id, starting after user id ``after``."""
+        query = {"id": {"$gt": after}} if after else {}
+        limit = min(limit, config.USERS_MAX_PAGE_SIZE)
+        profiles = [
+            UserProfile.model_validate(user)
+            for user in self.users_collection.find(query, PROFILE_PROJECTION).sort("id", 1).limit(limit)
+        ]
+        for profile in profiles:
+            self.profiles_cache.set(profile.id, profile)
+        return profiles
@@ -1,13 +1,99 @@
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import cache
+from typing import TypeVar
+
 from loguru import logger
+from pydantic import BaseModel
 from pymongo import MongoClient
 
 from bourracho import config
+from bourracho.metrics import command_listener
+from bourracho.models import Message
+from bourracho.timestamps import to_naive_utc
+
+Model = TypeVar("Model", bound=BaseModel)
+
+
+def mongo_client_kwargs() -> dict:
+    kwargs = {
+        "maxPoolSize": config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": config.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": config.MONGO_MAX_IDLE_TIME_MS,
+        "serverSelectionTimeoutMS": config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": config.MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": config.MONGO_SOCKET_TIMEOUT_MS,
+    }
+    if config.MONGO_DB_USERNAME and config.MONGO_DB_PASSWORD:
+        kwargs.update(username=config.MONGO_DB_USERNAME, password=config.MONGO_DB_PASSWORD)
+    if config.MONGO_COMMAND_METRICS:
+        kwargs["event_listeners"] = [command_listener]
+    return kwargs
+
+
+@cache
+def get_mongo_client(url: str = config.MONGO_DB_URL) -> MongoClient:
+    """Return the process-wide client for ``url``, so every store shares one connection pool."""
+    logger.debug("Creating Mongo client.")
+    return MongoClient(url, **mongo_client_kwargs())
+
+
+@cache
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Threads shared by async code paths to run blocking calls off the event loop."""
+    return ThreadPoolExecutor(max_workers=config.BLOCKING_THREADS, thread_name_prefix="bourracho-blocking")
 
 
 def check_db_connection():
     try:
-        client = MongoClient(config.MONGO_DB_URL)
+        client = get_mongo_client()
         client.server_info()
         logger.success("Connection to Mongo DB OK.")
     except Exception as e:
         raise ValueError(f"Failed to connect to MongoDB: {e}") from e
+
+
+def encode_cursor(message: Message) -> str:
+    """Build an opaque cursor pointing right after the given message in (timestamp, id) order."""
+    return encode_keyset(message.timestamp, message.id)
+
+
+def encode_keyset(timestamp: datetime, item_id: str) -> str:
+    payload = json.dumps([timestamp.isoformat(), item_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        timestamp, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return to_naive_utc(datetime.fromisoformat(timestamp)), message_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor {cursor}") from e
+
+
+@cache
+def model_field_names(model: type[BaseModel]) -> frozenset[str]:
+    return frozenset(model.model_fields)
+
+
+def trusted_model(model: type[Model], document: dict) -> Model:
+    """Build ``model`` from a document we dumped ourselves, skipping validation when ``config.TRUSTED_READS`` is set.
+
+    ``model_construct`` is pure Python and slower than pydantic-core validation, so the instance state is set
+    directly instead, reusing ``document``. Nested models must already be built. Documents missing fields, written
+    before they were added, go through validation.
+    """
+    document.pop("_id", None)
+    fields = model_field_names(model)
+    if not config.TRUSTED_READS or not document.keys() >= fields:
+        return model.model_validate(document)
+    if len(document) != len(fields):
+        document = {name: document[name] for name in fields}
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", document)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(fields))
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
@@ -1,17 +1,89 @@
+import asyncio
+import atexit
+import threading
 import uuid
-from datetime import datetime
+from typing import Annotated
 
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from loguru import logger
-from ninja import NinjaAPI, Schema
-from pydantic import ValidationError
+from ninja import NinjaAPI, Query, Schema
+from pydantic import TypeAdapter, ValidationError
 
-from bourracho.models import Conversation, Message, UserPayload
+from bourracho import config as stores_config
+from bourracho.log import hot_logger
+from bourracho.metrics import render_metrics
+from bourracho.models import (
+    BulkInsertReport,
+    Conversation,
+    ConversationEvent,
+    ConversationsPage,
+    ConversationSummary,
+    Message,
+    MessagesPage,
+    ReadMarkerPayload,
+    ReadState,
+    UserPayload,
+    UserProfile,
+)
 from bourracho.stores_registry import StoresRegistry
+from bourracho.timestamps import utc_now
+from bourracho.utils import get_blocking_executor, get_mongo_client
 from conversations_api import config
+from conversations_api.auth import AsyncSessionTokenAuth, SessionTokenAuth, SessionTokenQueryAuth
+from conversations_api.etags import content_etag, not_modified, revision_etag, tag
+from conversations_api.renderers import ORJSONRenderer, compact_messages_response, json_response
 
-registry = StoresRegistry(db_name=config.MONGO_DB_NAME)
+registry: StoresRegistry | None = None
+registry_lock = threading.Lock()
 
-api = NinjaAPI()
+
+def get_registry() -> StoresRegistry:
+    """Build the registry on first use, so that importing the API neither connects to Mongo nor starts threads."""
+    global registry
+    if registry is None:
+        with registry_lock:
+            if registry is None:
+                registry = StoresRegistry(db_name=config.MONGO_DB_NAME)
+                atexit.register(registry.close)
+    return registry
+
+
+async def aget_registry() -> StoresRegistry:
+    """``get_registry`` for async views, building the registry off the event loop."""
+    return registry or await sync_to_async(get_registry, thread_sensitive=False, executor=get_blocking_executor())()
+
+
+session_auth = SessionTokenAuth(get_user=lambda user_id: get_registry().get_user(user_id=user_id))
+async_session_auth = AsyncSessionTokenAuth(session_auth)
+hot_endpoints_auth = async_session_auth if config.ASYNC_ENDPOINTS else session_auth
+
+api = NinjaAPI(auth=session_auth, renderer=ORJSONRenderer())
+
+conversation_adapter = TypeAdapter(Conversation)
+messages_adapter = TypeAdapter(list[Message])
+messages_page_adapter = TypeAdapter(MessagesPage)
+conversations_adapter = TypeAdapter(list[ConversationSummary])
+conversations_page_adapter = TypeAdapter(ConversationsPage)
+users_adapter = TypeAdapter(list[UserProfile])
+
+
+def parse_fields(fields: str | None) -> list[str] | None:
+    return [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+
+
+def async_when_configured(async_view):
+    """Route to ``async_view`` instead of the decorated sync view when ``config.ASYNC_ENDPOINTS`` is set.
+
+    Async views skip the hop to a sync worker thread under an ASGI server. Under WSGI every request runs its own
+    event loop, and so builds its own async Mongo client.
+    """
+
+    def choose(sync_view):
+        return async_view if config.ASYNC_ENDPOINTS else sync_view
+
+    return choose
 
 
 class ErrorResponse(Schema):
@@ -25,32 +97,56 @@ class UserResponse(Schema):
     location: str | None = None
 
 
-@api.post("register/", response={200: UserResponse, 401: ErrorResponse, 500: ErrorResponse})
-def register_user(request, user_credentials: UserPayload):
+class SessionResponse(UserResponse):
+    token: str
+
+
+class HealthResponse(Schema):
+    status: str
+
+
+@api.post("register/", auth=None, response={200: SessionResponse, 409: ErrorResponse, 500: ErrorResponse})
+async def register_user(request, user_credentials: UserPayload):
+    """Register a user, hashing its password on the hasher threads without holding a request thread."""
     logger.info("Received request to register user.")
     try:
-        user = registry.register_user(username=user_credentials.username, password=user_credentials.password)
-        logger.info(f"User registered with id: {user.id}")
-        return 200, UserResponse(id=user.id, username=user.username, pseudo=user.pseudo, location=user.location)
-    except KeyError:
-        logger.error(f"User with username {user_credentials.username} already exists")
-        return 401, {"error": "User with username {} already exists".format(user_credentials.username)}
+        registry = await aget_registry()
+        user = await registry.register_user_async(
+            username=user_credentials.username, password=user_credentials.password
+        )
+        logger.info("User registered with id: {}", user.id)
+        token = session_auth.remember(user)
+        return 200, SessionResponse(
+            id=user.id, username=user.username, pseudo=user.pseudo, location=user.location, token=token
+        )
+    except ValueError as e:
+        logger.warning(str(e))
+        return 409, {"error": str(e)}
     except Exception as e:
         logger.error(f"Unexpected error during user registration: {e}")
         return 500, {"error": str(e)}
 
 
-@api.post("login/", response={200: UserResponse, 401: ErrorResponse, 500: ErrorResponse})
-def login(request, user_credentials: UserPayload):
+@api.post("login/", auth=None, response={200: SessionResponse, 401: ErrorResponse, 500: ErrorResponse})
+async def login(request, user_credentials: UserPayload):
+    """Log a user in, checking its password on the hasher threads without holding a request thread."""
     logger.info("Received request to login user.")
     try:
-        user_id = registry.check_credentials(username=user_credentials.username, password=user_credentials.password)
+        registry = await aget_registry()
+        user_id = await registry.check_credentials_async(
+            username=user_credentials.username, password=user_credentials.password
+        )
         if not user_id:
             logger.error(f"Credentials don't match for username {user_credentials.username}")
             return 401, {"error": f"Credentials don't match for username {user_credentials.username}"}
-        logger.info(f"User with id {user_id} logged in.")
-        user = registry.get_user(user_id=user_id)
-        return 200, UserResponse(id=user.id, username=user.username, pseudo=user.pseudo, location=user.location)
+        logger.info("User with id {} logged in.", user_id)
+        user = await sync_to_async(registry.get_user, thread_sensitive=False, executor=get_blocking_executor())(
+            user_id=user_id
+        )
+        token = session_auth.remember(user)
+        return 200, SessionResponse(
+            id=user.id, username=user.username, pseudo=user.pseudo, location=user.location, token=token
+        )
     except ValueError as e:
         return 401, {"error": str(e)}
     except KeyError:
@@ -63,12 +159,12 @@ def login(request, user_credentials: UserPayload):
 
 @api.post("chat/", response={200: Conversation, 422: ErrorResponse, 500: ErrorResponse})
 def create_conversation(request, conversation: Conversation):
-    user_id = request.headers.get("user_id") or request.headers.get("User-Id")
+    user_id = request.auth.id
     logger.info("Received request to create conversation.")
     try:
-        conversation_id = registry.create_conversation(user_id=user_id, conversation=conversation)
-        logger.info(f"Conversation created with id: {conversation_id}")
-        return 200, registry.get_conversation(conversation_id=conversation_id)
+        conversation_id = get_registry().create_conversation(user_id=user_id, conversation=conversation)
+        logger.info("Conversation created with id: {}", conversation_id)
+        return 200, get_registry().get_conversation(conversation_id=conversation_id)
     except ValidationError as ve:
         logger.warning(f"Validation error during conversation creation: {ve}")
         return 422, {"error": f"Validation error: {ve}"}
@@ -79,46 +175,89 @@ def create_conversation(request, conversation: Conversation):
 
 @api.post("chat/{conversation_id}/join", response={200: Conversation, 500: ErrorResponse})
 def join_conversation(request, conversation_id: str):
-    user_id = request.headers.get("user_id") or request.headers.get("User-Id")
+    user_id = request.auth.id
     try:
-        logger.info(f"Received request to join conversation {conversation_id} for user {user_id}.")
-        registry.join_conversation(user_id=user_id, conversation_id=conversation_id)
-        logger.info(f"User {user_id} joined conversation {conversation_id}.")
-        return 200, registry.get_conversation(conversation_id=conversation_id)
+        logger.info("Received request to join conversation {} for user {}.", conversation_id, user_id)
+        get_registry().join_conversation(user_id=user_id, conversation_id=conversation_id)
+        logger.info("User {} joined conversation {}.", user_id, conversation_id)
+        return 200, get_registry().get_conversation(conversation_id=conversation_id)
     except Exception as e:
         logger.error(f"Unexpected error joining conversation {conversation_id} for user {user_id}: {e}")
         return 500, {"error": str(e)}
 
 
-@api.post("chat/{conversation_id}/messages/", response={200: Message, 422: ErrorResponse, 500: ErrorResponse})
+def prepare_message(request, conversation_id: str, message: Message) -> Message:
+    """Complete a posted message, issued by the authenticated user, before it is stored."""
+    hot_logger.info("Received request to post message {} to conversation {}.", message.id, conversation_id)
+    message.issuer_id = request.auth.id
+    message.id = message.id or str(uuid.uuid4())
+    message.timestamp = message.timestamp or utc_now()
+    message = Message.model_validate(message)
+    message.conversation_id = conversation_id
+    return message
+
+
+def post_message_error(conversation_id: str, e: Exception) -> tuple[int, dict]:
+    if isinstance(e, ValidationError):
+        logger.warning(f"Validation error posting message to {conversation_id}: {e}")
+        return 422, {"error": f"Validation error: {e}"}
+    logger.error(f"Unexpected error posting message to {conversation_id}: {e}")
+    return 500, {"error": str(e)}
+
+
+async def post_message_async(request, conversation_id: str, message: Message):
+    try:
+        message = prepare_message(request, conversation_id, message)
+        await (await aget_registry()).add_message_async(message=message)
+        hot_logger.info("Message posted to conversation {}.", conversation_id)
+        return 200, message
+    except Exception as e:
+        return post_message_error(conversation_id, e)
+
+
+@api.post(
+    "chat/{conversation_id}/messages/",
+    auth=hot_endpoints_auth,
+    response={200: Message, 422: ErrorResponse, 500: ErrorResponse},
+)
+@async_when_configured(post_message_async)
 def post_message(request, conversation_id: str, message: Message):
-    user_id = request.headers.get("user_id") or request.headers.get("User-Id")
-    try:
-        logger.info(f"Received request to post message {message} to conversation {conversation_id}.")
-        message.issuer_id = user_id
-        message.id = message.id or str(uuid.uuid4())
-        message.timestamp = message.timestamp or datetime.now()
-        message = Message.model_validate(message)
-        message.conversation_id = conversation_id
-        registry.add_message(message=message)
-        logger.info(f"Message posted to conversation {conversation_id}.")
+    try:
+        message = prepare_message(request, conversation_id, message)
+        get_registry().add_message(message=message)
+        hot_logger.info("Message posted to conversation {}.", conversation_id)
         return 200, message
-    except ValidationError as ve:
-        logger.warning(f"Validation error posting message to {conversation_id}: {ve}")
-        return 422, {"error": f"Validation error: {ve}"}
     except Exception as e:
-        logger.error(f"Unexpected error posting message to {conversation_id}: {e}")
+        return post_message_error(conversation_id, e)
+
+
+@api.post(
+    "chat/{conversation_id}/messages/bulk", response={200: BulkInsertReport, 403: ErrorResponse, 500: ErrorResponse}
+)
+def post_messages(request, conversation_id: str, messages: list[dict]):
+    """Post a batch of messages as the authenticated user, whatever ``issuer_id`` they carry."""
+    user_id = request.auth.id
+    try:
+        hot_logger.info("Received request to post {} messages to conversation {}.", len(messages), conversation_id)
+        if not get_registry().is_member(user_id, conversation_id):
+            return 403, {"error": f"User {user_id} is not a member of conversation {conversation_id}"}
+        report = get_registry().add_messages(
+            conversation_id=conversation_id, messages=[{**message, "issuer_id": user_id} for message in messages]
+        )
+        return 200, report
+    except Exception as e:
+        logger.error(f"Unexpected error posting messages to {conversation_id}: {e}")
         return 500, {"error": str(e)}
 
 
 @api.patch("chat/{conversation_id}", response={200: Conversation, 422: ErrorResponse, 500: ErrorResponse})
 def patch_conversation(request, conversation_id: str, conversation: Conversation):
     try:
-        logger.info(f"Received request to update metadata for conversation {conversation_id}.")
+        hot_logger.info("Received request to update metadata for conversation {}.", conversation_id)
         conversation.id = conversation_id
-        registry.update_conversation(conversation=conversation)
-        logger.info(f"Metadata updated for conversation {conversation_id}.")
-        return 200, registry.get_conversation(conversation_id=conversation_id)
+        get_registry().update_conversation(conversation=conversation)
+        hot_logger.info("Metadata updated for conversation {}.", conversation_id)
+        return 200, get_registry().get_conversation(conversation_id=conversation_id)
     except ValidationError as ve:
         logger.warning(f"Validation error updating metadata for {conversation_id}: {ve}")
         return 422, {"error": f"Validation error: {ve}"}
@@ -127,73 +266,334 @@ def patch_conversation(request, conversation_id: str, conversation: Conversation
         return 500, {"error": str(e)}
 
 
-@api.get("chat/{conversation_id}/messages/", response={200: list[Message], 500: ErrorResponse})
-def get_messages(request, conversation_id: str):
+MessagesLimit = Annotated[int | None, Query(ge=1, le=stores_config.MESSAGES_MAX_PAGE_SIZE)]
+"""Page size of the messages queries"""
+
+
+def messages_query(
+    conversation_id: str,
+    since: str | None,
+    after_id: str | None,
+    limit: int | None,
+    compact: bool,
+    fields: str | None,
+) -> tuple[str, dict]:
+    """Name of the registry method answering a messages query, without its ``_async`` suffix, and its arguments."""
+    hot_logger.info("Received request to get messages for conversation {}.", conversation_id)
+    page = {"conversation_id": conversation_id, "since": since, "after_id": after_id, "limit": limit}
+    if compact or fields:
+        return "get_message_documents", {**page, "fields": parse_fields(fields)}
+    if since or after_id or limit:
+        return "get_messages_since", page
+    return "get_messages", {"conversation_id": conversation_id}
+
+
+def messages_response(
+    conversation_id: str, result: tuple[list[dict], str | None] | MessagesPage | list[Message], query: dict, etag: str
+) -> HttpResponse:
+    """Render the result of the registry method picked by ``messages_query`` in its shape, tagged with ``etag``."""
+    if isinstance(result, tuple):
+        documents, cursor = result
+        hot_logger.info("Fetched {} compact messages for conversation {}.", len(documents), conversation_id)
+        return tag(compact_messages_response(conversation_id, documents, cursor, query["fields"]), etag)
+    if isinstance(result, MessagesPage):
+        hot_logger.info("Fetched {} new messages for conversation {}.", len(result.messages), conversation_id)
+        return tag(json_response(result, messages_page_adapter), etag)
+    hot_logger.info("Fetched {} messages for conversation {}.", len(result), conversation_id)
+    return tag(json_response(result, messages_adapter), etag)
+
+
+def query_error(subject: str, e: Exception) -> tuple[int, dict]:
+    if isinstance(e, ValueError):
+        logger.warning(f"Invalid {subject} query: {e}")
+        return 422, {"error": str(e)}
+    logger.error(f"Error fetching {subject}: {e}")
+    return 500, {"error": str(e)}
+
+
+async def get_messages_async(
+    request,
+    conversation_id: str,
+    since: str | None = None,
+    after_id: str | None = None,
+    limit: MessagesLimit = None,
+    compact: bool = False,
+    fields: str | None = None,
+):
     try:
-        logger.info(f"Received request to get messages for conversation {conversation_id}.")
-        messages = registry.get_messages(conversation_id=conversation_id)
-        logger.info(f"Fetched {len(messages)} messages for conversation {conversation_id}.")
-        return 200, messages
+        method, query = messages_query(conversation_id, since, after_id, limit, compact, fields)
+        registry = await aget_registry()
+        etag = revision_etag(conversation_id, await registry.get_conversation_revision_async(conversation_id))
+        if response := not_modified(request, etag):
+            return response
+        result = await getattr(registry, f"{method}_async")(**query)
+        return messages_response(conversation_id, result, query, etag)
     except Exception as e:
-        logger.error(f"Error fetching messages for conversation {conversation_id}: {e}")
+        return query_error(f"messages of conversation {conversation_id}", e)
+
+
+@api.get(
+    "chat/{conversation_id}/messages/",
+    auth=hot_endpoints_auth,
+    response={200: list[Message] | MessagesPage, 422: ErrorResponse, 500: ErrorResponse},
+)
+@async_when_configured(get_messages_async)
+def get_messages(
+    request,
+    conversation_id: str,
+    since: str | None = None,
+    after_id: str | None = None,
+    limit: MessagesLimit = None,
+    compact: bool = False,
+    fields: str | None = None,
+):
+    """Return the messages of a conversation, all of them or the page after ``since`` or ``after_id``.
+
+    With ``compact``, or a comma separated list of message ``fields`` to return, messages are rendered in the compact
+    shape of ``compact_messages_response``, from documents projected by Mongo.
+
+    Responses carry an ETag derived from the conversation revision, which is read before the messages: a write in
+    between tags newer messages with an older revision, which only costs the next poll a full response.
+    """
+    try:
+        method, query = messages_query(conversation_id, since, after_id, limit, compact, fields)
+        registry = get_registry()
+        etag = revision_etag(conversation_id, registry.get_conversation_revision(conversation_id))
+        if response := not_modified(request, etag):
+            return response
+        return messages_response(conversation_id, getattr(registry, method)(**query), query, etag)
+    except Exception as e:
+        return query_error(f"messages of conversation {conversation_id}", e)
+
+
+@api.get(
+    "chat/{conversation_id}/messages/history",
+    response={200: MessagesPage, 422: ErrorResponse, 500: ErrorResponse},
+)
+def get_messages_history(request, conversation_id: str, before: str | None = None, limit: MessagesLimit = None):
+    try:
+        hot_logger.info("Received request to get messages history for conversation {}.", conversation_id)
+        page = get_registry().get_messages_page(conversation_id=conversation_id, before=before, limit=limit)
+        hot_logger.info("Fetched {} history messages for conversation {}.", len(page.messages), conversation_id)
+        return json_response(page, messages_page_adapter)
+    except ValueError as e:
+        logger.warning(f"Invalid history query for conversation {conversation_id}: {e}")
+        return 422, {"error": str(e)}
+    except Exception as e:
+        logger.error(f"Error fetching messages history for conversation {conversation_id}: {e}")
+        return 500, {"error": str(e)}
+
+
+@api.post("chat/{conversation_id}/read", response={200: ReadState, 422: ErrorResponse, 500: ErrorResponse})
+def mark_read(request, conversation_id: str, marker: ReadMarkerPayload):
+    user_id = request.auth.id
+    try:
+        hot_logger.info("Received request to mark conversation {} read for user {}.", conversation_id, user_id)
+        read_state = get_registry().mark_read(
+            user_id=user_id, conversation_id=conversation_id, cursor=marker.cursor, message_id=marker.message_id
+        )
+        return 200, read_state
+    except ValueError as e:
+        logger.warning(f"Invalid read marker for conversation {conversation_id}: {e}")
+        return 422, {"error": str(e)}
+    except Exception as e:
+        logger.error(f"Error marking conversation {conversation_id} read for user {user_id}: {e}")
+        return 500, {"error": str(e)}
+
+
+@api.get("chat/{conversation_id}/read", response={200: ReadState, 403: ErrorResponse, 500: ErrorResponse})
+def get_read_state(request, conversation_id: str):
+    user_id = request.auth.id
+    try:
+        if not get_registry().is_member(user_id, conversation_id):
+            return 403, {"error": f"User {user_id} is not a member of conversation {conversation_id}"}
+        return 200, get_registry().get_read_state(user_id=user_id, conversation_id=conversation_id)
+    except Exception as e:
+        logger.error(f"Error fetching read state of conversation {conversation_id} for user {user_id}: {e}")
         return 500, {"error": str(e)}
 
 
+def server_sent_event(event: ConversationEvent | None) -> str:
+    """Format an event for a ``text/event-stream`` response, or a keepalive comment when there is none."""
+    if event is None:
+        return ": keepalive\n\n"
+    return f"event: {event.type}\ndata: {event.model_dump_json()}\n\n"
+
+
+@api.get(
+    "chat/{conversation_id}/events/",
+    auth=[async_session_auth, SessionTokenQueryAuth(async_session_auth)],
+    response={403: ErrorResponse},
+)
+async def stream_events(request, conversation_id: str):
+    """Stream the events of a conversation to one of its members, authenticated by header or ``token`` parameter.
+
+    Under WSGI, where Django would drain an async stream before sending it, events are streamed by a blocking
+    iterator instead, holding a worker thread for as long as the stream stays open.
+    """
+    logger.info("Opening events stream for conversation {}.", conversation_id)
+    registry = await aget_registry()
+    if not await registry.is_member_async(request.auth.id, conversation_id):
+        return 403, {"error": f"User {request.auth.id} is not a member of conversation {conversation_id}"}
+    blocking = not isinstance(request, ASGIRequest)
+    subscription = registry.events_hub.subscribe(conversation_id, blocking=blocking)
+
+    def closed():
+        registry.events_hub.unsubscribe(subscription)
+        logger.info("Closed events stream for conversation {}.", conversation_id)
+
+    async def events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=config.EVENTS_KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    event = None
+                yield server_sent_event(event)
+        finally:
+            closed()
+
+    def blocking_events():
+        try:
+            yield ": connected\n\n"
+            while True:
+                yield server_sent_event(subscription.get(timeout=config.EVENTS_KEEPALIVE_SECONDS))
+        finally:
+            closed()
+
+    response = StreamingHttpResponse(blocking_events() if blocking else events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @api.get("chat/{conversation_id}", response={200: Conversation, 500: ErrorResponse})
 def get_conversation(request, conversation_id: str):
     try:
-        logger.info(f"Received request to get metadata for conversation {conversation_id}.")
+        hot_logger.info("Received request to get metadata for conversation {}.", conversation_id)
+        registry = get_registry()
+        etag = revision_etag(conversation_id, registry.get_conversation_revision(conversation_id))
+        if response := not_modified(request, etag):
+            return response
         conversation = registry.get_conversation(conversation_id=conversation_id)
-        logger.info(f"Fetched metadata for conversation {conversation_id}.")
-        return 200, conversation
+        hot_logger.info("Fetched metadata for conversation {}.", conversation_id)
+        return tag(json_response(conversation, conversation_adapter), etag)
     except Exception as e:
         logger.error(f"Error fetching metadata for conversation {conversation_id}: {e}")
         return 500, {"error": str(e)}
 
 
 @api.get("/users", response={200: list[UserResponse], 500: ErrorResponse})
-def get_users(request):
-    logger.info("Received request to get users.")
-    users_ids = request.GET.getlist("users_ids", "*")
-    logger.info(f"Received request to get users for user_ids {users_ids}.")
-    try:
-        users = registry.get_users(user_ids=users_ids)
-        logger.info(f"Fetched {len(users)} users for user_ids {users_ids}.")
-        return 200, [
-            UserResponse(id=user.id, username=user.username, pseudo=user.pseudo, location=user.location)
-            for user in users
-        ]
-    except Exception as e:
-        logger.error(f"Error fetching users for user_ids {users_ids}: {e}")
+def get_users(
+    request,
+    users_ids: Annotated[list[str] | None, Query()] = None,
+    after: str | None = None,
+    limit: Annotated[int | None, Query(ge=1, le=stores_config.USERS_MAX_PAGE_SIZE)] = None,
+):
+    """Return profiles of the users listed in ``users_ids``, or else a page of all users ordered by id.
+
+    Pages hold at most ``limit`` users, the next one starts ``after`` the id of the last user of the previous page.
+    """
+    hot_logger.info("Received request to get users for user_ids {}.", users_ids or "*")
+    try:
+        if users_ids:
+            users = get_registry().get_users(user_ids=users_ids)
+        else:
+            users = get_registry().list_users(after=after, limit=limit)
+        hot_logger.info("Fetched {} users for user_ids {}.", len(users), users_ids or "*")
+        # Users have no revision: the ETag only saves clients from downloading profiles they already hold.
+        response = json_response(users, users_adapter)
+        etag = content_etag(response.content)
+        return not_modified(request, etag) or tag(response, etag)
+    except Exception as e:
+        logger.error(f"Error fetching users for user_ids {users_ids or '*'}: {e}")
         return 500, {"error": str(e)}
 
 
-@api.get("chat/", response={200: list[Conversation], 500: ErrorResponse})
-def list_conversations(request):
-    user_id = request.headers.get("user_id") or request.headers.get("User-Id")
+ConversationsLimit = Annotated[int | None, Query(ge=1, le=stores_config.CONVERSATIONS_MAX_PAGE_SIZE)]
+"""Page size of the conversations list"""
+
+
+def conversations_response(page: ConversationsPage, paginated: bool) -> HttpResponse:
+    """Render a page of conversations, or only its conversations when the request did not ask for a page."""
+    hot_logger.info("Fetched {} conversations.", len(page.conversations))
+    if paginated:
+        return json_response(page, conversations_page_adapter)
+    return json_response(page.conversations, conversations_adapter)
+
+
+async def list_conversations_async(request, before: str | None = None, limit: ConversationsLimit = None):
     try:
-        logger.info("Received request to list all conversations.")
-        conversations = registry.list_conversations(user_id=user_id)
-        logger.info(f"Fetched {len(conversations)} conversations.")
-        return 200, conversations
+        hot_logger.info("Received request to list all conversations.")
+        registry = await aget_registry()
+        paginated = bool(before or limit)
+        page = await registry.get_conversations_page_async(
+            user_id=request.auth.id, before=before, limit=limit, paginated=paginated
+        )
+        return conversations_response(page, paginated)
     except Exception as e:
-        logger.error(f"Error listing conversations: {e}")
-        return 500, {"error": str(e)}
+        return query_error("conversations", e)
 
 
-@api.patch("chat/{conversation_id}/messages", response={200: dict, 500: ErrorResponse})
+@api.get(
+    "chat/",
+    auth=hot_endpoints_auth,
+    response={200: list[ConversationSummary] | ConversationsPage, 422: ErrorResponse, 500: ErrorResponse},
+)
+@async_when_configured(list_conversations_async)
+def list_conversations(request, before: str | None = None, limit: ConversationsLimit = None):
+    try:
+        hot_logger.info("Received request to list all conversations.")
+        paginated = bool(before or limit)
+        page = get_registry().get_conversations_page(
+            user_id=request.auth.id, before=before, limit=limit, paginated=paginated
+        )
+        return conversations_response(page, paginated)
+    except Exception as e:
+        return query_error("conversations", e)
+
+
+@api.patch("chat/{conversation_id}/messages", response={200: Message, 500: ErrorResponse})
 def patch_message(request, conversation_id: str, message: Message):
     if not message.id:
         raise ValueError("Message id is required to update message")
     try:
-        logger.info(f"Received request to update message {message} for conversation {conversation_id}.")
-        message.issuer_id = request.headers.get("user_id") or request.headers.get("User-Id")
+        hot_logger.info("Received request to update message {} for conversation {}.", message.id, conversation_id)
+        message.issuer_id = request.auth.id
         if message.reacts:
-            registry.add_react(react=message.reacts[0], message_id=message.id)
+            react = message.reacts[0]
+            react.issuer_id = request.auth.id
+            get_registry().add_react(react=react, message_id=message.id)
             del message.reacts
-        registry.update_message(message=message)
-        logger.info(f"Message {message} updated for conversation {conversation_id}.")
-        return 200, registry.get_message(message_id=message.id)
+        get_registry().update_message(message=message)
+        hot_logger.info("Message {} updated for conversation {}.", message.id, conversation_id)
+        return 200, get_registry().get_message(message_id=message.id)
     except Exception as e:
         logger.error(f"Error updating message {message} for conversation {conversation_id}: {e}")
         return 500, {"error": str(e)}
+
+
+@api.get("metrics", auth=None, include_in_schema=False)
+def metrics(request):
+    """Request and Mongo command durations, in the Prometheus text format."""
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4")
+
+
+@api.get("health/live", auth=None, response={200: HealthResponse}, include_in_schema=False)
+def liveness(request):
+    """Answer as soon as the worker serves requests, without touching Mongo."""
+    return 200, {"status": "ok"}
+
+
+@api.get("health/ready", auth=None, response={200: HealthResponse, 503: HealthResponse}, include_in_schema=False)
+async def readiness(request):
+    """Ping Mongo and build the stores registry, so that the first routed request does not pay for it."""
+    command = sync_to_async(get_mongo_client().admin.command, thread_sensitive=False, executor=get_blocking_executor())
+    try:
+        await asyncio.wait_for(command("ping"), timeout=config.READINESS_TIMEOUT_SECONDS)
+        await aget_registry()
+        return 200, {"status": "ok"}
+    except Exception as e:
+        logger.warning("Readiness check failed: {!r}", e)
+        return 503, {"status": "unavailable"}
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
+from loguru import logger
 
 
 class ConversationsApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "conversations_api"
+
+    def ready(self):
+        from bourracho.log import configure_logging
+        from conversations_api.middleware import add_request_context
+
+        configure_logging(patcher=add_request_context)
+        if settings.SECRET_KEY == settings.INSECURE_SECRET_KEY and not settings.DEBUG:
+            logger.error("BOURRACHO_SECRET_KEY is not set: no session token will be issued or accepted.")
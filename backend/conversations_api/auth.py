@@ -0,0 +1,115 @@
+from typing import Callable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from loguru import logger
+from ninja.security import APIKeyQuery, HttpBearer
+
+from bourracho.cache import TTLCache
+from bourracho.models import User
+from bourracho.utils import get_blocking_executor
+from conversations_api import config
+
+SESSION_TOKEN_SALT = "bourracho.session"
+
+
+def session_signer() -> signing.TimestampSigner:
+    """Signer of session tokens, raising ``ImproperlyConfigured`` outside DEBUG without ``BOURRACHO_SECRET_KEY``.
+
+    The fallback secret key is committed to the repository, anyone could sign tokens for any user with it.
+    """
+    if settings.SECRET_KEY == settings.INSECURE_SECRET_KEY and not settings.DEBUG:
+        raise ImproperlyConfigured("BOURRACHO_SECRET_KEY must be set to sign session tokens.")
+    return signing.TimestampSigner(salt=SESSION_TOKEN_SALT)
+
+
+def issue_session_token(user_id: str) -> str:
+    return session_signer().sign(user_id)
+
+
+def read_session_token(token: str) -> str | None:
+    """Return the user id a session token was issued for, or None when it is forged or expired."""
+    try:
+        return session_signer().unsign(token, max_age=config.SESSION_TOKEN_MAX_AGE_SECONDS)
+    except signing.BadSignature as e:
+        logger.info(f"Rejected session token: {e}")
+        return None
+    except ImproperlyConfigured as e:
+        logger.error(f"Rejected session token: {e}")
+        return None
+
+
+class SessionTokenAuth(HttpBearer):
+    """Authenticate requests carrying an ``Authorization: Bearer <session token>`` header.
+
+    Tokens are checked against their signature, so verifying them needs no database round trip. The resolved ``User``
+    is kept in a short-lived LRU cache, which ``remember`` fills on login and register, and set as ``request.auth``.
+    """
+
+    def __init__(self, get_user: Callable[[str], User | None]):
+        super().__init__()
+        self.get_user = get_user
+        self.users_cache: TTLCache[str, User] = TTLCache(
+            maxsize=config.SESSION_USERS_CACHE_SIZE, ttl=config.SESSION_USERS_CACHE_TTL_SECONDS, name="session_users"
+        )
+
+    def remember(self, user: User) -> str:
+        """Cache ``user`` and return a new session token for it."""
+        self.users_cache.set(user.id, user)
+        return issue_session_token(user.id)
+
+    def authenticate(self, request, token: str) -> User | None:
+        user_id = read_session_token(token)
+        if user_id is None:
+            return None
+        user = self.users_cache.get(user_id)
+        if user is None:
+            user = self.get_user(user_id)
+            if user is None:
+                logger.info(f"Session token issued for unknown user {user_id}")
+                return None
+            self.users_cache.set(user_id, user)
+        return user
+
+
+class AsyncSessionTokenAuth(HttpBearer):
+    """``SessionTokenAuth`` for async views, sharing its users cache.
+
+    Cached users are resolved on the event loop, only cache misses are looked up in a worker thread.
+    """
+
+    def __init__(self, session_auth: SessionTokenAuth):
+        self.session_auth = session_auth
+        super().__init__()
+
+    async def authenticate(self, request, token: str) -> User | None:
+        user_id = read_session_token(token)
+        if user_id is None:
+            return None
+        user = self.session_auth.users_cache.get(user_id)
+        if user is None:
+            authenticate = sync_to_async(
+                self.session_auth.authenticate, thread_sensitive=False, executor=get_blocking_executor()
+            )
+            return await authenticate(request, token)
+        return user
+
+
+class SessionTokenQueryAuth(APIKeyQuery):
+    """``AsyncSessionTokenAuth`` reading the session token from a ``token`` query parameter.
+
+    Only meant for the events stream: the browser ``EventSource`` cannot set an ``Authorization`` header.
+    """
+
+    param_name = "token"
+
+    def __init__(self, bearer_auth: AsyncSessionTokenAuth):
+        self.bearer_auth = bearer_auth
+        super().__init__()
+
+    async def authenticate(self, request, key: str | None) -> User | None:
+        if not key:
+            return None
+        return await self.bearer_auth.authenticate(request, key)
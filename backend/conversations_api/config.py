@@ -1,3 +1,14 @@
 import os
 
 MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "bourracho_api_test")
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", 15))
+SESSION_TOKEN_MAX_AGE_SECONDS = int(os.environ.get("SESSION_TOKEN_MAX_AGE_SECONDS", 30 * 24 * 3600))
+SESSION_USERS_CACHE_SIZE = int(os.environ.get("SESSION_USERS_CACHE_SIZE", 10000))
+SESSION_USERS_CACHE_TTL_SECONDS = float(os.environ.get("SESSION_USERS_CACHE_TTL_SECONDS", 60))
+READINESS_TIMEOUT_SECONDS = float(os.environ.get("READINESS_TIMEOUT_SECONDS", 2))
+# Serve the hot endpoints with async views, only under an ASGI server.
+ASYNC_ENDPOINTS = os.environ.get("ASYNC_ENDPOINTS", "false").lower() == "true"
+# Compress JSON responses of at least COMPRESSION_MIN_BYTES, with brotli when installed (compression extra) or gzip.
+RESPONSE_COMPRESSION = os.environ.get("RESPONSE_COMPRESSION", "false").lower() == "true"
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))
@@ -0,0 +1,36 @@
+import hashlib
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+def revision_etag(conversation_id: str, revision: int | None) -> str | None:
+    """Weak ETag of a representation that only changes with the conversation revision, for a given URL.
+
+    None when the conversation does not exist, responses are then neither tagged nor answered with a 304.
+    """
+    return None if revision is None else f'W/"{conversation_id}.{revision}"'
+
+
+def content_etag(content: bytes) -> str:
+    return f'W/"{hashlib.blake2b(content, digest_size=12).hexdigest()}"'
+
+
+def not_modified(request, etag: str | None) -> HttpResponse | None:
+    """A ``304 Not Modified`` response when ``If-None-Match`` lists ``etag``, compared weakly, else None."""
+    header = request.headers.get("If-None-Match")
+    if not header or etag is None:
+        return None
+    etags = parse_etags(header)
+    if "*" not in etags and etag.removeprefix("W/") not in {e.removeprefix("W/") for e in etags}:
+        return None
+    return tag(HttpResponseNotModified(), etag)
+
+
+def tag(response: HttpResponse, etag: str | None) -> HttpResponse:
+    """Set ``etag`` on the response, and have clients revalidate it before every reuse."""
+    if etag is None:
+        return response
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
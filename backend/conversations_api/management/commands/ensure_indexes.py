@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import PyMongoError
+
+from bourracho.indexes import ensure_indexes
+from bourracho.utils import get_mongo_client
+from conversations_api import config
+
+
+class Command(BaseCommand):
+    help = "Create the Mongo indexes needed by the bourracho stores."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--db-name", default=config.MONGO_DB_NAME, help="Name of the Mongo database")
+
+    def handle(self, *args, **options):
+        try:
+            ensure_indexes(get_mongo_client()[options["db_name"]])
+        except PyMongoError as e:
+            raise CommandError(f"Failed to ensure indexes: {e}") from e
+        self.stdout.write(self.style.SUCCESS(f"Indexes ensured on database {options['db_name']}."))
@@ -0,0 +1,158 @@
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.text import compress_string
+
+from bourracho.metrics import RequestTimings, current_timings, http_requests
+from conversations_api import config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+REQUEST_ID_PATTERN = re.compile(r"[\w.-]{1,64}")
+ACCEPTED_ENCODING_PATTERN = re.compile(r"(?:^|,)\s*(br|gzip)\s*(?:;\s*q=(0(?:\.0*)?|1(?:\.0*)?|0?\.\d+))?\s*(?=,|$)")
+
+current_request: ContextVar[HttpRequest | None] = ContextVar("current_request", default=None)
+
+
+def add_request_context(record: dict) -> None:
+    """Loguru patcher binding the id of the current request, and its conversation when it has one, to records."""
+    request = current_request.get()
+    if request is None:
+        return
+    record["extra"].setdefault("request_id", request.request_id)
+    match = request.resolver_match
+    if match and "conversation_id" in match.kwargs:
+        record["extra"].setdefault("conversation_id", match.kwargs["conversation_id"])
+
+
+def start_request(request: HttpRequest):
+    """Give the request an id, reusing a well-formed ``X-Request-ID`` header, and make it the current request."""
+    request_id = request.headers.get("X-Request-ID", "")
+    request.request_id = request_id if REQUEST_ID_PATTERN.fullmatch(request_id) else uuid.uuid4().hex
+    return current_request.set(request)
+
+
+@sync_and_async_middleware
+def request_context_middleware(get_response):
+    """Expose the current request to log records, and return its id in an ``X-Request-ID`` header."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = start_request(request)
+            try:
+                response = await get_response(request)
+            finally:
+                current_request.reset(token)
+            response["X-Request-ID"] = request.request_id
+            return response
+
+    else:
+
+        def middleware(request):
+            token = start_request(request)
+            try:
+                response = get_response(request)
+            finally:
+                current_request.reset(token)
+            response["X-Request-ID"] = request.request_id
+            return response
+
+    return middleware
+
+
+def record_request(request, response, timings: RequestTimings):
+    """Observe the request duration under its route, and report it with Mongo time in a ``Server-Timing`` header."""
+    seconds = time.perf_counter() - timings.start
+    match = getattr(request, "resolver_match", None)
+    endpoint = match.route if match else "unmatched"
+    http_requests.observe((request.method, endpoint, str(response.status_code)), seconds)
+    response["Server-Timing"] = (
+        f'mongo;dur={timings.mongo_seconds * 1000:.2f};desc="{timings.mongo_commands} commands", '
+        f"total;dur={seconds * 1000:.2f}"
+    )
+    return response
+
+
+@sync_and_async_middleware
+def timing_middleware(get_response):
+    """Time every request, and the Mongo commands it issues through ``bourracho.metrics.current_timings``."""
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            timings = RequestTimings()
+            token = current_timings.set(timings)
+            try:
+                response = await get_response(request)
+            finally:
+                current_timings.reset(token)
+            return record_request(request, response, timings)
+
+    else:
+
+        def middleware(request):
+            timings = RequestTimings()
+            token = current_timings.set(timings)
+            try:
+                response = get_response(request)
+            finally:
+                current_timings.reset(token)
+            return record_request(request, response, timings)
+
+    return middleware
+
+
+def accepted_encodings(request: HttpRequest) -> set[str]:
+    """Encodings among brotli and gzip that the ``Accept-Encoding`` header does not refuse with ``q=0``."""
+    header = request.headers.get("Accept-Encoding", "").lower()
+    return {encoding for encoding, q in ACCEPTED_ENCODING_PATTERN.findall(header) if not q or float(q) > 0}
+
+
+def compress(request: HttpRequest, response):
+    """Compress large JSON responses with brotli, when installed, or gzip, as accepted by the client."""
+    if (
+        response.streaming
+        or response.has_header("Content-Encoding")
+        or not response.get("Content-Type", "").startswith("application/json")
+        or len(response.content) < config.COMPRESSION_MIN_BYTES
+    ):
+        return response
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encodings = accepted_encodings(request)
+    if brotli is not None and "br" in encodings:
+        content, encoding = brotli.compress(response.content, quality=config.BROTLI_QUALITY), "br"
+    elif "gzip" in encodings:
+        content, encoding = compress_string(response.content), "gzip"
+    else:
+        return response
+    response.content = content
+    response["Content-Length"] = str(len(content))
+    response["Content-Encoding"] = encoding
+    return response
+
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    """Opt-in compression of JSON responses of at least ``config.COMPRESSION_MIN_BYTES``."""
+    if not config.RESPONSE_COMPRESSION:
+        raise MiddlewareNotUsed()
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            return compress(request, await get_response(request))
+
+    else:
+
+        def middleware(request):
+            return compress(request, get_response(request))
+
+    return middleware
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Collection
+
+import orjson
+from django.http import HttpResponse
+from django.utils.functional import Promise
+from ninja.renderers import BaseRenderer
+from pydantic import BaseModel, TypeAdapter
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def default(obj: Any) -> Any:
+    """Encode the types orjson does not handle natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request, data: Any, *, response_status: int) -> bytes:
+        return orjson.dumps(data, default=default)
+
+
+def json_response(data: Any, adapter: TypeAdapter, status: int = 200) -> HttpResponse:
+    """Serialize ``data`` in a single pass with ``adapter``, bypassing the validation and dump of ninja responses.
+
+    Only meant for data already typed as the operation response, large lists of messages or conversations typically.
+    """
+    return HttpResponse(adapter.dump_json(data), status=status, content_type=ORJSONRenderer.media_type)
+
+
+def epoch_ms(timestamp: datetime) -> int:
+    """Milliseconds since the epoch, naive timestamps being UTC as Mongo stores them."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // timedelta(milliseconds=1)
+
+
+def compact_messages_response(
+    conversation_id: str, documents: list[dict], cursor: str | None, fields: Collection[str] | None = None
+) -> HttpResponse:
+    """Render raw message documents in the compact shape.
+
+    The conversation id is given once instead of in every message, timestamps are epoch milliseconds, and messages
+    only hold ``fields`` when given.
+    """
+    for document in documents:
+        document.pop("conversation_id", None)
+        if fields is not None:
+            for key in document.keys() - fields:
+                del document[key]
+        if document.get("timestamp") is not None:
+            document["timestamp"] = epoch_ms(document["timestamp"])
+    payload = {"conversation_id": conversation_id, "cursor": cursor, "messages": documents}
+    return HttpResponse(orjson.dumps(payload), content_type=ORJSONRenderer.media_type)
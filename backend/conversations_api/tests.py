@@ -1,14 +1,36 @@
+import asyncio
+import gzip
 import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
 
 import django
-from django.test import Client, TestCase
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from loguru import logger
+from pydantic import TypeAdapter
 
+from bourracho.models import Message, React, User
+from conversations_api import api, config, middleware
+from conversations_api.auth import AsyncSessionTokenAuth, SessionTokenAuth, issue_session_token
+from conversations_api.renderers import ORJSONRenderer, compact_messages_response, epoch_ms, json_response
 
+
+@override_settings(SECRET_KEY="test-secret-key")
 class ConversationsApiTests(TestCase):
     def setUp(self):
         self.client: django.test.Client = Client()
         self.api_prefix = "/api/"
 
+    @staticmethod
+    def auth_headers(register_response) -> dict:
+        return {"HTTP_AUTHORIZATION": f"Bearer {register_response.json()['token']}"}
+
     def test_register_and_login(self):
         payload = {"username": "alice", "password": "secret123"}
         resp = self.client.post(
@@ -17,15 +39,26 @@ class ConversationsApiTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         user = resp.json()
         self.assertTrue(user)
+        self.assertTrue(user["token"])
+
+        # A taken username is refused, without a session
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "alice", "password": "other"}),
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 409)
+        self.assertNotIn("token", resp.json())
 
         # Try login
         resp = self.client.post(f"{self.api_prefix}login/", data=json.dumps(payload), content_type="application/json")
         self.assertEqual(resp.status_code, 200)
         self.assertIn("username", resp.json())
         self.assertEqual(resp.json()["username"], "alice")
+        headers = self.auth_headers(resp)
 
         # Get users
-        resp = self.client.get(f"{self.api_prefix}users", query_params={"users_ids": [user["id"]]})
+        resp = self.client.get(f"{self.api_prefix}users", query_params={"users_ids": [user["id"]]}, **headers)
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()[0]["username"], "alice")
 
@@ -38,14 +71,14 @@ class ConversationsApiTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         user = resp.json()
         self.assertTrue(user)
-        user_id = user["id"]
+        headers = self.auth_headers(resp)
         # Create conversation (minimal required fields)
         conversation = {"name": "Test"}
         resp = self.client.post(
             f"{self.api_prefix}chat/",
             data=json.dumps(conversation),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id},
+            **headers,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertIn("id", resp.json())
@@ -61,18 +94,20 @@ class ConversationsApiTests(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         user_id1 = resp.json()["id"]
+        headers1 = self.auth_headers(resp)
         resp = self.client.post(
             f"{self.api_prefix}register/", data=json.dumps(payload2), content_type="application/json"
         )
         self.assertEqual(resp.status_code, 200)
         user_id2 = resp.json()["id"]
+        headers2 = self.auth_headers(resp)
         # Create conversation with user1
         conversation = {"name": "TestJoin", "is_locked": False}
         resp = self.client.post(
             f"{self.api_prefix}chat/",
             data=json.dumps(conversation),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id1},
+            **headers1,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()["users_ids"], [user_id1])
@@ -81,7 +116,7 @@ class ConversationsApiTests(TestCase):
         resp = self.client.post(
             f"{self.api_prefix}chat/{conversation_id}/join",
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id2},
+            **headers2,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertIn("users_ids", resp.json())
@@ -90,7 +125,7 @@ class ConversationsApiTests(TestCase):
         resp = self.client.post(
             f"{self.api_prefix}chat/{conversation_id}/join",
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id1},
+            **headers1,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertIn("users_ids", resp.json())
@@ -99,6 +134,7 @@ class ConversationsApiTests(TestCase):
         resp = self.client.get(
             f"{self.api_prefix}users",
             query_params={"users_ids": [user_id1, user_id2]},
+            **headers1,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(len(resp.json()), 2)
@@ -115,13 +151,14 @@ class ConversationsApiTests(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
         # Create conversation
         conversation = {"name": "MsgTest", "is_locked": False}
         resp = self.client.post(
             f"{self.api_prefix}chat/",
             data=json.dumps(conversation),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id},
+            **headers,
         )
         self.assertEqual(resp.status_code, 200)
         conversation_id = resp.json()["id"]
@@ -131,7 +168,7 @@ class ConversationsApiTests(TestCase):
             f"{self.api_prefix}chat/{conversation_id}/messages/",
             json.dumps(msg),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id},
+            **headers,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()["content"], "Hello world!")
@@ -145,18 +182,20 @@ class ConversationsApiTests(TestCase):
         )
         self.assertEqual(resp.status_code, 200)
         user_id1 = resp.json()["id"]
+        headers1 = self.auth_headers(resp)
         resp = self.client.post(
             f"{self.api_prefix}register/", data=json.dumps(payload2), content_type="application/json"
         )
         self.assertEqual(resp.status_code, 200)
         user_id2 = resp.json()["id"]
+        headers2 = self.auth_headers(resp)
         # Create conversation with user1
         conversation = {"name": "TestMeta", "is_locked": False}
         resp = self.client.post(
             f"{self.api_prefix}chat/",
             data=json.dumps(conversation),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id1},
+            **headers1,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()["users_ids"], [user_id1])
@@ -166,12 +205,13 @@ class ConversationsApiTests(TestCase):
         resp = self.client.get(
             f"{self.api_prefix}users",
             query_params={"users_ids": [user_id1]},
+            **headers1,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()[0]["username"], "flowuser1")
         # Join conversation (should be idempotent)
         join_url = f"{self.api_prefix}chat/{conversation_id}/join"
-        resp = self.client.post(join_url, content_type="application/json", **{"HTTP_USER_ID": user_id2})
+        resp = self.client.post(join_url, content_type="application/json", **headers2)
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()["users_ids"], [user_id1, user_id2])
         # Post message
@@ -181,7 +221,7 @@ class ConversationsApiTests(TestCase):
             f"{self.api_prefix}chat/{conversation_id}/messages/",
             data=json.dumps(msg),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id2},
+            **headers2,
         )
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(resp.json()["content"], "Hello world!")
@@ -192,37 +232,679 @@ class ConversationsApiTests(TestCase):
             f"{self.api_prefix}chat/{conversation_id}",
             data=json.dumps(meta),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id2},
+            **headers2,
         )
         self.assertEqual(resp.status_code, 200)
         # Get messages
-        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}/messages/", **{"HTTP_USER_ID": user_id2})
+        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}/messages/", **headers2)
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(isinstance(resp.json(), list))
         self.assertIn("Hello world!", json.dumps(resp.json()))
         # Get conversation
-        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}", **{"HTTP_USER_ID": user_id2})
+        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}", **headers2)
         self.assertEqual(resp.status_code, 200)
         self.assertIn("name", resp.json())
         self.assertEqual(resp.json()["name"], "conv name")
         # List conversations for user
 
-        resp = self.client.get(f"{self.api_prefix}chat/", **{"HTTP_USER_ID": user_id2})
+        resp = self.client.get(f"{self.api_prefix}chat/", **headers2)
         self.assertEqual(resp.status_code, 200)
         self.assertTrue(len(resp.json()) == 1)
         self.assertTrue("conv name" in resp.json()[0]["name"])
         # React to message
         patch_message_url = f"{self.api_prefix}chat/{conversation_id}"
         get_messages_url = f"{self.api_prefix}chat/{conversation_id}/messages/"
-        messages = self.client.get(get_messages_url)
+        messages = self.client.get(get_messages_url, **headers2)
         message_id = messages.json()[0]["id"]
         resp = self.client.patch(
             patch_message_url,
             data=json.dumps({"id": message_id, "reacts": [{"emoji": "👍", "issuer_id": user_id2}]}),
             content_type="application/json",
-            **{"HTTP_USER_ID": user_id2},
+            **headers2,
         )
         self.assertEqual(resp.status_code, 200)
-        messages = self.client.get(get_messages_url)
+        messages = self.client.get(get_messages_url, **headers2)
         self.assertEqual(messages.status_code, 200)
         self.assertTrue(isinstance(messages.json(), list))
+        # Reacts are issued by the authenticated user, whatever the body says
+        resp = self.client.patch(
+            f"{self.api_prefix}chat/{conversation_id}/messages",
+            data=json.dumps({**messages.json()[0], "reacts": [{"emoji": "🎉", "issuer_id": "someone-else"}]}),
+            content_type="application/json",
+            **headers2,
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn({"emoji": "🎉", "issuer_id": user_id2}, resp.json()["reacts"])
+
+    def test_get_messages_since(self):
+        payload = {"username": "sinceuser", "password": "pwsince"}
+        resp = self.client.post(
+            f"{self.api_prefix}register/", data=json.dumps(payload), content_type="application/json"
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/",
+            data=json.dumps({"name": "SinceTest"}),
+            content_type="application/json",
+            **headers,
+        )
+        conversation_id = resp.json()["id"]
+        messages_url = f"{self.api_prefix}chat/{conversation_id}/messages/"
+        for i in range(3):
+            msg = {
+                "content": f"Message {i}",
+                "issuer_id": user_id,
+                "conversation_id": conversation_id,
+                "timestamp": f"2025-01-01T00:00:0{i}",
+            }
+            self.client.post(messages_url, json.dumps(msg), content_type="application/json", **headers)
+
+        resp = self.client.get(messages_url, query_params={"limit": 2}, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([m["content"] for m in resp.json()["messages"]], ["Message 0", "Message 1"])
+        resp = self.client.get(messages_url, query_params={"since": resp.json()["cursor"]}, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([m["content"] for m in resp.json()["messages"]], ["Message 2"])
+        cursor = resp.json()["cursor"]
+        resp = self.client.get(messages_url, query_params={"since": cursor}, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json(), {"messages": [], "cursor": cursor})
+        resp = self.client.get(messages_url, query_params={"since": "not-a-cursor"}, **headers)
+        self.assertEqual(resp.status_code, 422)
+        for limit in (0, -1, 10_000):
+            resp = self.client.get(messages_url, query_params={"limit": limit}, **headers)
+            self.assertEqual(resp.status_code, 422)
+
+    def test_get_messages_history(self):
+        payload = {"username": "historyuser", "password": "pwhistory"}
+        resp = self.client.post(
+            f"{self.api_prefix}register/", data=json.dumps(payload), content_type="application/json"
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/",
+            data=json.dumps({"name": "HistoryTest"}),
+            content_type="application/json",
+            **headers,
+        )
+        conversation_id = resp.json()["id"]
+        messages_url = f"{self.api_prefix}chat/{conversation_id}/messages/"
+        for i in range(3):
+            msg = {
+                "content": f"Message {i}",
+                "issuer_id": user_id,
+                "conversation_id": conversation_id,
+                "timestamp": f"2025-01-01T00:00:0{i}",
+            }
+            self.client.post(messages_url, json.dumps(msg), content_type="application/json", **headers)
+
+        history_url = f"{messages_url}history"
+        resp = self.client.get(history_url, query_params={"limit": 2}, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([m["content"] for m in resp.json()["messages"]], ["Message 2", "Message 1"])
+        resp = self.client.get(history_url, query_params={"before": resp.json()["cursor"], "limit": 2}, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([m["content"] for m in resp.json()["messages"]], ["Message 0"])
+        self.assertIsNone(resp.json()["cursor"])
+        resp = self.client.get(history_url, query_params={"limit": 0}, **headers)
+        self.assertEqual(resp.status_code, 422)
+
+    async def test_stream_events(self):
+        payload = {"username": "streamuser", "password": "pwstream"}
+        client = AsyncClient()
+        resp = await client.post(f"{self.api_prefix}register/", data=payload, content_type="application/json")
+        user_id = resp.json()["id"]
+        headers = {"Authorization": f"Bearer {resp.json()['token']}"}
+        resp = await client.post(
+            f"{self.api_prefix}chat/", data={"name": "StreamTest"}, content_type="application/json", headers=headers
+        )
+        conversation_id = resp.json()["id"]
+
+        resp = await client.get(f"{self.api_prefix}chat/{conversation_id}/events/", headers=headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        stream = aiter(resp.streaming_content)
+        self.assertEqual(await anext(stream), b": connected\n\n")
+
+        msg = {"content": "Pushed!", "issuer_id": user_id, "conversation_id": conversation_id}
+        await client.post(
+            f"{self.api_prefix}chat/{conversation_id}/messages/",
+            data=msg,
+            content_type="application/json",
+            headers=headers,
+        )
+        event = (await asyncio.wait_for(anext(stream), timeout=1)).decode()
+        self.assertTrue(event.startswith("event: message_added\n"))
+        self.assertIn("Pushed!", event)
+        await resp.streaming_content.aclose()
+
+        # Browsers' EventSource sends the token as a query parameter
+        events_url = f"{self.api_prefix}chat/{conversation_id}/events/"
+        resp = await client.get(events_url, {"token": headers["Authorization"].removeprefix("Bearer ")})
+        self.assertEqual(resp.status_code, 200)
+        await resp.streaming_content.aclose()
+        self.assertEqual((await client.get(events_url, {"token": "forged"})).status_code, 401)
+
+        resp = await client.post(
+            f"{self.api_prefix}register/",
+            data={"username": "streamintruder", "password": "pwstream"},
+            content_type="application/json",
+        )
+        resp = await client.get(events_url, {"token": resp.json()["token"]})
+        self.assertEqual(resp.status_code, 403)
+
+    def test_stream_events_under_wsgi(self):
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "wsgistream", "password": "pwstream"}),
+            content_type="application/json",
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/",
+            data=json.dumps({"name": "WsgiStream"}),
+            content_type="application/json",
+            **headers,
+        )
+        conversation_id = resp.json()["id"]
+
+        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}/events/", **headers)
+        self.assertEqual(resp.status_code, 200)
+        stream = iter(resp.streaming_content)
+        self.assertEqual(next(stream), b": connected\n\n")
+        self.client.post(
+            f"{self.api_prefix}chat/{conversation_id}/messages/",
+            data=json.dumps({"content": "Pushed!", "issuer_id": user_id, "conversation_id": conversation_id}),
+            content_type="application/json",
+            **headers,
+        )
+        event = next(stream).decode()
+        self.assertTrue(event.startswith("event: message_added\n"))
+        self.assertIn("Pushed!", event)
+        resp.close()
+        self.assertFalse(api.get_registry().events_hub.subscriptions.get(conversation_id))
+
+    def test_post_messages_bulk(self):
+        payload = {"username": "bulkuser", "password": "pwbulk"}
+        resp = self.client.post(
+            f"{self.api_prefix}register/", data=json.dumps(payload), content_type="application/json"
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/",
+            data=json.dumps({"name": "BulkTest"}),
+            content_type="application/json",
+            **headers,
+        )
+        conversation_id = resp.json()["id"]
+        bulk_url = f"{self.api_prefix}chat/{conversation_id}/messages/bulk"
+        messages = [{"content": f"Message {i}"} for i in range(3)] + [
+            {"content": "Spoofed", "issuer_id": "someone"},
+            {"issuer_id": user_id},
+        ]
+        resp = self.client.post(bulk_url, data=json.dumps(messages), content_type="application/json", **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()["inserted_ids"]), 4)
+        self.assertEqual([e["index"] for e in resp.json()["errors"]], [4])
+        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}/messages/", **headers)
+        self.assertEqual({m["issuer_id"] for m in resp.json()}, {user_id})
+
+        # Non members cannot post, even as a member
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "bulkintruder", "password": "pwbulk"}),
+            content_type="application/json",
+        )
+        resp = self.client.post(
+            bulk_url,
+            data=json.dumps([{"content": "Intruder", "issuer_id": user_id}]),
+            content_type="application/json",
+            **self.auth_headers(resp),
+        )
+        self.assertEqual(resp.status_code, 403)
+
+    def test_session_token_required(self):
+        payload = {"username": "tokenuser", "password": "pwtoken"}
+        resp = self.client.post(
+            f"{self.api_prefix}register/", data=json.dumps(payload), content_type="application/json"
+        )
+        user_id = resp.json()["id"]
+        token = resp.json()["token"]
+        resp = self.client.get(f"{self.api_prefix}chat/", **{"HTTP_USER_ID": user_id})
+        self.assertEqual(resp.status_code, 401)
+        resp = self.client.get(
+            f"{self.api_prefix}chat/", HTTP_AUTHORIZATION=f"Bearer {token.replace(user_id, 'someone-else')}"
+        )
+        self.assertEqual(resp.status_code, 401)
+
+        resp = self.client.post(f"{self.api_prefix}login/", data=json.dumps(payload), content_type="application/json")
+        resp = self.client.post(
+            f"{self.api_prefix}chat/",
+            data=json.dumps({"name": "TokenTest"}),
+            content_type="application/json",
+            **self.auth_headers(resp),
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["users_ids"], [user_id])
+
+    def test_get_users_pages(self):
+        users_ids = []
+        for i in range(3):
+            payload = {"username": f"pageuser{i}", "password": "pwpage"}
+            resp = self.client.post(
+                f"{self.api_prefix}register/", data=json.dumps(payload), content_type="application/json"
+            )
+            users_ids.append(resp.json()["id"])
+        headers = self.auth_headers(resp)
+        # Other tests' users live in the same database, walk through every page.
+        pages_ids, after = [], None
+        while True:
+            query_params = {"limit": 2, **({"after": after} if after else {})}
+            resp = self.client.get(f"{self.api_prefix}users", query_params=query_params, **headers)
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(resp.json()), 2)
+            if not resp.json():
+                break
+            pages_ids += [u["id"] for u in resp.json()]
+            after = pages_ids[-1]
+        self.assertEqual(pages_ids, sorted(set(pages_ids)))
+        self.assertTrue(set(users_ids) <= set(pages_ids))
+        resp = self.client.get(f"{self.api_prefix}users", query_params={"limit": -1}, **headers)
+        self.assertEqual(resp.status_code, 422)
+
+    def test_list_conversations_summaries(self):
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "summaryuser", "password": "pwsummary"}),
+            content_type="application/json",
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        conversations_ids = []
+        for name in ["First", "Second"]:
+            resp = self.client.post(
+                f"{self.api_prefix}chat/", data=json.dumps({"name": name}), content_type="application/json", **headers
+            )
+            conversations_ids.append(resp.json()["id"])
+        msg = {"content": "Hello", "issuer_id": user_id, "conversation_id": conversations_ids[0]}
+        self.client.post(
+            f"{self.api_prefix}chat/{conversations_ids[0]}/messages/",
+            json.dumps(msg),
+            content_type="application/json",
+            **headers,
+        )
+
+        resp = self.client.get(f"{self.api_prefix}chat/", **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()[0]["id"], conversations_ids[0])
+        self.assertEqual(resp.json()[0]["last_message"]["content"], "Hello")
+        self.assertEqual(resp.json()[0]["unread_count"], 0)
+        resp = self.client.get(f"{self.api_prefix}chat/", query_params={"limit": 1}, **headers)
+        self.assertEqual(len(resp.json()["conversations"]), 1)
+        resp = self.client.get(f"{self.api_prefix}chat/", query_params={"before": resp.json()["cursor"]}, **headers)
+        self.assertEqual([c["id"] for c in resp.json()["conversations"]], conversations_ids[1:])
+        resp = self.client.get(f"{self.api_prefix}chat/", query_params={"limit": 0}, **headers)
+        self.assertEqual(resp.status_code, 422)
+
+    def test_mark_read(self):
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "readuser", "password": "pwread"}),
+            content_type="application/json",
+        )
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "writeuser", "password": "pwwrite"}),
+            content_type="application/json",
+        )
+        writer_id, writer_headers = resp.json()["id"], self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/", data=json.dumps({"name": "ReadTest"}), content_type="application/json", **headers
+        )
+        conversation_id = resp.json()["id"]
+        self.client.post(f"{self.api_prefix}chat/{conversation_id}/join", **writer_headers)
+        messages_ids = []
+        for i in range(2):
+            msg = {"content": f"Message {i}", "issuer_id": writer_id, "conversation_id": conversation_id}
+            resp = self.client.post(
+                f"{self.api_prefix}chat/{conversation_id}/messages/",
+                json.dumps({**msg, "timestamp": f"2025-01-01T00:00:0{i}"}),
+                content_type="application/json",
+                **writer_headers,
+            )
+            messages_ids.append(resp.json()["id"])
+
+        read_url = f"{self.api_prefix}chat/{conversation_id}/read"
+        resp = self.client.get(read_url, **headers)
+        self.assertEqual(resp.json(), {"conversation_id": conversation_id, "cursor": None, "unread_count": 2})
+        resp = self.client.post(
+            read_url, json.dumps({"message_id": messages_ids[0]}), content_type="application/json", **headers
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["unread_count"], 1)
+        resp = self.client.post(read_url, json.dumps({}), content_type="application/json", **headers)
+        self.assertEqual(resp.status_code, 422)
+
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "readintruder", "password": "pwread"}),
+            content_type="application/json",
+        )
+        resp = self.client.get(read_url, **self.auth_headers(resp))
+        self.assertEqual(resp.status_code, 403)
+
+    def test_server_timing_and_metrics(self):
+        resp = self.client.post(
+            "/api/register/",
+            data=json.dumps({"username": "timed", "password": "pwd"}),
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("total;dur=", resp["Server-Timing"])
+        self.assertIn("mongo;dur=", resp["Server-Timing"])
+
+        resp = self.client.get("/api/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(
+            'bourracho_http_request_duration_seconds_count{method="POST",endpoint="api/register/",status="200"}',
+            resp.content.decode(),
+        )
+
+    def test_logs_bound_to_request_and_conversation(self):
+        resp = self.client.post(
+            "/api/register/",
+            data=json.dumps({"username": "logged", "password": "pwd"}),
+            content_type="application/json",
+            HTTP_X_REQUEST_ID="client-request-1",
+        )
+        self.assertEqual(resp["X-Request-ID"], "client-request-1")
+        headers = self.auth_headers(resp)
+        conversation_id = self.client.post(
+            "/api/chat/", data=json.dumps({"name": "logs"}), content_type="application/json", **headers
+        ).json()["id"]
+
+        records = []
+        handler_id = logger.add(lambda message: records.append(message.record), level="INFO")
+        try:
+            resp = self.client.post(f"/api/chat/{conversation_id}/join", **headers)
+        finally:
+            logger.remove(handler_id)
+        self.assertEqual(len(resp["X-Request-ID"]), 32)
+        self.assertTrue(records)
+        for record in records:
+            self.assertEqual(record["extra"]["request_id"], resp["X-Request-ID"])
+            self.assertEqual(record["extra"]["conversation_id"], conversation_id)
+
+    def test_health_endpoints(self):
+        resp = self.client.get(f"{self.api_prefix}health/live")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["status"], "ok")
+
+        resp = self.client.get(f"{self.api_prefix}health/ready")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["status"], "ok")
+        self.assertIsNotNone(api.registry)
+
+        unreachable = Mock()
+        unreachable.admin.command.side_effect = ConnectionError("Mongo unreachable")
+        with patch("conversations_api.api.get_mongo_client", return_value=unreachable):
+            resp = self.client.get(f"{self.api_prefix}health/ready")
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp.json(), {"status": "unavailable"})
+
+    def test_async_hot_endpoints(self):
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "asyncuser", "password": "pwasync"}),
+            content_type="application/json",
+        )
+        headers = self.auth_headers(resp)
+        request = RequestFactory().get("/")
+        request.auth = api.get_registry().get_user(resp.json()["id"])
+        resp = self.client.post(
+            f"{self.api_prefix}chat/", data=json.dumps({"name": "Async"}), content_type="application/json", **headers
+        )
+        conversation_id = resp.json()["id"]
+
+        message = Message(content="Async hello", conversation_id=conversation_id, issuer_id="")
+        status, posted = asyncio.run(api.post_message_async(request, conversation_id, message))
+        self.assertEqual(status, 200)
+        self.assertEqual(posted.issuer_id, request.auth.id)
+        resp = asyncio.run(api.get_messages_async(request, conversation_id, limit=10))
+        self.assertEqual([m["id"] for m in json.loads(resp.content)["messages"]], [posted.id])
+        resp = asyncio.run(api.list_conversations_async(request))
+        self.assertEqual(json.loads(resp.content)[0]["last_message"]["content"], "Async hello")
+
+        resp = self.client.get(f"{self.api_prefix}chat/{conversation_id}/messages/", **headers)
+        self.assertEqual([m["content"] for m in resp.json()], ["Async hello"])
+
+    def test_conditional_gets(self):
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "etaguser", "password": "pwetag"}),
+            content_type="application/json",
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/", data=json.dumps({"name": "ETag"}), content_type="application/json", **headers
+        )
+        conversation_id = resp.json()["id"]
+        messages_url = f"{self.api_prefix}chat/{conversation_id}/messages/"
+        message = {"content": "Hello", "issuer_id": user_id, "conversation_id": conversation_id}
+        self.client.post(messages_url, json.dumps(message), content_type="application/json", **headers)
+
+        resp = self.client.get(messages_url, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Cache-Control"], "private, no-cache")
+        etag = resp["ETag"]
+        with patch.object(api.get_registry(), "get_messages", side_effect=AssertionError("messages were read")):
+            resp = self.client.get(messages_url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.content, b"")
+        self.assertEqual(resp["ETag"], etag)
+
+        self.client.post(messages_url, json.dumps(message), content_type="application/json", **headers)
+        resp = self.client.get(messages_url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()), 2)
+        self.assertNotEqual(resp["ETag"], etag)
+
+        conversation_url = f"{self.api_prefix}chat/{conversation_id}"
+        resp = self.client.get(conversation_url, **headers)
+        self.assertEqual(resp.json()["name"], "ETag")
+        etag = resp["ETag"]
+        self.assertEqual(self.client.get(conversation_url, HTTP_IF_NONE_MATCH=etag, **headers).status_code, 304)
+        self.client.patch(conversation_url, json.dumps({"name": "Renamed"}), content_type="application/json", **headers)
+        resp = self.client.get(conversation_url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["name"], "Renamed")
+
+        users_url = f"{self.api_prefix}users?users_ids={user_id}"
+        resp = self.client.get(users_url, **headers)
+        self.assertEqual(resp.json()[0]["username"], "etaguser")
+        self.assertEqual(self.client.get(users_url, HTTP_IF_NONE_MATCH=resp["ETag"], **headers).status_code, 304)
+
+    def test_compact_messages(self):
+        resp = self.client.post(
+            f"{self.api_prefix}register/",
+            data=json.dumps({"username": "compactuser", "password": "pwcompact"}),
+            content_type="application/json",
+        )
+        user_id = resp.json()["id"]
+        headers = self.auth_headers(resp)
+        resp = self.client.post(
+            f"{self.api_prefix}chat/", data=json.dumps({"name": "Compact"}), content_type="application/json", **headers
+        )
+        conversation_id = resp.json()["id"]
+        messages_url = f"{self.api_prefix}chat/{conversation_id}/messages/"
+        for i in range(2):
+            message = {
+                "content": f"Message {i}",
+                "issuer_id": user_id,
+                "conversation_id": conversation_id,
+                "timestamp": f"2025-01-01T00:00:0{i}Z",
+            }
+            self.client.post(messages_url, json.dumps(message), content_type="application/json", **headers)
+
+        full = self.client.get(messages_url, **headers).json()
+        resp = self.client.get(messages_url, query_params={"compact": "true"}, **headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["conversation_id"], conversation_id)
+        expected = {key: value for key, value in full[0].items() if key != "conversation_id"}
+        self.assertEqual(resp.json()["messages"][0], expected | {"timestamp": 1735689600000})
+
+        resp = self.client.get(messages_url, query_params={"fields": "id,content,timestamp", "limit": 1}, **headers)
+        self.assertEqual(
+            resp.json()["messages"], [{"id": full[0]["id"], "content": "Message 0", "timestamp": 1735689600000}]
+        )
+        resp = self.client.get(
+            messages_url, query_params={"fields": "content", "since": resp.json()["cursor"]}, **headers
+        )
+        self.assertEqual(resp.json()["messages"], [{"content": "Message 1"}])
+        resp = self.client.get(messages_url, query_params={"fields": "content,password"}, **headers)
+        self.assertEqual(resp.status_code, 422)
+
+
+class StartupTests(SimpleTestCase):
+    IMPORT_TIME_BUDGET_SECONDS = 5
+
+    def test_import_does_not_touch_mongo(self):
+        # Mongo is unreachable and server selection would wait 60s: any round trip at import blows the budget.
+        script = (
+            "import time; start = time.perf_counter(); import django; django.setup(); "
+            "import src.asgi, conversations_api.api as api; "
+            "print(time.perf_counter() - start, api.registry is None)"
+        )
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "src.settings",
+            "MONGO_DB_URL": "mongodb://10.255.255.1:27017",
+            "MONGO_SERVER_SELECTION_TIMEOUT_MS": "60000",
+        }
+        result = subprocess.run(
+            [sys.executable, "-c", script],
+            env=env,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            timeout=self.IMPORT_TIME_BUDGET_SECONDS * 4,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        seconds, registry_unbuilt = result.stdout.split()
+        self.assertLess(float(seconds), self.IMPORT_TIME_BUDGET_SECONDS)
+        self.assertEqual(registry_unbuilt, "True")
+
+
+@override_settings(SECRET_KEY="test-secret-key")
+class SessionTokenAuthTests(SimpleTestCase):
+    def test_resolves_user_without_lookup_once_cached(self):
+        user = User(id="uid", username="alice", password_hash="hash")
+        get_user = Mock(return_value=user)
+        auth = SessionTokenAuth(get_user=get_user)
+        token = issue_session_token("uid")
+        self.assertEqual(auth.authenticate(None, token), user)
+        self.assertEqual(auth.authenticate(None, token), user)
+        get_user.assert_called_once_with("uid")
+
+        get_user.reset_mock()
+        self.assertEqual(
+            auth.authenticate(None, auth.remember(User(id="other", username="bob", password_hash="h"))).id, "other"
+        )
+        get_user.assert_not_called()
+
+    def test_rejects_forged_and_unknown_tokens(self):
+        auth = SessionTokenAuth(get_user=Mock(return_value=None))
+        self.assertIsNone(auth.authenticate(None, "uid:forged:signature"))
+        self.assertIsNone(auth.authenticate(None, issue_session_token("unknown")))
+
+    def test_refuses_tokens_signed_with_public_secret_key(self):
+        auth = SessionTokenAuth(get_user=Mock(return_value=User(id="uid", username="alice", password_hash="hash")))
+        with override_settings(SECRET_KEY=settings.INSECURE_SECRET_KEY, DEBUG=True):
+            token = issue_session_token("uid")
+            self.assertEqual(auth.authenticate(None, token).id, "uid")
+        with override_settings(SECRET_KEY=settings.INSECURE_SECRET_KEY):
+            with self.assertRaises(ImproperlyConfigured):
+                issue_session_token("uid")
+            auth.users_cache.clear()
+            self.assertIsNone(auth.authenticate(None, token))
+
+    def test_async_auth_shares_users_cache(self):
+        user = User(id="uid", username="alice", password_hash="hash")
+        get_user = Mock(return_value=user)
+        session_auth = SessionTokenAuth(get_user=get_user)
+        auth = AsyncSessionTokenAuth(session_auth)
+        self.assertTrue(auth.is_async)
+        self.assertEqual(asyncio.run(auth.authenticate(None, session_auth.remember(user))), user)
+        get_user.assert_not_called()
+
+        session_auth.users_cache.clear()
+        self.assertEqual(asyncio.run(auth.authenticate(None, issue_session_token("uid"))), user)
+        get_user.assert_called_once_with("uid")
+        self.assertIsNone(asyncio.run(auth.authenticate(None, "uid:forged:signature")))
+
+
+class RenderersTests(SimpleTestCase):
+    def test_fast_paths_match_model_dump(self):
+        messages = [
+            Message(
+                id="mid",
+                content="héllo",
+                conversation_id="cid",
+                issuer_id="uid",
+                timestamp=datetime(2025, 1, 1, 12, 30),
+                reacts=[React(emoji="👍", issuer_id="other")],
+            )
+        ]
+        expected = [message.model_dump(mode="json") for message in messages]
+
+        rendered = ORJSONRenderer().render(None, {"messages": messages}, response_status=200)
+        self.assertEqual(json.loads(rendered), {"messages": expected})
+
+        response = json_response(messages, TypeAdapter(list[Message]), status=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), expected)
+
+    def test_compact_messages_response(self):
+        self.assertEqual(epoch_ms(datetime(1970, 1, 1, 0, 0, 1, 500)), 1000)
+        self.assertEqual(epoch_ms(datetime(2025, 1, 1, tzinfo=timezone.utc)), 1735689600000)
+        documents = [{"id": "mid", "content": "hi", "conversation_id": "cid", "timestamp": datetime(2025, 1, 1)}]
+        response = compact_messages_response("cid", documents, "cursor", fields=["content"])
+        self.assertEqual(
+            json.loads(response.content),
+            {"conversation_id": "cid", "cursor": "cursor", "messages": [{"content": "hi"}]},
+        )
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def compress(self, content: bytes, accept_encoding: str, content_type: str = "application/json"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        with patch.object(config, "RESPONSE_COMPRESSION", True):
+            get_response = middleware.compression_middleware(lambda r: HttpResponse(content, content_type=content_type))
+        return get_response(request)
+
+    def test_compresses_large_json_responses(self):
+        content = json.dumps([{"content": "hello"}] * 200).encode()
+        response = self.compress(content, "gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), content)
+
+        self.assertFalse(self.compress(content, "gzip;q=0").has_header("Content-Encoding"))
+        self.assertFalse(self.compress(content, "gzip", content_type="text/plain").has_header("Content-Encoding"))
+        self.assertFalse(self.compress(b"[]", "gzip").has_header("Content-Encoding"))
+        if middleware.brotli is not None:
+            response = self.compress(content, "gzip, br")
+            self.assertEqual(response["Content-Encoding"], "br")
+            self.assertEqual(middleware.brotli.decompress(response.content), content)
+
+    def test_disabled_by_default(self):
+        with patch.object(config, "RESPONSE_COMPRESSION", False), self.assertRaises(MiddlewareNotUsed):
+            middleware.compression_middleware(lambda r: HttpResponse())
@@ -21,12 +21,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = os.environ.get(
-    "BOURRACHO_SECRET_KEY", "django-insecure-!w8n0_sbcb_3a(=wxiylou^@68p8o@s76uyfxkbh*&t)ox0c@g"
-)
+# The fallback key is public: session tokens signed with it are refused unless DEBUG is on.
+INSECURE_SECRET_KEY = "django-insecure-!w8n0_sbcb_3a(=wxiylou^@68p8o@s76uyfxkbh*&t)ox0c@g"
+SECRET_KEY = os.environ.get("BOURRACHO_SECRET_KEY", INSECURE_SECRET_KEY)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = False
+DEBUG = os.environ.get("DJANGO_DEBUG", "false").lower() == "true"
 
 CORS_ALLOW_HEADERS = [
     "*"
@@ -41,6 +41,9 @@ CORS_ALLOW_METHODS = [
     "PUT",
 ]
 
+# Let the frontend read ETags, to send them back in If-None-Match.
+CORS_EXPOSE_HEADERS = ["ETag"]
+
 # Get CORS origins from environment variable or use defaults
 CORS_ORIGINS_ENV = os.environ.get("CORS_ALLOWED_ORIGINS", "")
 if CORS_ORIGINS_ENV:
@@ -81,6 +84,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "conversations_api.middleware.request_context_middleware",
+    "conversations_api.middleware.timing_middleware",
+    "conversations_api.middleware.compression_middleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -0,0 +1,41 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from bourracho.async_messages_store import AsyncMessagesStore
+from bourracho.messages_store import react_update_pipeline
+from bourracho.models import Message, React
+
+MONGO_TEST_DB = "bourracho_test"
+
+
+@pytest.fixture
+def store() -> AsyncMessagesStore:
+    instance = AsyncMessagesStore(MONGO_TEST_DB, client=MagicMock())
+    instance.messages_collection = MagicMock()
+    instance.messages_collection.insert_one = AsyncMock()
+    instance.messages_collection.update_one = AsyncMock()
+    instance.messages_collection.find_one = AsyncMock()
+    yield instance
+
+
+def test_add_message_inserts(store: AsyncMessagesStore):
+    message = Message(id="mid", content="Hello !", conversation_id="cid", issuer_id="uid")
+    asyncio.run(store.add_message(message))
+    store.messages_collection.insert_one.assert_awaited_once_with(message.model_dump())
+
+
+def test_get_messages_returns_validated(store: AsyncMessagesStore):
+    fake_msg = {"conversation_id": "cid", "id": "mid", "content": "Hello !", "issuer_id": "uid"}
+    store.messages_collection.find.return_value.__aiter__.return_value = [fake_msg]
+    result = asyncio.run(store.get_messages("cid"))
+    assert [m.id for m in result] == ["mid"]
+    store.messages_collection.find.assert_called_once_with({"conversation_id": "cid"})
+
+
+def test_add_react_updates_atomically(store: AsyncMessagesStore):
+    react = React(emoji="🤩", issuer_id="uid")
+    store.messages_collection.update_one.return_value.matched_count = 1
+    asyncio.run(store.add_react(react, "mid"))
+    store.messages_collection.update_one.assert_awaited_once_with({"id": "mid"}, react_update_pipeline(react))
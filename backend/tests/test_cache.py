@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+from bourracho.cache import TTLCache
+
+
+def test_get_counts_hits_and_misses():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(maxsize=10, ttl=60)
+    with patch("bourracho.cache.time.monotonic", return_value=0):
+        cache.set("a", 1)
+    with patch("bourracho.cache.time.monotonic", return_value=59):
+        assert cache.get("a") == 1
+    with patch("bourracho.cache.time.monotonic", return_value=61):
+        assert cache.get("a") is None
+    assert cache.stats["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_invalidate():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
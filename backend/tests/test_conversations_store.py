@@ -1,21 +1,22 @@
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from bourracho.conversations_store import ConversationsStore
-from bourracho.models import Conversation
+from bourracho.models import Conversation, Message
 
 MONGO_TEST_DB = "bourracho_test"
 
 
 @pytest.fixture
 def store():
-    with patch("bourracho.conversations_store.MongoClient"):
+    with patch("bourracho.conversations_store.get_mongo_client"):
         instance = ConversationsStore(db_name=MONGO_TEST_DB)
         yield instance
 
 
-def test_create_conversation_validates_and_inserts(store):
+def test_create_conversation_inserts_without_validating(store):
     conversation = MagicMock(spec=Conversation)
     conversation.model_dump.return_value = {"foo": "bar"}
     with (
@@ -23,26 +24,31 @@ def test_create_conversation_validates_and_inserts(store):
         patch("bourracho.conversations_store.Conversation.model_validate") as mock_validate,
     ):
         store.add_conversation(conversation)
-        mock_validate.assert_called_once_with(conversation)
+        mock_validate.assert_not_called()
         mock_coll.insert_one.assert_called_once_with(conversation.model_dump())
 
 
-def test_get_conversation_returns_validated(store):
-    fake_conv = {"id": "cid"}
-    with (
-        patch.object(store, "conversations_collection") as mock_coll,
-        patch("bourracho.conversations_store.Conversation.model_validate", side_effect=lambda x: x),
-    ):
+def test_get_conversation_trusts_stored_document(store):
+    fake_conv = {"_id": "oid", "id": "cid", "users_ids": ["uid"]}
+    with patch.object(store, "conversations_collection") as mock_coll:
         mock_coll.find_one.return_value = fake_conv
         result = store.get_conversation("cid")
-        assert result == fake_conv
+        assert result == Conversation(id="cid", users_ids=["uid"])
         mock_coll.find_one.assert_called_once_with({"id": "cid"})
 
 
+def test_get_conversation_missing(store):
+    with patch.object(store, "conversations_collection") as mock_coll:
+        mock_coll.find_one.return_value = None
+        with pytest.raises(ValueError):
+            store.get_conversation("cid")
+
+
 def test_get_conversations_returns_list(store):
     fake_convs = [{"id": "cid", "users_ids": ["uid"]}]
     with (
         patch.object(store, "conversations_collection") as mock_coll,
+        patch("bourracho.conversations_store.config.TRUSTED_READS", False),
         patch("bourracho.conversations_store.Conversation.model_validate", side_effect=lambda x: x),
     ):
         mock_coll.find.return_value = fake_convs
@@ -54,4 +60,76 @@ def test_get_conversations_returns_list(store):
 def test_add_user_id_to_conversation(store):
     with patch.object(store, "conversations_collection") as mock_coll:
         store.add_user_id_to_conversation("uid", "cid")
-        mock_coll.update_one.assert_called_once_with({"id": "cid"}, {"$addToSet": {"users_ids": "uid"}})
+        mock_coll.update_one.assert_called_once_with(
+            {"id": "cid"}, {"$addToSet": {"users_ids": "uid"}, "$inc": {"revision": 1}}
+        )
+
+
+def test_is_member_caches_users_ids(store):
+    with patch.object(store, "conversations_collection") as mock_coll:
+        mock_coll.find_one.return_value = {"users_ids": ["uid"]}
+        assert store.is_member("uid", "cid")
+        assert store.is_member("uid", "cid")
+        mock_coll.find_one.assert_called_once_with({"id": "cid"}, {"users_ids": 1})
+        assert store.users_ids_cache.stats["hits"] == 1
+
+
+def test_is_member_rechecks_unknown_users(store):
+    with patch.object(store, "conversations_collection") as mock_coll:
+        mock_coll.find_one.return_value = {"users_ids": ["uid"]}
+        assert store.is_member("uid", "cid")
+        mock_coll.find_one.return_value = {"users_ids": ["uid", "new_uid"]}
+        assert store.is_member("new_uid", "cid")
+        assert not store.is_member("intruder", "cid")
+        assert mock_coll.find_one.call_count == 3
+
+
+def test_add_user_id_invalidates_membership_cache(store):
+    with patch.object(store, "conversations_collection") as mock_coll:
+        mock_coll.find_one.return_value = {"users_ids": ["uid"]}
+        store.is_member("uid", "cid")
+        store.add_user_id_to_conversation("other_uid", "cid")
+        assert store.users_ids_cache.get("cid") is None
+
+
+def test_record_messages_updates_activity_and_unread_counters(store):
+    timestamp = datetime(2025, 1, 1)
+    messages = [
+        Message(id="m1", content="a", conversation_id="cid", issuer_id="u1", timestamp=timestamp),
+        Message(id="m2", content="b", conversation_id="cid", issuer_id="u2", timestamp=timestamp),
+    ]
+    with patch.object(store, "conversations_collection") as mock_coll:
+        store.users_ids_cache.set("cid", frozenset({"u1", "u2", "u3"}))
+        mock_coll.update_one.return_value.matched_count = 0
+        store.record_messages("cid", messages)
+        latest_call, counters_call = mock_coll.update_one.call_args_list
+        assert latest_call.args == (
+            {"id": "cid", "last_activity": {"$not": {"$gt": timestamp}}},
+            {
+                "$set": {"last_message": messages[1].model_dump(), "last_activity": timestamp},
+                "$inc": {"revision": 1, "unread_counts.u1": 1, "unread_counts.u2": 1, "unread_counts.u3": 2},
+            },
+        )
+        assert counters_call.args == (
+            {"id": "cid"},
+            {"$inc": {"revision": 1, "unread_counts.u1": 1, "unread_counts.u2": 1, "unread_counts.u3": 2}},
+        )
+
+
+def test_update_last_message_bumps_revision(store):
+    message = Message(id="m1", content="a", conversation_id="cid", issuer_id="u1")
+    with patch.object(store, "conversations_collection") as mock_coll:
+        mock_coll.update_one.return_value.matched_count = 0
+        store.update_last_message(message)
+        latest_call, revision_call = mock_coll.update_one.call_args_list
+        assert latest_call.args[1] == {"$set": {"last_message": message.model_dump()}, "$inc": {"revision": 1}}
+        assert revision_call.args == ({"id": "cid"}, {"$inc": {"revision": 1}})
+
+
+def test_get_revision(store):
+    with patch.object(store, "conversations_collection") as mock_coll:
+        mock_coll.find_one.side_effect = [{"revision": 3}, {}, None]
+        assert store.get_revision("cid") == 3
+        assert store.get_revision("cid") == 0
+        assert store.get_revision("unknown") is None
+        mock_coll.find_one.assert_called_with({"id": "unknown"}, {"_id": 0, "revision": 1})
@@ -0,0 +1,36 @@
+import pytest
+from pydantic import ValidationError
+
+from bourracho.emojis import normalize_emoji
+from bourracho.models import React
+
+
+@pytest.mark.parametrize("value", [":thumbs_up:", ":thumbsup:", "👍"])
+def test_normalize_emoji_to_glyph(value):
+    assert normalize_emoji(value) == "👍"
+
+
+@pytest.mark.parametrize("value", ["\u2764", "\u2764\ufe0f", ":heart:", ":red_heart:"])
+def test_normalize_emoji_to_fully_qualified_glyph(value):
+    assert normalize_emoji(value) == "\u2764\ufe0f"
+
+
+@pytest.mark.parametrize("value", ["hello", ":not_an_emoji:", "👍👍", ""])
+def test_normalize_emoji_rejects_non_emojis(value):
+    with pytest.raises(ValueError):
+        normalize_emoji(value)
+
+
+def test_normalize_emoji_is_memoized():
+    normalize_emoji.cache_clear()
+    normalize_emoji("🤩")
+    normalize_emoji("🤩")
+    assert normalize_emoji.cache_info().hits == 1
+
+
+def test_react_stores_canonical_glyph():
+    react = React(emoji=":thumbs_up:", issuer_id="uid")
+    assert react.emoji == "👍"
+    assert react.model_dump() == {"emoji": "👍", "issuer_id": "uid"}
+    with pytest.raises(ValidationError):
+        React(emoji="not an emoji")
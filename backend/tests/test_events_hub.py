@@ -0,0 +1,178 @@
+import asyncio
+import threading
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from bson import ObjectId
+
+from bourracho.events_hub import EventsBackend, EventsHub, InMemoryEventsBackend, MongoEventsBackend
+from bourracho.models import ConversationEvent, Message
+
+
+def make_event(conversation_id: str, content: str = "Hello !") -> ConversationEvent:
+    message = Message(
+        id="mid", content=content, conversation_id=conversation_id, issuer_id="uid", timestamp=datetime(2025, 1, 1)
+    )
+    return ConversationEvent(type="message_added", conversation_id=conversation_id, message=message)
+
+
+def test_subscribers_receive_events_of_their_conversation():
+    hub = EventsHub(InMemoryEventsBackend())
+
+    async def scenario():
+        subscription = hub.subscribe("cid")
+        other_subscription = hub.subscribe("other_cid")
+        hub.publish(make_event("cid"))
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        assert event.message.content == "Hello !"
+        await asyncio.sleep(0)
+        assert other_subscription.queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_another_thread():
+    hub = EventsHub(InMemoryEventsBackend())
+
+    async def scenario():
+        subscription = hub.subscribe("cid")
+        thread = threading.Thread(target=hub.publish, args=(make_event("cid", "From thread"),))
+        thread.start()
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        thread.join()
+        assert event.message.content == "From thread"
+
+    asyncio.run(scenario())
+
+
+def test_unsubscribe_stops_delivery():
+    hub = EventsHub(InMemoryEventsBackend())
+
+    async def scenario():
+        subscription = hub.subscribe("cid")
+        hub.unsubscribe(subscription)
+        assert "cid" not in hub.subscriptions
+        hub.publish(make_event("cid"))
+        await asyncio.sleep(0)
+        assert subscription.queue.empty()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_drops_events_instead_of_blocking():
+    hub = EventsHub(InMemoryEventsBackend())
+
+    async def scenario():
+        subscription = hub.subscribe("cid")
+        subscription.queue = asyncio.Queue(maxsize=1)
+        hub.publish(make_event("cid", "First"))
+        hub.publish(make_event("cid", "Second"))
+        await asyncio.sleep(0)
+        assert subscription.queue.qsize() == 1
+        assert (await subscription.get()).message.content == "First"
+
+    asyncio.run(scenario())
+
+
+def test_publish_async_moves_blocking_backends_off_the_loop():
+    class RecordingBackend(EventsBackend):
+        def __init__(self):
+            self.threads = []
+
+        def publish(self, event: ConversationEvent) -> None:
+            self.threads.append(threading.current_thread().name)
+
+        def start(self, dispatch) -> None:
+            pass
+
+        def close(self) -> None:
+            pass
+
+    backend = RecordingBackend()
+    asyncio.run(EventsHub(backend).publish_async(make_event("cid")))
+    assert backend.threads[0].startswith("bourracho-blocking")
+
+    hub = EventsHub(InMemoryEventsBackend())
+
+    async def scenario():
+        subscription = hub.subscribe("cid")
+        await hub.publish_async(make_event("cid"))
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        assert event.conversation_id == "cid"
+
+    asyncio.run(scenario())
+
+
+class TailableCursor(list):
+    """Stands for a tailable cursor that dies once its documents are read."""
+
+    alive = True
+
+    def __iter__(self):
+        yield from super().__iter__()
+        self.alive = False
+
+
+def test_mongo_backend_resumes_in_insertion_order():
+    # Ids made by different workers: ``older_id`` is inserted after ``last_id`` but sorts before it.
+    older_id, last_id, new_id, newest_id = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+    documents = {
+        i: {"_id": i, **make_event("cid", str(i)).model_dump()} for i in (older_id, last_id, new_id, newest_id)
+    }
+    backend = MongoEventsBackend(MagicMock())
+    collection = backend.events_collection
+    collection.find_one.return_value = {"_id": last_id}
+    collection.count_documents.return_value = 1
+    collection.find.side_effect = [
+        TailableCursor([documents[last_id], documents[older_id], documents[new_id]]),
+        # The cursor died and is reopened from the start of the collection.
+        TailableCursor([documents[last_id], documents[older_id], documents[new_id], documents[newest_id]]),
+    ]
+    dispatched = []
+
+    def dispatch(event: ConversationEvent):
+        dispatched.append(event.message.content)
+        if len(dispatched) == 3:
+            backend.close()
+
+    backend._tail(dispatch)
+    assert dispatched == [str(older_id), str(new_id), str(newest_id)]
+
+
+def test_mongo_backend_keeps_tailing_after_dispatch_errors():
+    first_id, second_id = ObjectId(), ObjectId()
+    documents = [{"_id": i, **make_event("cid", str(i)).model_dump()} for i in (first_id, second_id)]
+    backend = MongoEventsBackend(MagicMock())
+    collection = backend.events_collection
+    collection.find_one.return_value = None
+    collection.count_documents.return_value = 1
+    collection.find.side_effect = [TailableCursor(documents), TailableCursor(documents)]
+    dispatched = []
+
+    def dispatch(event: ConversationEvent):
+        dispatched.append(event.message.content)
+        if len(dispatched) == 1:
+            raise RuntimeError("Event loop is closed")
+        backend.close()
+
+    backend._tail(dispatch)
+    assert dispatched == [str(first_id), str(second_id)]
+
+
+def test_dispatch_drops_subscriptions_of_closed_loops():
+    hub = EventsHub(InMemoryEventsBackend())
+
+    async def subscribe():
+        return hub.subscribe("cid")
+
+    stale = asyncio.run(subscribe())
+
+    async def scenario():
+        subscription = hub.subscribe("cid")
+        hub.publish(make_event("cid"))
+        event = await asyncio.wait_for(subscription.get(), timeout=1)
+        assert event.conversation_id == "cid"
+        assert hub.subscriptions["cid"] == {subscription}
+
+    asyncio.run(scenario())
+    assert stale.queue.empty()
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import random
+import string
+from unittest.mock import MagicMock
+
+import pytest
+from pymongo import IndexModel, MongoClient, UpdateOne
+from pymongo.errors import OperationFailure
+
+from bourracho import config
+from bourracho.indexes import (
+    INDEXES,
+    CollectionScanError,
+    MissingIndexError,
+    PlanCheckingCollection,
+    check_unique_indexes,
+    ensure_indexes,
+    plan_stages,
+)
+from bourracho.models import Conversation, Message, React
+from bourracho.stores_registry import StoresRegistry
+
+MONGO_URL = os.environ.get("MONGO_DB_URL", "mongodb://localhost:27017/")
+
+COLLSCAN_EXPLANATION = {"queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "COLLSCAN"}}}}
+IXSCAN_EXPLANATION = {
+    "queryPlanner": {
+        "winningPlan": {"queryPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "id_1"}}}
+    }
+}
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {
+        "stage": "OR",
+        "inputStages": [{"stage": "IXSCAN"}, {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}}],
+    }
+    assert list(plan_stages(plan)) == ["OR", "IXSCAN", "FETCH", "COLLSCAN"]
+
+
+def random_db_name() -> str:
+    return "test_bourracho_" + "".join(random.choices(string.ascii_lowercase, k=8))
+
+
+def test_ensure_indexes_creates_declared_indexes():
+    db = MagicMock()
+    ensure_indexes(db)
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            db[collection_name].create_indexes.assert_any_call([index])
+
+
+def test_ensure_indexes_fails_on_unique_index_failure():
+    db = MagicMock()
+
+    def create_indexes(indexes: list[IndexModel]) -> list[str]:
+        if indexes[0].document.get("unique"):
+            raise OperationFailure("Index build failed", code=11000)
+        return [indexes[0].document["name"]]
+
+    db[config.CONVERSATIONS_COLLECTION].create_indexes.side_effect = create_indexes
+    with pytest.raises(OperationFailure):
+        ensure_indexes(db)
+
+
+def test_ensure_indexes_renames_duplicate_usernames():
+    db_name = random_db_name()
+    db = MongoClient(MONGO_URL)[db_name]
+    try:
+        users = db[config.USERS_COLLECTION]
+        users.insert_many([{"id": "first", "username": "charlie"}, {"id": "ghost", "username": "charlie"}])
+        ensure_indexes(db)
+        assert users.find_one({"id": "first"})["username"] == "charlie"
+        assert users.find_one({"id": "ghost"})["username"] == "charlie~ghost"
+        check_unique_indexes(db)
+    finally:
+        MongoClient(MONGO_URL).drop_database(db_name)
+
+
+def test_check_unique_indexes_rejects_missing_indexes():
+    db_name = random_db_name()
+    db = MongoClient(MONGO_URL)[db_name]
+    try:
+        db[config.USERS_COLLECTION].create_index("id", unique=True)
+        with pytest.raises(MissingIndexError):
+            check_unique_indexes(db)
+    finally:
+        MongoClient(MONGO_URL).drop_database(db_name)
+
+
+def test_plan_checking_collection_rejects_collection_scans():
+    collection = MagicMock()
+    cursor = collection.find.return_value
+    cursor.limit.return_value = cursor
+    cursor.clone.return_value.explain.return_value = COLLSCAN_EXPLANATION
+    with pytest.raises(CollectionScanError):
+        PlanCheckingCollection(collection).find_one({"username": "charlie"})
+    collection.database.command.return_value = COLLSCAN_EXPLANATION
+    with pytest.raises(CollectionScanError):
+        PlanCheckingCollection(collection).update_one({"username": "charlie"}, {"$set": {"pseudo": "chacha"}})
+    collection.update_one.assert_not_called()
+    with pytest.raises(CollectionScanError):
+        PlanCheckingCollection(collection).bulk_write([UpdateOne({"username": "charlie"}, {"$set": {"pseudo": "c"}})])
+    collection.bulk_write.assert_not_called()
+
+
+def test_plan_checking_collection_accepts_index_scans():
+    collection = MagicMock()
+    cursor = collection.find.return_value
+    cursor.limit.return_value = cursor
+    cursor.clone.return_value.explain.return_value = IXSCAN_EXPLANATION
+    cursor.__iter__.return_value = iter([{"id": "uid"}])
+    assert PlanCheckingCollection(collection).find_one({"id": "uid"}) == {"id": "uid"}
+
+
+def test_stores_queries_use_indexes(monkeypatch):
+    monkeypatch.setattr(config, "MONGO_CHECK_QUERY_PLANS", True)
+    db_name = random_db_name()
+    registry = StoresRegistry(db_name)
+    try:
+        user = registry.register_user(username="charlie", password="password")
+        assert registry.check_credentials("charlie", "password") == user.id
+        registry.get_users([user.id])
+        conversation_id = registry.create_conversation(user.id, Conversation(name="Test"))
+        registry.join_conversation(user.id, conversation_id)
+        registry.update_conversation(Conversation(id=conversation_id, name="Test2"))
+        registry.list_conversations(user.id)
+        registry.get_conversations_page(user.id)
+        registry.add_message(Message(content="Hello !", conversation_id=conversation_id, issuer_id=user.id))
+        page = registry.get_messages_since(conversation_id)
+        registry.get_messages_since(conversation_id, since=page.cursor)
+        registry.get_messages_page(conversation_id, before=page.cursor)
+        registry.add_react(React(emoji="👍", issuer_id=user.id), page.messages[0].id)
+        registry.get_messages(conversation_id)
+        registry.add_messages(
+            conversation_id, [Message(content="Bye !", conversation_id=conversation_id, issuer_id=user.id)]
+        )
+        registry.mark_read(user.id, conversation_id, cursor=page.cursor)
+        registry.read_markers_store.flush()
+
+        async def async_queries():
+            await registry.check_credentials_async("charlie", "password")
+            await registry.is_member_async(user.id, conversation_id)
+            await registry.get_conversations_page_async(user.id)
+            await registry.add_message_async(
+                Message(content="Hi !", conversation_id=conversation_id, issuer_id=user.id)
+            )
+            await registry.get_messages_since_async(conversation_id, since=page.cursor)
+            await registry.get_message_documents_async(conversation_id)
+            await registry.get_conversation_revision_async(conversation_id)
+
+        asyncio.run(async_queries())
+    finally:
+        MongoClient(MONGO_URL).drop_database(db_name)
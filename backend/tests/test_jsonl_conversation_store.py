@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from pydantic import TypeAdapter
+
+from bourracho.conversation_store import get_conversation_store
+from bourracho.conversation_store.jsonl_conversation_store import JsonlConversationStore
+from bourracho.models import ConversationStoreModel, Message, React
+
+
+@pytest.fixture
+def store(tmp_path) -> JsonlConversationStore:
+    return JsonlConversationStore(str(tmp_path), "cid", compaction_interval=3)
+
+
+def make_message(message_id: str, content: str = "Hello !", timestamp: datetime | None = None) -> Message:
+    return Message(
+        id=message_id, content=content, conversation_id="cid", issuer_id="uid", timestamp=timestamp or datetime.now()
+    )
+
+
+def log_lines(store: JsonlConversationStore) -> list[str]:
+    with open(store.messages_filepath) as f:
+        return f.readlines()
+
+
+def test_add_message_appends_one_record(store):
+    store.add_message(make_message("mid1"))
+    store.add_message(make_message("mid2", "Hello back"))
+    assert len(log_lines(store)) == 2
+    assert [m.content for m in store.get_messages()] == ["Hello !", "Hello back"]
+
+
+def test_reacts_and_updates_are_folded_on_read(store):
+    store.add_message(make_message("mid1"))
+    store.add_react(React(emoji="👍", issuer_id="uid"), "mid1")
+    store.update_message(Message(id="mid1", content="Edited", conversation_id="cid", issuer_id="uid"))
+    assert len(log_lines(store)) == 3
+    message = store.get_messages()[0]
+    assert message.content == "Edited"
+    assert message.reacts == [React(emoji="👍", issuer_id="uid")]
+
+
+def test_message_without_timestamp(store):
+    # Such records were logged before add_message filled timestamps in, they must not break the index.
+    legacy = {"id": "mid0", "content": "Old", "conversation_id": "cid", "issuer_id": "uid", "timestamp": None}
+    store.append_record({"op": "add", "message": legacy})
+    store.add_message(Message(id="mid1", content="Hello !", conversation_id="cid", issuer_id="uid"))
+    assert store.get_message("mid1").timestamp is not None
+    assert [m.id for m in store.get_last_messages(1)] == ["mid1"]
+    assert [m.id for m in store.get_messages_between(datetime.min, datetime.max)] == ["mid1"]
+
+
+def test_add_react_to_unknown_message(store):
+    with pytest.raises(ValueError):
+        store.add_react(React(emoji="👍", issuer_id="uid"), "unknown")
+
+
+def test_log_is_compacted(store):
+    store.add_message(make_message("mid1"))
+    for _ in range(3):
+        store.add_react(React(emoji="👍", issuer_id="uid"), "mid1")
+    assert len(log_lines(store)) == 1
+    assert len(store.get_messages()[0].reacts) == 3
+
+
+def test_truncated_record_is_skipped(store):
+    store.add_message(make_message("mid1"))
+    with open(store.messages_filepath, "a") as f:
+        f.write('{"op": "add", "message": {"id": "mid2"')
+    assert [m.id for m in store.get_messages()] == ["mid1"]
+
+
+def test_messages_written_by_another_store_are_visible(store, tmp_path):
+    other_store = JsonlConversationStore(str(tmp_path), "cid")
+    store.add_message(make_message("mid1"))
+    assert store.get_messages()
+    other_store.add_message(make_message("mid2"))
+    store.add_react(React(emoji="👍", issuer_id="uid"), "mid2")
+    assert store.get_messages()[1].reacts == [React(emoji="👍", issuer_id="uid")]
+
+
+def test_get_message_reads_indexed_records(store):
+    for i in range(5):
+        store.add_message(make_message(f"mid{i}", f"Message {i}"))
+    store.add_react(React(emoji="👍", issuer_id="uid"), "mid2")
+    message = store.get_message("mid2")
+    assert message.content == "Message 2"
+    assert message.reacts == [React(emoji="👍", issuer_id="uid")]
+    with pytest.raises(ValueError):
+        store.get_message("unknown")
+
+
+def test_get_last_messages(store):
+    for i in range(5):
+        store.add_message(make_message(f"mid{i}", f"Message {i}"))
+    assert [m.content for m in store.get_last_messages(2)] == ["Message 3", "Message 4"]
+    assert len(store.get_last_messages(10)) == 5
+
+
+def test_get_messages_between(store):
+    start = datetime(2025, 1, 1)
+    for i in range(20):
+        store.add_message(make_message(f"mid{i}", f"Message {i}", timestamp=start + timedelta(minutes=i)))
+    messages = store.get_messages_between(start + timedelta(minutes=9), start + timedelta(minutes=11))
+    assert [m.content for m in messages] == ["Message 9", "Message 10", "Message 11"]
+
+
+def test_get_messages_between_sorts_by_timestamp(store):
+    start = datetime(2025, 1, 1)
+    for i in (3, 1, 2, 0):
+        store.add_message(make_message(f"mid{i}", f"Message {i}", timestamp=start + timedelta(minutes=i)))
+    aware = make_message(
+        "aware", "Aware", timestamp=datetime(2025, 1, 1, 2, 1, 30, tzinfo=timezone(timedelta(hours=2)))
+    )
+    store.add_message(aware)
+    messages = store.get_messages_between(start + timedelta(seconds=1), start + timedelta(minutes=3))
+    assert [m.content for m in messages] == ["Message 1", "Aware", "Message 2", "Message 3"]
+
+
+def test_index_is_reloaded_without_scanning_log(store, tmp_path):
+    for i in range(3):
+        store.add_message(make_message(f"mid{i}", f"Message {i}"))
+    other_store = JsonlConversationStore(str(tmp_path), "cid")
+    with patch.object(other_store.index, "scan_log") as mock_scan:
+        assert other_store.get_message("mid1").content == "Message 1"
+        mock_scan.assert_not_called()
+
+
+def test_index_follows_compaction(store):
+    store.add_message(make_message("mid1"))
+    store.add_message(make_message("mid2", "Hello back"))
+    for _ in range(3):
+        store.add_react(React(emoji="👍", issuer_id="uid"), "mid2")
+    assert len(log_lines(store)) == 2
+    assert len(store.get_message("mid2").reacts) == 3
+    assert [m.id for m in store.get_last_messages(1)] == ["mid2"]
+
+
+def test_append_after_truncated_record(store):
+    store.add_message(make_message("mid1"))
+    with open(store.messages_filepath, "a") as f:
+        f.write('{"op": "add", "message": {"id": "mid2"')
+    store.add_message(make_message("mid3", "After crash"))
+    assert [m.id for m in store.get_messages()] == ["mid1", "mid3"]
+    assert store.get_message("mid3").content == "After crash"
+
+
+def test_store_is_built_from_its_model(tmp_path):
+    model = TypeAdapter(ConversationStoreModel).validate_python(
+        {"type": "jsonl", "db_dir": str(tmp_path), "conversation_id": "cid"}
+    )
+    store = get_conversation_store(model)
+    assert isinstance(store, JsonlConversationStore)
+    assert store.conversation_id == "cid"
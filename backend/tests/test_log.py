@@ -0,0 +1,56 @@
+import io
+import threading
+from unittest.mock import MagicMock
+
+from loguru import logger
+
+from bourracho.log import QueueSink, SampledLogger
+
+
+def test_sampled_logger_keeps_a_share_of_records():
+    records = []
+    handler_id = logger.add(records.append, level="INFO", format="{message}")
+    try:
+        SampledLogger(rate=1).info("kept {}", 1)
+        SampledLogger(rate=0).info("dropped {}", 2)
+    finally:
+        logger.remove(handler_id)
+    assert [record.strip() for record in records] == ["kept 1"]
+
+
+class Formatted:
+    calls = 0
+
+    def __format__(self, spec: str) -> str:
+        Formatted.calls += 1
+        return "formatted"
+
+
+def test_sampled_logger_formats_lazily():
+    handler_id = logger.add(lambda _: None, level="INFO")
+    try:
+        SampledLogger(rate=0).info("dropped {}", Formatted())
+        assert Formatted.calls == 0
+        SampledLogger(rate=1).info("kept {}", Formatted())
+        assert Formatted.calls == 1
+    finally:
+        logger.remove(handler_id)
+
+
+def test_queue_sink_writes_in_background_and_drops_when_full():
+    stream = io.StringIO()
+    sink = QueueSink(stream, maxsize=100)
+    for i in range(3):
+        sink.write(f"record {i}\n")
+    sink.queue.join()
+    assert stream.getvalue() == "record 0\nrecord 1\nrecord 2\n"
+
+    blocked = threading.Event()
+    slow_stream = MagicMock()
+    slow_stream.write.side_effect = lambda _: blocked.wait(5)
+    sink = QueueSink(slow_stream, maxsize=1)
+    for i in range(5):
+        sink.write(f"record {i}\n")
+    blocked.set()
+    sink.queue.join()
+    assert sink.dropped >= 3
@@ -1,21 +1,24 @@
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pytest
+from pymongo.errors import BulkWriteError
 
-from bourracho.messages_store import MessagesStore
+from bourracho.messages_store import MessagesStore, message_projection, react_update_pipeline
 from bourracho.models import Message, React
+from bourracho.utils import encode_cursor
 
 MONGO_TEST_DB = "bourracho_test"
 
 
 @pytest.fixture
 def store() -> MessagesStore:
-    with patch("bourracho.messages_store.MongoClient"):
+    with patch("bourracho.messages_store.get_mongo_client"):
         instance = MessagesStore(MONGO_TEST_DB)
         yield instance
 
 
-def test_add_message_validates_and_inserts(store):
+def test_add_message_inserts_without_validating(store):
     message = MagicMock(spec=Message)
     message.model_dump.return_value = {"foo": "bar"}
     with (
@@ -23,40 +26,127 @@ def test_add_message_validates_and_inserts(store):
         patch("bourracho.messages_store.Message.model_validate") as mock_validate,
     ):
         store.add_message(message)
-        mock_validate.assert_called_once_with(message)
+        mock_validate.assert_not_called()
         mock_coll.insert_one.assert_called_once_with(message.model_dump())
 
 
-def test_get_messages_returns_validated(store):
-    fake_msg = {"conversation_id": "cid", "id": "mid"}
+def test_get_messages_trusts_stored_documents(store):
+    fake_msg = {
+        "_id": "oid",
+        "id": "mid",
+        "content": "hello",
+        "conversation_id": "cid",
+        "issuer_id": "uid",
+        "timestamp": datetime(2025, 1, 1),
+        "reacts": [{"emoji": "👍", "issuer_id": "other"}],
+        "react_counts": {"👍": 1},
+    }
     with (
         patch.object(store, "messages_collection") as mock_coll,
-        patch("bourracho.messages_store.Message.model_validate", side_effect=lambda x: x),
+        patch("bourracho.messages_store.Message.model_validate") as mock_validate,
     ):
         mock_coll.find.return_value = [fake_msg]
         result = store.get_messages("cid")
-        assert result == [fake_msg]
+        mock_validate.assert_not_called()
         mock_coll.find.assert_called_once_with({"conversation_id": "cid"})
+    assert result == [Message.model_validate(fake_msg)]
+    assert isinstance(result[0].reacts[0], React)
+
+
+def test_get_messages_validates_without_trusted_reads(store):
+    fake_msg = {"conversation_id": "cid", "id": "mid"}
+    with (
+        patch.object(store, "messages_collection") as mock_coll,
+        patch("bourracho.messages_store.config.TRUSTED_READS", False),
+        patch("bourracho.messages_store.Message.model_validate", side_effect=lambda x: x),
+    ):
+        mock_coll.find.return_value = [fake_msg]
+        assert store.get_messages("cid") == [fake_msg]
 
 
 def test_add_react_success(store: MessagesStore):
-    react = MagicMock(spec=React)
-    react.model_dump.return_value = {"foo": "bar"}
+    react = React(emoji="👍", issuer_id="uid")
     with patch.object(store, "messages_collection") as mock_coll:
         mock_coll.update_one.return_value.matched_count = 1
-        with patch("bourracho.messages_store.logger") as mock_logger:
+        with patch("bourracho.messages_store.hot_logger") as mock_logger:
             store.add_react(react, "mid")
-            mock_coll.update_one.assert_called_once_with({"id": "mid"}, {"$set": {"reacts": [react.model_dump()]}})
+            mock_coll.update_one.assert_called_once_with({"id": "mid"}, react_update_pipeline(react))
             mock_logger.info.assert_called()
 
 
+def test_add_react_unknown_message(store: MessagesStore):
+    with patch.object(store, "messages_collection") as mock_coll:
+        mock_coll.update_one.return_value.matched_count = 0
+        with pytest.raises(ValueError):
+            store.add_react(React(emoji="👍", issuer_id="uid"), "mid")
+
+
 def test_get_reacts(store: MessagesStore):
-    fake_msg = {"id": "mid", "reacts": [{"foo": "bar"}]}
-    with (
-        patch.object(store, "messages_collection") as mock_coll,
-        patch("bourracho.messages_store.React.model_validate", side_effect=lambda x: x),
-    ):
+    fake_msg = {"id": "mid", "reacts": [{"emoji": "👍", "issuer_id": "uid"}]}
+    with patch.object(store, "messages_collection") as mock_coll:
         mock_coll.find_one.return_value = fake_msg
         result = store.get_reacts("mid")
-        assert result == [{"foo": "bar"}]
+        assert result == [React(emoji="👍", issuer_id="uid")]
         mock_coll.find_one.assert_called_once_with({"id": "mid"})
+
+
+def test_get_messages_since_filters_after_cursor(store: MessagesStore):
+    timestamp = datetime(2025, 1, 1, 12, 0, 0)
+    cursor = encode_cursor(Message(id="mid", content="", conversation_id="cid", issuer_id="uid", timestamp=timestamp))
+    with patch.object(store, "messages_collection") as mock_coll:
+        mock_coll.find.return_value.sort.return_value.limit.return_value = []
+        page = store.get_messages_since("cid", since=cursor, limit=10)
+        mock_coll.find.assert_called_once_with(
+            {
+                "conversation_id": "cid",
+                "$or": [{"timestamp": {"$gt": timestamp}}, {"timestamp": timestamp, "id": {"$gt": "mid"}}],
+            }
+        )
+        mock_coll.find.return_value.sort.return_value.limit.assert_called_once_with(10)
+        assert page.messages == []
+        assert page.cursor == cursor
+
+
+def test_message_projection_keeps_cursor_fields():
+    assert message_projection(["content"]) == {"_id": 0, "content": 1, "id": 1, "timestamp": 1}
+    assert set(message_projection(None)) == {"_id", *Message.model_fields}
+    with pytest.raises(ValueError, match="password"):
+        message_projection(["content", "password"])
+
+
+def test_get_message_documents_projects_in_mongo(store: MessagesStore):
+    timestamp = datetime(2025, 1, 1, 12, 0, 0)
+    documents = [{"id": "mid", "timestamp": timestamp, "content": "hi"}]
+    with patch.object(store, "messages_collection") as mock_coll:
+        mock_coll.find.return_value.sort.return_value = documents
+        assert store.get_message_documents("cid", fields=["content"]) == (
+            documents,
+            encode_cursor(Message(id="mid", content="", conversation_id="cid", issuer_id="uid", timestamp=timestamp)),
+        )
+        mock_coll.find.assert_called_once_with(
+            {"conversation_id": "cid"}, {"_id": 0, "content": 1, "id": 1, "timestamp": 1}
+        )
+
+
+def test_get_messages_page_sorts_newest_first(store: MessagesStore):
+    with patch.object(store, "messages_collection") as mock_coll:
+        mock_coll.find.return_value.sort.return_value.limit.return_value = []
+        page = store.get_messages_page("cid", limit=10)
+        mock_coll.find.assert_called_once_with({"conversation_id": "cid"})
+        mock_coll.find.return_value.sort.assert_called_once_with([("timestamp", -1), ("id", -1)])
+        assert page.messages == []
+        assert page.cursor is None
+
+
+def test_add_messages_inserts_in_unordered_chunks(store: MessagesStore):
+    messages = [Message(id=f"mid{i}", content="", conversation_id="cid", issuer_id="uid") for i in range(5)]
+    with patch.object(store, "messages_collection") as mock_coll:
+        mock_coll.insert_many.side_effect = [
+            None,
+            BulkWriteError({"writeErrors": [{"index": 0, "errmsg": "duplicate key"}]}),
+            None,
+        ]
+        errors = store.add_messages(messages, chunk_size=2)
+        assert mock_coll.insert_many.call_count == 3
+        mock_coll.insert_many.assert_called_with([messages[4].model_dump()], ordered=False)
+        assert errors == {2: "duplicate key"}
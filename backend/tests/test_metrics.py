@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+
+from bourracho.cache import TTLCache
+from bourracho.metrics import (
+    CacheStats,
+    Histogram,
+    MongoCommandListener,
+    RequestTimings,
+    cache_stats,
+    current_timings,
+    mongo_commands,
+    render_metrics,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test durations.", ("endpoint",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        histogram.observe(("/chat",), value)
+    assert histogram.count(("/chat",)) == 4
+    lines = histogram.render().splitlines()
+    assert lines[:2] == ["# HELP test_seconds Test durations.", "# TYPE test_seconds histogram"]
+    assert lines[2:] == [
+        'test_seconds_bucket{endpoint="/chat",le="0.1"} 1',
+        'test_seconds_bucket{endpoint="/chat",le="1"} 3',
+        'test_seconds_bucket{endpoint="/chat",le="+Inf"} 4',
+        'test_seconds_sum{endpoint="/chat"} 4.05',
+        'test_seconds_count{endpoint="/chat"} 4',
+    ]
+
+
+def test_command_listener_records_per_collection_and_request():
+    listener = MongoCommandListener()
+    labels = ("metrics_test", "find", "ok")
+    before = mongo_commands.count(labels)
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        for request_id in (1, 2):
+            listener.started(
+                SimpleNamespace(
+                    command={"find": "metrics_test"},
+                    command_name="find",
+                    connection_id=("db", 1),
+                    request_id=request_id,
+                )
+            )
+            listener.succeeded(
+                SimpleNamespace(
+                    command_name="find", connection_id=("db", 1), request_id=request_id, duration_micros=1500
+                )
+            )
+    finally:
+        current_timings.reset(token)
+    assert mongo_commands.count(labels) == before + 2
+    assert timings.mongo_commands == 2
+    assert timings.mongo_seconds == 0.003
+    assert listener.collections == {}
+
+
+def test_cache_stats_sums_live_caches_per_name():
+    stats = CacheStats()
+    caches = [TTLCache(maxsize=10, ttl=60) for _ in range(3)]
+    for cache in caches:
+        stats.register("members", cache)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+    assert stats.totals() == {"members": {"hits": 3, "misses": 3, "size": 3}}
+    del cache, caches[1:]
+    assert stats.totals() == {"members": {"hits": 1, "misses": 1, "size": 1}}
+    lines = stats.render().splitlines()
+    assert 'bourracho_cache_hits_total{cache="members"} 1' in lines
+    assert 'bourracho_cache_size{cache="members"} 1' in lines
+
+
+def test_named_caches_are_rendered_in_metrics():
+    cache = TTLCache(maxsize=10, ttl=60, name="metrics_test")
+    cache.get("a")
+    assert cache_stats.totals()["metrics_test"]["misses"] == 1
+    assert 'bourracho_cache_misses_total{cache="metrics_test"} 1' in render_metrics().splitlines()
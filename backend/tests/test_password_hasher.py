@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from bourracho.password_hasher import PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    instance = PasswordHasher(rounds=4, max_workers=2)
+    yield instance
+    instance.shutdown()
+
+
+def test_hash_and_check(hasher):
+    password_hash = hasher.hash("pwd")
+    assert password_hash.startswith("$2b$04$")
+    assert hasher.check("pwd", password_hash)
+    assert not hasher.check("wrong", password_hash)
+
+
+def test_async_hash_and_check(hasher):
+    async def run():
+        password_hash = await hasher.hash_async("pwd")
+        return await asyncio.gather(hasher.check_async("pwd", password_hash), hasher.check_async("no", password_hash))
+
+    assert asyncio.run(run()) == [True, False]
+
+
+def test_needs_rehash(hasher):
+    assert not hasher.needs_rehash(hasher.hash("pwd"))
+    assert PasswordHasher(rounds=5, max_workers=1).needs_rehash(hasher.hash("pwd"))
+    assert not PasswordHasher(rounds=4, max_workers=1).needs_rehash(PasswordHasher(rounds=5).hash("pwd"))
+    assert not hasher.needs_rehash("not a bcrypt hash")
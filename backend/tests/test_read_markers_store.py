@@ -0,0 +1,66 @@
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from bourracho.read_markers_store import ReadMarkersStore
+
+MONGO_TEST_DB = "bourracho_test"
+
+
+@pytest.fixture
+def store():
+    with patch("bourracho.read_markers_store.get_mongo_client"):
+        instance = ReadMarkersStore(MONGO_TEST_DB, on_flush=MagicMock(), flush_interval=3600)
+        yield instance
+        instance.stopped.set()
+        instance.flush_requested.set()
+
+
+def test_advance_keeps_furthest_position(store):
+    first, second = (datetime(2025, 1, 1), "m1"), (datetime(2025, 1, 2), "m2")
+    store.advance("uid", "cid", second)
+    store.advance("uid", "cid", first)
+    store.advance("other", "cid", first)
+    assert store.pending == {("uid", "cid"): second, ("other", "cid"): first}
+
+
+def test_flush_writes_pending_markers_in_one_batch(store):
+    timestamp = datetime(2025, 1, 1)
+    with patch.object(store, "read_markers_collection") as mock_coll:
+        store.advance("uid", "cid", (timestamp, "m1"))
+        store.advance("other", "cid", (timestamp, "m1"))
+        assert store.flush() == 2
+        requests = mock_coll.bulk_write.call_args.args[0]
+        assert len(requests) == 2
+        assert requests[0]._filter == {
+            "user_id": "uid",
+            "conversation_id": "cid",
+            "$or": [{"timestamp": {"$lt": timestamp}}, {"timestamp": timestamp, "message_id": {"$lt": "m1"}}],
+        }
+        assert requests[0]._doc == {"$set": {"timestamp": timestamp, "message_id": "m1"}}
+        assert requests[0]._upsert
+        store.on_flush.assert_called_once_with({("uid", "cid"): (timestamp, "m1"), ("other", "cid"): (timestamp, "m1")})
+        assert store.pending == {}
+        assert store.flush() == 0
+
+
+def test_flush_ignores_markers_already_ahead(store):
+    error = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]})
+    with patch.object(store, "read_markers_collection") as mock_coll:
+        mock_coll.bulk_write.side_effect = error
+        store.advance("uid", "cid", (datetime(2025, 1, 1), "m1"))
+        assert store.flush() == 1
+        store.on_flush.assert_called_once()
+
+
+def test_get_position_merges_pending_and_stored(store):
+    stored, pending = (datetime(2025, 1, 2), "m2"), (datetime(2025, 1, 1), "m1")
+    with patch.object(store, "read_markers_collection") as mock_coll:
+        mock_coll.find_one.return_value = {"timestamp": stored[0], "message_id": stored[1]}
+        store.advance("uid", "cid", pending)
+        assert store.get_position("uid", "cid") == stored
+        mock_coll.find_one.return_value = None
+        assert store.get_position("uid", "cid") == pending
+        assert store.get_position("other", "cid") is None
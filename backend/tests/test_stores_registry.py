@@ -1,10 +1,16 @@
+import asyncio
 import os
 import random
 import string
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from threading import Thread
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from pymongo import MongoClient
 
+from bourracho.events_hub import EventsHub, InMemoryEventsBackend
 from bourracho.models import Conversation, Message, React
 from bourracho.stores_registry import StoresRegistry
 
@@ -25,6 +31,7 @@ def stores_registry() -> StoresRegistry:
     db_name = random_db_name()
     store = StoresRegistry(db_name)
     yield store
+    store.close()
     drop_database(db_name)
 
 
@@ -37,6 +44,21 @@ def test_auth(stores_registry: StoresRegistry):
     retrieved = stores_registry.get_user(user.id)
     assert retrieved.id == user.id
     assert retrieved.username == user.username
+    with pytest.raises(ValueError):
+        stores_registry.register_user(username="charlie", password="other")
+
+
+def test_auth_async(stores_registry: StoresRegistry):
+    async def scenario():
+        user = await stores_registry.register_user_async(username="charlie", password="password")
+        assert await stores_registry.check_credentials_async("charlie", "password") == user.id
+        assert await stores_registry.check_credentials_async("charlie", "wrong_password") is None
+        assert await stores_registry.check_credentials_async("nobody", "password") is None
+        with pytest.raises(ValueError):
+            await stores_registry.register_user_async(username="charlie", password="other")
+
+    asyncio.run(scenario())
+    assert stores_registry.check_credentials("charlie", "password") is not None
 
 
 def test_conversations(stores_registry: StoresRegistry):
@@ -79,6 +101,9 @@ def test_messages(stores_registry: StoresRegistry):
     # User 1 post a first message to conv 1 and react to it
     stores_registry.add_message(Message(content="Hello !", conversation_id=conv1_id, issuer_id=user1.id))
     assert len(stores_registry.get_messages(conv1_id)) == 1
+    # Timestamps are stored in UTC, as Mongo reads them back.
+    utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+    assert abs(stores_registry.get_messages(conv1_id)[0].timestamp - utc_now).total_seconds() < 60
     assert stores_registry.get_messages(conv1_id)[0].content == "Hello !"
     stores_registry.add_react(React(emoji="👍", issuer_id=user1.id), stores_registry.get_messages(conv1_id)[0].id)
     assert stores_registry.get_messages(conv1_id)[0].content == "Hello !"
@@ -107,3 +132,328 @@ def test_messages(stores_registry: StoresRegistry):
     conv1_messages = stores_registry.get_messages(conv1_id)
     assert conv1_messages[0].reacts[0].emoji == "🤩"
     assert conv1_messages[0].reacts[1].emoji == "👍"
+
+
+def test_get_messages_since(stores_registry: StoresRegistry):
+    user = stores_registry.register_user(username="charlie", password="password")
+    conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+    for i in range(5):
+        stores_registry.add_message(
+            Message(
+                content=f"Message {i}", conversation_id=conv_id, issuer_id=user.id, timestamp=datetime(2025, 1, 1, 0, i)
+            )
+        )
+
+    page = stores_registry.get_messages_since(conv_id, limit=3)
+    assert [m.content for m in page.messages] == ["Message 0", "Message 1", "Message 2"]
+    page = stores_registry.get_messages_since(conv_id, since=page.cursor)
+    assert [m.content for m in page.messages] == ["Message 3", "Message 4"]
+    last_cursor = page.cursor
+
+    page = stores_registry.get_messages_since(conv_id, since=last_cursor)
+    assert page.messages == []
+    assert page.cursor == last_cursor
+
+    stores_registry.add_message(Message(content="Message 5", conversation_id=conv_id, issuer_id=user.id))
+    page = stores_registry.get_messages_since(conv_id, since=last_cursor)
+    assert [m.content for m in page.messages] == ["Message 5"]
+    page = stores_registry.get_messages_since(conv_id, after_id=page.messages[0].id)
+    assert page.messages == []
+
+
+def test_get_message_documents(stores_registry: StoresRegistry):
+    user = stores_registry.register_user(username="dora", password="password")
+    conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+    for i in range(3):
+        stores_registry.add_message(
+            Message(
+                content=f"Message {i}", conversation_id=conv_id, issuer_id=user.id, timestamp=datetime(2025, 1, 1, 0, i)
+            )
+        )
+
+    documents, cursor = stores_registry.get_message_documents(conv_id, fields=["content"])
+    assert [set(d) for d in documents] == [{"id", "timestamp", "content"}] * 3
+    assert [d["content"] for d in documents] == ["Message 0", "Message 1", "Message 2"]
+    assert cursor == stores_registry.get_messages_since(conv_id).cursor
+
+    page = stores_registry.get_messages_since(conv_id, limit=1)
+    documents, _ = stores_registry.get_message_documents(conv_id, since=page.cursor, limit=1)
+    assert [d["content"] for d in documents] == ["Message 1"]
+    assert "issuer_id" in documents[0]
+    assert (
+        asyncio.run(stores_registry.get_message_documents_async(conv_id, since=page.cursor))[0]
+        == (stores_registry.get_message_documents(conv_id, since=page.cursor)[0])
+    )
+
+
+def test_get_messages_page(stores_registry: StoresRegistry):
+    user = stores_registry.register_user(username="charlie", password="password")
+    conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+    for i in range(5):
+        stores_registry.add_message(
+            Message(
+                content=f"Message {i}", conversation_id=conv_id, issuer_id=user.id, timestamp=datetime(2025, 1, 1, 0, i)
+            )
+        )
+
+    page = stores_registry.get_messages_page(conv_id, limit=2)
+    assert [m.content for m in page.messages] == ["Message 4", "Message 3"]
+    page = stores_registry.get_messages_page(conv_id, before=page.cursor, limit=2)
+    assert [m.content for m in page.messages] == ["Message 2", "Message 1"]
+    page = stores_registry.get_messages_page(conv_id, before=page.cursor, limit=2)
+    assert [m.content for m in page.messages] == ["Message 0"]
+    assert page.cursor is None
+
+
+def test_async_hot_paths(stores_registry: StoresRegistry):
+    user = stores_registry.register_user(username="charlie", password="password")
+    conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+
+    async def post_and_read():
+        await stores_registry.add_message_async(Message(content="Hello !", conversation_id=conv_id, issuer_id=user.id))
+        with pytest.raises(ValueError):
+            await stores_registry.add_message_async(Message(content="Hi", conversation_id=conv_id, issuer_id="other"))
+        page = await stores_registry.get_messages_since_async(conv_id, limit=10)
+        conversations = await stores_registry.get_conversations_page_async(user.id)
+        return page, conversations
+
+    page, conversations = asyncio.run(post_and_read())
+    assert [m.content for m in page.messages] == ["Hello !"]
+    assert stores_registry.get_messages(conv_id) == page.messages
+    assert conversations.conversations[0].last_message.content == "Hello !"
+    # Another event loop gets stores of its own.
+    assert asyncio.run(stores_registry.get_messages_async(conv_id)) == page.messages
+
+
+def test_conversation_revision(stores_registry: StoresRegistry):
+    user = stores_registry.register_user(username="charlie", password="password")
+    conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+    assert stores_registry.get_conversation_revision("unknown") is None
+    revisions = [stores_registry.get_conversation_revision(conv_id)]
+
+    message = Message(content="Hello !", conversation_id=conv_id, issuer_id=user.id)
+    stores_registry.add_message(message)
+    revisions.append(stores_registry.get_conversation_revision(conv_id))
+    stores_registry.add_react(React(emoji="👍", issuer_id=user.id), message.id)
+    revisions.append(stores_registry.get_conversation_revision(conv_id))
+    stores_registry.update_message(Message(id=message.id, content="Edited", conversation_id=conv_id, issuer_id=user.id))
+    revisions.append(stores_registry.get_conversation_revision(conv_id))
+    stores_registry.update_conversation(Conversation(id=conv_id, name="Renamed"))
+    revisions.append(stores_registry.get_conversation_revision(conv_id))
+    stores_registry.get_messages(conv_id)
+    assert stores_registry.get_conversation_revision(conv_id) == revisions[-1]
+    assert revisions == sorted(set(revisions))
+
+
+def test_message_events_are_published():
+    db_name = random_db_name()
+    backend = InMemoryEventsBackend()
+    stores_registry = StoresRegistry(db_name, events_hub=EventsHub(backend))
+    published = []
+    backend.start(published.append)
+    try:
+        user = stores_registry.register_user(username="charlie", password="password")
+        conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+        stores_registry.add_message(Message(content="Hello !", conversation_id=conv_id, issuer_id=user.id))
+        message_id = published[0].message.id
+        stores_registry.add_react(React(emoji="👍", issuer_id=user.id), message_id)
+        assert [e.type for e in published] == ["message_added", "message_updated"]
+        assert all(e.conversation_id == conv_id for e in published)
+        assert published[1].message.reacts == [React(emoji="👍", issuer_id=user.id)]
+        stores_registry.add_messages(conv_id, [{"content": f"Imported {i}", "issuer_id": user.id} for i in range(3)])
+        assert [e.type for e in published[2:]] == ["messages_imported"]
+        assert published[2].message is None
+    finally:
+        drop_database(db_name)
+
+
+def test_concurrent_reacts(stores_registry: StoresRegistry):
+    users = [stores_registry.register_user(username=f"user{i}", password="password") for i in range(10)]
+    conv_id = stores_registry.create_conversation(users[0].id, Conversation(name="Test"))
+    stores_registry.add_message(Message(content="React to me", conversation_id=conv_id, issuer_id=users[0].id))
+    message_id = stores_registry.get_messages(conv_id)[0].id
+    emojis = ["👍", "🤩"]
+
+    def react(args):
+        i, user = args
+        stores_registry.add_react(React(emoji=emojis[i % 2], issuer_id=user.id), message_id)
+        stores_registry.add_react(React(emoji=emojis[(i + 1) % 2], issuer_id=user.id), message_id)
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        list(executor.map(react, enumerate(users)))
+
+    message = stores_registry.get_message(message_id)
+    assert len(message.reacts) == len(users)
+    assert {r.issuer_id for r in message.reacts} == {u.id for u in users}
+    assert message.react_counts == {"👍": 5, "🤩": 5}
+
+
+def test_add_messages(stores_registry: StoresRegistry):
+    user = stores_registry.register_user(username="charlie", password="password")
+    conv_id = stores_registry.create_conversation(user.id, Conversation(name="Test"))
+    stores_registry.add_message(Message(id="existing", content="Hello !", conversation_id=conv_id, issuer_id=user.id))
+    messages = [
+        {"content": "Imported 0", "issuer_id": user.id},
+        {"issuer_id": user.id},
+        {"content": "Intruder", "issuer_id": "unknown"},
+        {"id": "existing", "content": "Duplicate", "issuer_id": user.id},
+        Message(content="Imported 1", conversation_id="ignored", issuer_id=user.id),
+    ]
+    report = stores_registry.add_messages(conv_id, messages)
+    assert len(report.inserted_ids) == 2
+    assert [e.index for e in report.errors] == [1, 2, 3]
+    contents = {m.content for m in stores_registry.get_messages(conv_id)}
+    assert contents == {"Hello !", "Imported 0", "Imported 1"}
+
+    batch = [{"content": f"Batch {i}", "issuer_id": user.id} for i in range(20)]
+    stores_registry.add_messages(conv_id, batch)
+    page = stores_registry.get_messages_since(conv_id, limit=50)
+    contents = [m.content for m in page.messages if m.content.startswith("Batch")]
+    assert contents == [m["content"] for m in batch]
+
+
+def test_list_users(stores_registry: StoresRegistry):
+    users = sorted(
+        (stores_registry.register_user(username=f"user{i}", password="password") for i in range(3)), key=lambda u: u.id
+    )
+    page = stores_registry.list_users(limit=2)
+    assert [u.id for u in page] == [u.id for u in users[:2]]
+    assert not hasattr(page[0], "password_hash")
+    assert [u.id for u in stores_registry.list_users(after=page[-1].id, limit=2)] == [users[2].id]
+    assert [u.username for u in stores_registry.get_users([users[2].id, users[0].id])] == [
+        users[2].username,
+        users[0].username,
+    ]
+
+
+def test_get_conversations_page(stores_registry: StoresRegistry):
+    user1 = stores_registry.register_user(username="charlie", password="password")
+    user2 = stores_registry.register_user(username="alice", password="password")
+    quiet_id = stores_registry.create_conversation(user1.id, Conversation(name="Quiet"))
+    older_id = stores_registry.create_conversation(user1.id, Conversation(name="Older"))
+    recent_id = stores_registry.create_conversation(user1.id, Conversation(name="Recent"))
+    for conversation_id in (quiet_id, older_id, recent_id):
+        stores_registry.join_conversation(user2.id, conversation_id)
+
+    def post(conversation_id, issuer_id, content, second):
+        message = Message(
+            content=content,
+            conversation_id=conversation_id,
+            issuer_id=issuer_id,
+            timestamp=datetime(2025, 1, 1, 0, 0, second),
+        )
+        stores_registry.add_message(message)
+        return message
+
+    post(older_id, user2.id, "Hi", 1)
+    post(recent_id, user2.id, "Hey", 2)
+    last = post(recent_id, user2.id, "Anyone?", 3)
+    post(recent_id, user1.id, "Late delivery", 0)
+
+    page = stores_registry.get_conversations_page(user1.id, limit=2)
+    assert [c.id for c in page.conversations] == [recent_id, older_id]
+    recent = page.conversations[0]
+    assert recent.last_message.id == last.id
+    assert recent.last_activity == last.timestamp
+    assert recent.unread_count == 2
+    assert page.conversations[1].unread_count == 1
+    page = stores_registry.get_conversations_page(user1.id, before=page.cursor, limit=2)
+    assert [c.id for c in page.conversations] == [quiet_id]
+    assert page.conversations[0].last_message is None
+    assert page.cursor is None
+    with patch("bourracho.conversations_store.config.CONVERSATIONS_MAX_PAGE_SIZE", 1):
+        page = stores_registry.get_conversations_page(user1.id, paginated=False)
+    assert [c.id for c in page.conversations] == [recent_id, older_id, quiet_id]
+    assert page.cursor is None
+    assert stores_registry.get_conversations_page(user2.id).conversations[0].unread_count == 1
+
+    stores_registry.update_message(Message(id=last.id, content="Edited", conversation_id=recent_id, issuer_id=user2.id))
+    assert stores_registry.get_conversations_page(user1.id).conversations[0].last_message.content == "Edited"
+
+
+def test_read_markers(stores_registry: StoresRegistry):
+    user1 = stores_registry.register_user(username="charlie", password="password")
+    user2 = stores_registry.register_user(username="alice", password="password")
+    conversation_id = stores_registry.create_conversation(user1.id, Conversation(name="Test"))
+    stores_registry.join_conversation(user2.id, conversation_id)
+    messages = [
+        Message(
+            content=f"Message {i}",
+            conversation_id=conversation_id,
+            issuer_id=user2.id,
+            timestamp=datetime(2025, 1, 1, 0, 0, i),
+        )
+        for i in range(3)
+    ]
+    for message in messages:
+        stores_registry.add_message(message)
+    stores_registry.add_message(
+        Message(content="Mine", conversation_id=conversation_id, issuer_id=user1.id, timestamp=datetime(2025, 1, 2))
+    )
+    assert stores_registry.get_read_state(user1.id, conversation_id).unread_count == 3
+
+    state = stores_registry.mark_read(user1.id, conversation_id, message_id=messages[1].id)
+    assert state.unread_count == 1
+    assert stores_registry.mark_read(user1.id, conversation_id, message_id=messages[0].id).cursor == state.cursor
+    assert stores_registry.get_conversations_page(user1.id).conversations[0].unread_count == 3
+    stores_registry.read_markers_store.flush()
+    assert stores_registry.get_read_state(user1.id, conversation_id) == state
+    assert stores_registry.get_conversations_page(user1.id).conversations[0].unread_count == 1
+
+    page = stores_registry.get_messages_since(conversation_id)
+    assert stores_registry.mark_read(user1.id, conversation_id, cursor=page.cursor).unread_count == 0
+    with pytest.raises(ValueError):
+        stores_registry.mark_read("intruder", conversation_id, cursor=page.cursor)
+
+
+def test_unread_counts_keep_messages_added_while_counting(stores_registry: StoresRegistry):
+    user1 = stores_registry.register_user(username="charlie", password="password")
+    user2 = stores_registry.register_user(username="alice", password="password")
+    conversation_id = stores_registry.create_conversation(user1.id, Conversation(name="Test"))
+    stores_registry.join_conversation(user2.id, conversation_id)
+    stores_registry.add_message(
+        Message(content="Read", conversation_id=conversation_id, issuer_id=user2.id, timestamp=datetime(2025, 1, 1))
+    )
+    page = stores_registry.get_messages_since(conversation_id)
+    stores_registry.mark_read(user1.id, conversation_id, cursor=page.cursor)
+    count_messages_after = stores_registry.messages_store.count_messages_after
+
+    def count_then_receive(*args, **kwargs):
+        count = count_messages_after(*args, **kwargs)
+        if count_messages_after_mock.call_count == 1:
+            stores_registry.add_message(
+                Message(content="New", conversation_id=conversation_id, issuer_id=user2.id, timestamp=datetime.now())
+            )
+        return count
+
+    with patch.object(
+        stores_registry.messages_store, "count_messages_after", side_effect=count_then_receive
+    ) as count_messages_after_mock:
+        stores_registry.read_markers_store.flush()
+    assert count_messages_after_mock.call_count == 2
+    assert stores_registry.get_conversations_page(user1.id).conversations[0].unread_count == 1
+
+
+def test_async_client_replaced_for_another_loop_is_closed(stores_registry: StoresRegistry):
+    running_loop = asyncio.new_event_loop()
+    thread = Thread(target=running_loop.run_forever, daemon=True)
+    thread.start()
+
+    async def get_client():
+        stores_registry.async_stores()
+        return stores_registry.async_stores_by_loop[1]
+
+    with patch("bourracho.stores_registry.AsyncMongoClient") as client_class:
+        client_class.side_effect = lambda *args, **kwargs: AsyncMock()
+        first = asyncio.run_coroutine_threadsafe(get_client(), running_loop).result(timeout=5)
+        second = asyncio.run(get_client())
+        assert second is not first
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0), running_loop).result(timeout=5)
+        first.close.assert_awaited_once()
+        second.close.assert_not_awaited()
+
+    stores_registry.close()
+    assert stores_registry.async_stores_by_loop is None
+    running_loop.call_soon_threadsafe(running_loop.stop)
+    thread.join(timeout=5)
+    running_loop.close()
@@ -1,16 +1,19 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
+from pymongo.errors import DuplicateKeyError
 
+from bourracho import config
 from bourracho.models import User
-from bourracho.users_store import UsersStore
+from bourracho.password_hasher import PasswordHasher
+from bourracho.users_store import PROFILE_PROJECTION, UsersStore
 
 MONGO_TEST_DB = "bourracho_test"
 
 
 @pytest.fixture
 def store():
-    with patch("bourracho.users_store.MongoClient"):
+    with patch("bourracho.users_store.get_mongo_client"):
         instance = UsersStore(MONGO_TEST_DB)
         yield instance
 
@@ -20,11 +23,19 @@ def test_add_user_inserts(store):
     user.username = "testuser"
     user.model_dump.return_value = {"foo": "bar"}
     with patch.object(store, "users_collection") as mock_coll:
-        mock_coll.find_one.return_value = None  # No existing user
         store.add_user(user)
         mock_coll.insert_one.assert_called_once_with(user.model_dump())
 
 
+def test_add_user_rejects_taken_username(store):
+    user = MagicMock(spec=User)
+    user.username = "testuser"
+    with patch.object(store, "users_collection") as mock_coll:
+        mock_coll.insert_one.side_effect = DuplicateKeyError("E11000 duplicate key error")
+        with pytest.raises(ValueError, match="testuser"):
+            store.add_user(user)
+
+
 def test_get_user_found(store):
     fake_user = {"id": "uid"}
     with (
@@ -55,3 +66,46 @@ def test_check_credentials(store):
         result = store.check_credentials("uid", "pwd")
         assert result == user.id
         mock_coll.find_one.assert_called_with({"username": "uid"})
+
+
+def test_check_credentials_upgrades_outdated_hash(store):
+    with patch.object(store, "users_collection") as mock_coll:
+        user = store.get_new_user("uid", "pwd")
+        mock_coll.find_one.return_value = user.model_dump()
+        store.password_hasher = PasswordHasher(rounds=store.password_hasher.rounds + 1, max_workers=1)
+        assert store.check_credentials("uid", "pwd") == user.id
+        query, update = mock_coll.update_one.call_args.args
+        assert query == {"id": user.id}
+        assert store.password_hasher.check("pwd", update["$set"]["password_hash"])
+        assert not store.password_hasher.needs_rehash(update["$set"]["password_hash"])
+
+
+def test_check_credentials_keeps_current_hash(store):
+    with patch.object(store, "users_collection") as mock_coll:
+        user = store.get_new_user("uid", "pwd")
+        mock_coll.find_one.return_value = user.model_dump()
+        assert store.check_credentials("uid", "pwd") == user.id
+        mock_coll.update_one.assert_not_called()
+
+
+def test_get_users_fetches_cache_misses_once(store):
+    with patch.object(store, "users_collection") as mock_coll:
+        mock_coll.find.return_value = [{"id": "u1", "username": "alice"}, {"id": "u2", "username": "bob"}]
+        assert [p.username for p in store.get_users(["u2", "u1", "unknown"])] == ["bob", "alice"]
+        mock_coll.find.assert_called_once_with({"id": {"$in": ["u2", "u1", "unknown"]}}, PROFILE_PROJECTION)
+
+        mock_coll.find.reset_mock()
+        mock_coll.find.return_value = [{"id": "u3", "username": "carol"}]
+        assert [p.username for p in store.get_users(["u1", "u3", "u1"])] == ["alice", "carol"]
+        mock_coll.find.assert_called_once_with({"id": {"$in": ["u3"]}}, PROFILE_PROJECTION)
+
+
+def test_list_users_pages_by_id(store):
+    with patch.object(store, "users_collection") as mock_coll:
+        cursor = mock_coll.find.return_value
+        cursor.sort.return_value.limit.return_value = [{"id": "u2", "username": "bob"}]
+        assert [p.id for p in store.list_users(after="u1", limit=10_000)] == ["u2"]
+        mock_coll.find.assert_called_once_with({"id": {"$gt": "u1"}}, PROFILE_PROJECTION)
+        cursor.sort.assert_called_once_with("id", 1)
+        cursor.sort.return_value.limit.assert_called_once_with(config.USERS_MAX_PAGE_SIZE)
+        assert store.profiles_cache.get("u2").username == "bob"
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from bourracho.conversations_store import ConversationsStore
+from bourracho.messages_store import MessagesStore
+from bourracho.models import Conversation, Message
+from bourracho.users_store import UsersStore
+from bourracho.utils import decode_cursor, encode_cursor, encode_keyset, get_mongo_client, trusted_model
+
+MONGO_TEST_DB = "bourracho_test"
+
+
+def test_stores_share_one_mongo_client():
+    get_mongo_client.cache_clear()
+    with patch("bourracho.utils.MongoClient") as mock_client:
+        stores = [ConversationsStore(MONGO_TEST_DB), MessagesStore(MONGO_TEST_DB), UsersStore(MONGO_TEST_DB)]
+        assert all(store.client is mock_client.return_value for store in stores)
+        mock_client.assert_called_once()
+    get_mongo_client.cache_clear()
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2025, 1, 1, 12, 30, 15, 123000)
+    message = Message(id="mid", content="", conversation_id="cid", issuer_id="uid", timestamp=timestamp)
+    assert decode_cursor(encode_cursor(message)) == (timestamp, "mid")
+
+
+def test_timestamps_are_naive_utc():
+    paris = timezone(timedelta(hours=2))
+    message = Message(
+        content="", conversation_id="cid", issuer_id="uid", timestamp=datetime(2025, 6, 1, 14, tzinfo=paris)
+    )
+    assert message.timestamp == datetime(2025, 6, 1, 12)
+    cursor = encode_keyset(datetime(2025, 6, 1, 14, tzinfo=paris), "mid")
+    assert decode_cursor(cursor) == (datetime(2025, 6, 1, 12), "mid")
+
+
+def test_decode_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_trusted_model_skips_validation():
+    document = {"_id": "oid", "id": "cid", "users_ids": ["uid"], "name": "name", "is_locked": False, "extra": 1}
+    with patch.object(Conversation, "model_validate") as mock_validate:
+        conversation = trusted_model(Conversation, document)
+        mock_validate.assert_not_called()
+    assert conversation == Conversation(id="cid", users_ids=["uid"], name="name", is_locked=False)
+    assert conversation.model_fields_set == set(Conversation.model_fields)
+
+
+def test_trusted_model_validates_incomplete_documents():
+    assert trusted_model(Conversation, {"id": "cid"}) == Conversation(id="cid")
+    with patch("bourracho.utils.config.TRUSTED_READS", False), pytest.raises(ValueError):
+        trusted_model(Conversation, {"id": "cid", "users_ids": "not-a-list", "name": "name", "is_locked": False})
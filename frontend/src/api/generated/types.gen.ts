@@ -404,7 +404,20 @@ export type ConversationsApiApiPatchConversationResponse =
 export type ConversationsApiApiGetUsersData = {
   body?: never
   path?: never
-  query?: never
+  query?: {
+    /**
+     * Users Ids
+     */
+    users_ids?: Array<string> | null
+    /**
+     * After
+     */
+    after?: string | null
+    /**
+     * Limit
+     */
+    limit?: number | null
+  }
   url: '/api/users'
 }
 
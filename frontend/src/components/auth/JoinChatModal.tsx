@@ -13,6 +13,7 @@ import {
 } from '@/components/ui/dialog'
 import { conversationsApiApiJoinConversation } from '@/api/generated'
 import { showToast } from '@/lib/toast'
+import { getAuthHeaders } from '@/lib/auth'
 import type { Conversation, User } from '@/api/generated'
 
 interface JoinChatModalProps {
@@ -39,9 +40,7 @@ export default function JoinChatModal({
           path: {
             conversation_id: conversationId.trim(),
           },
-          headers: {
-            'User-Id': user.id,
-          },
+          headers: getAuthHeaders(user),
         })
 
         if (response.data) {
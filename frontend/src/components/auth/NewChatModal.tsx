@@ -12,6 +12,7 @@ import {
   DialogTrigger,
 } from '@/components/ui/dialog'
 import { showToast } from '@/lib/toast'
+import { getAuthHeaders } from '@/lib/auth'
 import { Copy, Check, MessageCircle } from 'lucide-react'
 import { conversationsApiApiCreateConversation } from '@/api/generated'
 import type { User, Conversation } from '@/api/generated'
@@ -44,9 +45,7 @@ export default function NewChatModal({
 
         const response = await conversationsApiApiCreateConversation({
           body: conversationData,
-          headers: {
-            'User-Id': user.id,
-          },
+          headers: getAuthHeaders(user),
         })
 
         if (response.data && 'id' in response.data) {
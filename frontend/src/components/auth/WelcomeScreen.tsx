@@ -1,18 +1,19 @@
 import { useEffect, useState } from 'react'
 import type { User, Conversation } from '@/api/generated'
-import {
-  conversationsApiApiListConversations,
-  conversationsApiApiGetUsers,
-} from '@/api/generated'
+import { conversationsApiApiListConversations } from '@/api/generated'
 import AppHeader from '@/components/layout/AppHeader'
 import { Button } from '@/components/ui/button'
 import { MessageCircle, Users, Lock, Unlock } from 'lucide-react'
 import { showToast } from '@/lib/toast'
+import { getAuthHeaders } from '@/lib/auth'
+import { fetchUsersByIds } from '@/lib/users'
 import { getGravatarUrl, getUserInitials } from '@/lib/gravatar'
 import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
 import JoinChatModal from './JoinChatModal'
 import NewChatModal from './NewChatModal'
 
+const MAX_AVATARS = 5
+
 interface WelcomeScreenProps {
   user: User | null
   onLogin: () => void
@@ -32,23 +33,17 @@ export default function WelcomeScreen({
   const [isLoading, setIsLoading] = useState(false)
   const [users, setUsers] = useState<Record<string, User>>({})
 
-  const fetchUsers = async () => {
+  // Fetch the members shown as avatars of the listed conversations
+  const fetchUsers = async (conversations: Conversation[]) => {
     if (!user) return
 
     try {
-      const response = await conversationsApiApiGetUsers({
-        headers: {
-          'User-Id': user.id,
-        },
-      })
-
-      if (response.data && Array.isArray(response.data)) {
-        const usersMap: Record<string, User> = {}
-        response.data.forEach(user => {
-          usersMap[user.id] = user
-        })
-        setUsers(usersMap)
-      }
+      setUsers(
+        await fetchUsersByIds(
+          user,
+          conversations.flatMap(c => (c.users_ids || []).slice(0, MAX_AVATARS))
+        )
+      )
     } catch (error) {
       console.error('Failed to fetch users:', error)
     }
@@ -60,13 +55,12 @@ export default function WelcomeScreen({
     setIsLoading(true)
     try {
       const response = await conversationsApiApiListConversations({
-        headers: {
-          'User-Id': user.id,
-        },
+        headers: getAuthHeaders(user),
       })
 
       if (response.data) {
         setConversations(response.data)
+        fetchUsers(response.data)
       }
     } catch (error) {
       console.error('Failed to fetch conversations:', error)
@@ -82,7 +76,6 @@ export default function WelcomeScreen({
   useEffect(() => {
     if (user) {
       fetchConversations()
-      fetchUsers()
     }
   }, [user])
 
@@ -105,9 +98,8 @@ export default function WelcomeScreen({
       )
     }
 
-    const maxAvatars = 5
-    const displayUsers = userIds.slice(0, maxAvatars)
-    const hasMoreUsers = userIds.length > maxAvatars
+    const displayUsers = userIds.slice(0, MAX_AVATARS)
+    const hasMoreUsers = userIds.length > MAX_AVATARS
 
     return (
       <div className="flex items-center gap-1">
@@ -133,7 +125,7 @@ export default function WelcomeScreen({
         </div>
         {hasMoreUsers && (
           <span className="text-sm text-muted-foreground ml-1">
-            +{userIds.length - maxAvatars}
+            +{userIds.length - MAX_AVATARS}
           </span>
         )}
       </div>
@@ -3,11 +3,13 @@ import { Button } from '@/components/ui/button'
 import { Input } from '@/components/ui/input'
 import { Send, ArrowLeft, Copy, Check, ChevronDown } from 'lucide-react'
 import { showToast } from '@/lib/toast'
+import { getAuthHeaders, getAuthToken } from '@/lib/auth'
+import { fetchUsersByIds } from '@/lib/users'
 import type { User, Message, Conversation } from '@/api/generated'
+import { client } from '@/api/generated/client.gen'
 import {
   conversationsApiApiGetMessages,
   conversationsApiApiPostMessage,
-  conversationsApiApiGetUsers,
 } from '@/api/generated'
 import { getGravatarUrl, getUserInitials } from '@/lib/gravatar'
 import { Avatar, AvatarFallback, AvatarImage } from '@/components/ui/avatar'
@@ -35,11 +37,7 @@ export default function ChatPage({
   const [isLoading, setIsLoading] = useState(false)
   const [isSending, setIsSending] = useState(false)
   const [users, setUsers] = useState<Record<string, User>>({})
-  const [pollingInterval, setPollingInterval] = useState<NodeJS.Timeout | null>(
-    null
-  )
-  const [isPolling, setIsPolling] = useState(false)
-  const [isUserTyping, setIsUserTyping] = useState(false)
+  const requestedUsersIds = useRef(new Set<string>())
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const messagesContainerRef = useRef<HTMLDivElement>(null)
   const [showScrollButton, setShowScrollButton] = useState(false)
@@ -68,40 +66,51 @@ export default function ChatPage({
     }
   }, [messages, autoScroll, wasAtBottom])
 
-  // Fetch messages when component mounts
+  // Add a message, or replace it when it is already listed
+  const upsertMessage = (message: Message) => {
+    setMessages(prev => {
+      const index = prev.findIndex(m => m.id === message.id)
+      if (index === -1) {
+        return [...prev, message]
+      }
+      const next = [...prev]
+      next[index] = message
+      return next
+    })
+  }
+
+  // Fetch messages when component mounts, then follow the conversation events
   useEffect(() => {
     fetchMessages()
-    fetchUsers()
-
-    // Start polling for new messages every 1 second
-    const interval = setInterval(() => {
-      if (!isPolling && !isLoading && !isUserTyping) {
-        fetchMessages(true) // Pass true to indicate this is a polling request
-      }
-    }, 1000)
-    setPollingInterval(interval)
 
-    // Cleanup polling on unmount
-    return () => {
-      if (pollingInterval) {
-        clearInterval(pollingInterval)
-      }
+    // EventSource cannot send headers, the session token goes in the query string
+    const url = new URL(
+      `/api/chat/${encodeURIComponent(conversation.id || '')}/events/`,
+      client.getConfig().baseURL
+    )
+    url.searchParams.set('token', getAuthToken(user) || '')
+    const source = new EventSource(url)
+    const onEvent = (event: MessageEvent<string>) => {
+      upsertMessage(JSON.parse(event.data).message as Message)
     }
-  }, [conversation.id])
-
-  // Cleanup polling when component unmounts
-  useEffect(() => {
-    return () => {
-      if (pollingInterval) {
-        clearInterval(pollingInterval)
+    source.addEventListener('message_added', onEvent)
+    source.addEventListener('message_updated', onEvent)
+    // Bulk imports publish a single event without their messages
+    source.addEventListener('messages_imported', () => fetchMessages(true))
+    // The browser reconnects by itself, reload what was posted meanwhile
+    let connected = false
+    source.onopen = () => {
+      if (connected) {
+        fetchMessages(true)
       }
+      connected = true
     }
-  }, [pollingInterval])
 
-  const fetchMessages = async (isPollingRequest = false) => {
-    if (isPollingRequest) {
-      setIsPolling(true)
-    } else {
+    return () => source.close()
+  }, [conversation.id])
+
+  const fetchMessages = async (isRefresh = false) => {
+    if (!isRefresh) {
       setIsLoading(true)
     }
 
@@ -110,65 +119,47 @@ export default function ChatPage({
         path: {
           conversation_id: conversation.id || '',
         },
-        headers: {
-          'User-Id': user.id,
-        },
+        headers: getAuthHeaders(user),
       })
 
       if (response.data && Array.isArray(response.data)) {
-        // Only update messages if they're different (for polling efficiency)
-        if (isPollingRequest) {
-          // For polling, only update if the message count or content has changed
-          const currentMessageIds = new Set(messages.map(m => m.id))
-          const newMessageIds = new Set(response.data.map(m => m.id))
-
-          if (
-            currentMessageIds.size !== newMessageIds.size ||
-            !response.data.every(m => currentMessageIds.has(m.id))
-          ) {
-            setMessages(response.data)
-          }
-        } else {
-          // For manual refresh, always update
-          setMessages(response.data)
-        }
+        const fetched = response.data
+        const fetchedIds = new Set(fetched.map(m => m.id))
+        // Keep the messages of this conversation pushed while fetching
+        setMessages(prev => [
+          ...fetched,
+          ...prev.filter(
+            m =>
+              m.conversation_id === conversation.id && !fetchedIds.has(m.id)
+          ),
+        ])
       }
     } catch (error) {
       console.error('Failed to fetch messages:', error)
-      if (!isPollingRequest) {
+      if (!isRefresh) {
         showToast.error(
           'Failed to load messages',
           'Please try refreshing the page.'
         )
       }
     } finally {
-      if (isPollingRequest) {
-        setIsPolling(false)
-      } else {
+      if (!isRefresh) {
         setIsLoading(false)
       }
     }
   }
 
-  const fetchUsers = async () => {
-    try {
-      const response = await conversationsApiApiGetUsers({
-        headers: {
-          'User-Id': user.id,
-        },
-      })
-
-      if (response.data && Array.isArray(response.data)) {
-        const usersMap: Record<string, User> = {}
-        response.data.forEach(user => {
-          usersMap[user.id] = user
-        })
-        setUsers(usersMap)
-      }
-    } catch (error) {
-      console.error('Failed to fetch users:', error)
-    }
-  }
+  // Fetch the issuers of messages not fetched yet, once each
+  useEffect(() => {
+    const usersIds = messages
+      .map(m => m.issuer_id)
+      .filter(id => id && !requestedUsersIds.current.has(id))
+    if (usersIds.length === 0) return
+    usersIds.forEach(id => requestedUsersIds.current.add(id))
+    fetchUsersByIds(user, usersIds)
+      .then(usersMap => setUsers(prev => ({ ...prev, ...usersMap })))
+      .catch(error => console.error('Failed to fetch users:', error))
+  }, [messages])
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault()
@@ -186,16 +177,13 @@ export default function ChatPage({
             conversation_id: conversation.id || '',
           },
           body: messageData,
-          headers: {
-            'User-Id': user.id,
-          },
+          headers: getAuthHeaders(user),
         })
 
         if (response.data) {
-          // Add the new message to the list
-          setMessages(prev => [...prev, response.data])
+          // Add the new message to the list, unless its event came first
+          upsertMessage(response.data)
           setMessageInput('')
-          setIsUserTyping(false)
 
           // Call the optional callback
           if (onSendMessage) {
@@ -411,10 +399,7 @@ export default function ChatPage({
         <form onSubmit={handleSubmit} className="flex gap-2">
           <Input
             value={messageInput}
-            onChange={e => {
-              setMessageInput(e.target.value)
-              setIsUserTyping(e.target.value.length > 0)
-            }}
+            onChange={e => setMessageInput(e.target.value)}
             placeholder="Type your message..."
             className="flex-1 rounded-lg"
             disabled={isSending}
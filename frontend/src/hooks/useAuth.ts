@@ -1,4 +1,7 @@
 import type { User } from '@/api/generated'
+import { client } from '@/api/generated/client.gen'
+import { getAuthToken } from '@/lib/auth'
+import { isAxiosError } from 'axios'
 import { useState, useEffect } from 'react'
 
 export function useAuth() {
@@ -10,7 +13,13 @@ export function useAuth() {
     const savedUser = localStorage.getItem('user')
     if (savedUser) {
       try {
-        setUser(JSON.parse(savedUser))
+        const parsedUser: User = JSON.parse(savedUser)
+        // Sessions saved before session tokens cannot authenticate requests
+        if (getAuthToken(parsedUser)) {
+          setUser(parsedUser)
+        } else {
+          localStorage.removeItem('user')
+        }
       } catch {
         localStorage.removeItem('user')
       }
@@ -18,6 +27,24 @@ export function useAuth() {
     setIsLoading(false)
   }, [])
 
+  // Log out when the API rejects the session token, expired or revoked
+  useEffect(() => {
+    const interceptor = client.instance.interceptors.response.use(
+      response => response,
+      error => {
+        if (
+          isAxiosError(error) &&
+          error.response?.status === 401 &&
+          error.config?.headers?.Authorization
+        ) {
+          logout()
+        }
+        return Promise.reject(error)
+      }
+    )
+    return () => client.instance.interceptors.response.eject(interceptor)
+  }, [])
+
   const login = (userData: User) => {
     localStorage.setItem('user', JSON.stringify(userData))
     setUser(userData)
@@ -0,0 +1,20 @@
+import type { User } from '@/api/generated'
+
+/**
+ * Build the headers authenticating API requests for a logged in user
+ * @param user - The user as returned by the login or register endpoint, carrying its session token
+ * @returns The Authorization header, none when the user has no session token
+ */
+export function getAuthHeaders(user: User): Record<string, string> {
+  const token = getAuthToken(user)
+  return token ? { Authorization: `Bearer ${token}` } : {}
+}
+
+/**
+ * Get the session token of a logged in user
+ * @param user - The user as returned by the login or register endpoint
+ * @returns The session token, for requests that cannot carry headers such as an EventSource
+ */
+export function getAuthToken(user: User): string | undefined {
+  return (user as User & { token?: string }).token
+}
@@ -0,0 +1,40 @@
+import type { User } from '@/api/generated'
+import { conversationsApiApiGetUsers } from '@/api/generated'
+import { getAuthHeaders } from '@/lib/auth'
+
+// Ids sent per request, keeping query strings well under URL length limits
+const USERS_IDS_PER_REQUEST = 50
+
+/**
+ * Fetch the profiles of the given users, the listing of all users being paged
+ * @param user - The logged in user making the requests
+ * @param usersIds - Ids of the users to fetch
+ * @returns The profiles found, keyed by user id
+ */
+export async function fetchUsersByIds(
+  user: User,
+  usersIds: string[]
+): Promise<Record<string, User>> {
+  const uniqueIds = [...new Set(usersIds)]
+  const chunks = []
+  for (let i = 0; i < uniqueIds.length; i += USERS_IDS_PER_REQUEST) {
+    chunks.push(uniqueIds.slice(i, i + USERS_IDS_PER_REQUEST))
+  }
+  const responses = await Promise.all(
+    chunks.map(chunk =>
+      conversationsApiApiGetUsers({
+        query: { users_ids: chunk },
+        headers: getAuthHeaders(user),
+      })
+    )
+  )
+  const usersMap: Record<string, User> = {}
+  responses.forEach(response => {
+    if (response.data && Array.isArray(response.data)) {
+      response.data.forEach(profile => {
+        usersMap[profile.id] = profile
+      })
+    }
+  })
+  return usersMap
+}